@@ -2,20 +2,27 @@
 
 import pandas as pd
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
-from data.data_fetcher import get_momentum_indicators, get_value_indicators, fetch_stock_data_from_db,fetch_stock_data_from_yfinance
-from strategies.sortino_ratio import calculate_sortino_ratio
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from data.data_fetcher import (get_momentum_indicators, get_value_indicators, fetch_stock_data_from_yfinance,
+                               fetch_stock_panel_from_db, panel_to_arrays, fetch_fundamentals_asof_from_db, value_row,
+                               fetch_indicator_state_from_db)
+from utils.factors import FactorGraph, factor_row, frame_factors
 import logging
 from datetime import datetime, timedelta
 import pytz
-import time
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from data.database import get_connection
-from psycopg2.extras import RealDictCursor
+from tenacity import retry, stop_after_attempt, stop_after_delay, wait_exponential, retry_if_exception_type
+from data.database import statement_timeout
+from utils import metrics
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 종목 필터와 결과 행에 쓰는 팩터
+ANALYSIS_FACTORS = ['Average Volume', 'Last Close', 'Price Increase Ratio', 'Sortino Ratio', 'RSI', '6M Change']
+# fetch_momentum_screen_from_db가 이미 계산해 주는 필터 팩터 (screen을 넘기면 panel에서 다시 계산하지 않음)
+SCREEN_FACTORS = ['Average Volume', 'Last Close', 'Price Increase Ratio', 'Sortino Ratio']
+
 def normalize_series(series):
     """Min-Max 정규화"""
     if series.isna().all() or len(series) < 2:
@@ -25,17 +32,52 @@ def normalize_series(series):
         return series.fillna(0)
     return (series - min_val) / (max_val - min_val)
 
-def calculate_weighted_score(df):
-    """가중치 점수 계산"""
-    weights = {
-        '6M Change': 0.3,
-        'RSI': 0.2,
-        'Revenue Growth': 0.2,
-        'Debt to Equity': 0.1,
-        'PBR': 0.1,
-        'Sortino Ratio': 0.05,
-        'Average Volume': 0.05
-    }
+# calculate_weighted_score 기본 가중치 (지표 컬럼 -> 가중치)
+DEFAULT_WEIGHTS = {
+    '6M Change': 0.3,
+    'RSI': 0.2,
+    'Revenue Growth': 0.2,
+    'Debt to Equity': 0.1,
+    'PBR': 0.1,
+    'Sortino Ratio': 0.05,
+    'Average Volume': 0.05
+}
+
+# 명령행(--weights)/parameter_sweep 결과 표에서 쓰는 가중치 이름 -> calculate_weighted_score 컬럼
+WEIGHT_KEYS = {
+    'w_6m_change': '6M Change',
+    'w_rsi': 'RSI',
+    'w_revenue_growth': 'Revenue Growth',
+    'w_debt_to_equity': 'Debt to Equity',
+    'w_pbr': 'PBR',
+    'w_sortino': 'Sortino Ratio',
+    'w_volume': 'Average Volume',
+}
+
+def weights_from_params(params):
+    """w_* 파라미터 -> calculate_weighted_score weights"""
+    return {column: params[key] for key, column in WEIGHT_KEYS.items() if key in params}
+
+def parse_weights(items):
+    """['w_rsi=0.3', ...] -> calculate_weighted_score weights (이름마다 값 하나)"""
+    params = {}
+    for item in items or []:
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in WEIGHT_KEYS or name in params:
+            raise ValueError(f"Weights take one value per name ({', '.join(WEIGHT_KEYS)})")
+        try:
+            params[name] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight for {name}: {value!r}")
+    return weights_from_params(params)
+
+def calculate_weighted_score(df, weights=None):
+    """가중치 점수 계산 (weights: 지표 컬럼 -> 가중치, 없는 컬럼은 DEFAULT_WEIGHTS 값 사용)"""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown weight columns: {sorted(unknown)}")
     
     # 정규화
     normalized = pd.DataFrame()
@@ -51,59 +93,98 @@ def calculate_weighted_score(df):
     score = sum(normalized[col] * weight for col, weight in weights.items())
     return score
 
-def fetch_stock_analysis(tickers, start_date, end_date, min_volume, min_price, max_price, min_sortino, min_diff_ratio):
-    """지정된 티커의 모멘텀 및 가치 지표 계산"""
-    results = []
+@metrics.instrument('analysis.fetch_stock_analysis', rows=metrics.row_count)
+def fetch_stock_analysis(tickers, start_date, end_date, min_volume, min_price, max_price, min_sortino, min_diff_ratio,
+                         max_workers=8, ticker_timeout=60, weights=None, screen=None):
+    """
+    지정된 티커의 모멘텀 및 가치 지표 계산
+
+    가격 데이터는 한 번의 DB 조회로 읽고, 종목별 작업(DB 재무 조회, yfinance 보충)은
+    max_workers개의 스레드에서 동시에 처리합니다. 결과는 입력 티커 순서대로 모으며,
+    작업이 시작된 뒤 ticker_timeout초 안에 끝나지 않은 종목은 건너뜁니다. 작업 자체도
+    DB statement_timeout, yfinance 요청 timeout, 재시도 시간 제한으로 묶여 있어 건너뛴
+    스레드가 프로세스 종료를 붙잡지 않습니다. weights는 calculate_weighted_score에 전달됩니다.
+
+    screen(fetch_momentum_screen_from_db 결과)을 넘기면 그 종목들은 DB에서 이미 가격 필터를
+    통과했으므로 필터를 다시 적용하지 않고, Sortino Ratio/Average Volume 등은 screen 값을
+    그대로 씁니다. 이때 panel에서는 RSI와 6M Change만 계산합니다.
+
+    indicator_state가 end_date까지 반영된 종목(As Of == end_date)은 저장된 지표를 쓰고,
+    나머지 종목만 panel을 읽어 계산합니다 (지표 정의와 183일 window는 같음).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    screened = {}
+    if screen is not None and not screen.empty:
+        screened = screen.set_index('Ticker')[SCREEN_FACTORS].astype('float64').to_dict('index')
+    names = ANALYSIS_FACTORS if set(tickers) - set(screened) else ['RSI', '6M Change']
+
+    end_date_dt = pd.to_datetime(end_date)
+    start_date_dt = end_date_dt - timedelta(days=183)
+    # end_date까지 증분 갱신된 종목은 indicator_state의 지표를 그대로 사용
+    state = fetch_indicator_state_from_db(tickers)
+    factor_table = state.loc[state['As Of'] == end_date_dt.date(), names]
+    remaining = [ticker for ticker in tickers if ticker not in factor_table.index]
+    metrics.count('analysis.indicator_state_hits', len(factor_table))
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), 
-           retry=retry_if_exception_type(Exception))
+    if remaining:
+        # 나머지 종목의 6개월 데이터를 한 번의 쿼리로 가져오기
+        panel = fetch_stock_panel_from_db(remaining, start_date_dt, end_date_dt)
+        # 필터/모멘텀 팩터를 panel 전체에 대해 한 번에 계산 (수익률 등 중간값은 팩터끼리 공유)
+        with metrics.timed('analysis.factors', rows=len(remaining)):
+            fields = ['Close', 'Volume'] if 'Average Volume' in names else ['Close']
+            arrays = panel_to_arrays(panel, remaining, fields=fields)
+            computed = FactorGraph.from_arrays(arrays).table(names)
+        factor_table = pd.concat([factor_table, computed]) if len(factor_table) else computed
+    # 재무 지표도 end_date 시점 기준으로 전체 종목을 한 번에 조회
+    fundamentals = fetch_fundamentals_asof_from_db(tickers, end_date_dt)
+
+    @retry(stop=stop_after_attempt(3) | stop_after_delay(ticker_timeout),
+           wait=wait_exponential(multiplier=1, min=2, max=10),
+           retry=retry_if_exception_type(Exception), before_sleep=metrics.record_retry)
     def fetch_with_retry(ticker):
         try:
-            # 6개월 데이터 가져오기
-            end_date_dt = pd.to_datetime(end_date)
-            start_date_dt = end_date_dt - timedelta(days=183)
-            
-            # DB에서 데이터 조회
-            data = fetch_stock_data_from_db(ticker, start_date_dt, end_date_dt)
-            if data.empty:
+            # panel에서 계산해 둔 팩터 사용, DB에 없는 종목만 yfinance 데이터로 계산
+            row = factor_row(factor_table, ticker)
+            from_panel = bool(row)
+            if not from_panel:
                 logger.warning(f"No DB data for {ticker}, falling back to yfinance")
                 data = fetch_stock_data_from_yfinance(ticker, start_date_dt, end_date_dt)
                 if data.empty:
                     return None
-            
-            # 필터 조건 적용
-            if (data['Volume'].mean() < min_volume or
-                data['Close'].iloc[-1] < min_price or
-                data['Close'].iloc[-1] > max_price):
-                return None
+                row = frame_factors(data, ANALYSIS_FACTORS)
 
-            # Price Increase Ratio 계산
-            price_increase_ratio = (data['Close'].iloc[-1] - data['Close'].iloc[0]) / data['Close'].iloc[0]
-            if price_increase_ratio < min_diff_ratio:
-                return None
+            if ticker in screened:
+                # screener가 같은 정의로 계산하고 필터까지 적용한 값 사용
+                row = {**row, **screened[ticker]}
+            else:
+                # 필터 조건 적용
+                if (row['Average Volume'] < min_volume or
+                    row['Last Close'] < min_price or
+                    row['Last Close'] > max_price):
+                    return None
 
-            # Sortino Ratio 계산
-            daily_returns = data['Close'].pct_change().dropna()
-            sortino_ratio = calculate_sortino_ratio(daily_returns)
-            if sortino_ratio is None or sortino_ratio < min_sortino:
-                return None
+                # Price Increase Ratio
+                price_increase_ratio = row['Price Increase Ratio']
+                if price_increase_ratio is not None and price_increase_ratio < min_diff_ratio:
+                    return None
+
+                # Sortino Ratio
+                if row['Sortino Ratio'] is None or row['Sortino Ratio'] < min_sortino:
+                    return None
             
-            # 모멘텀 지표
-            momentum = get_momentum_indicators(ticker)
+            # 모멘텀 지표 (panel에 없던 종목은 종목별 계산)
+            momentum = row if from_panel else get_momentum_indicators(ticker)
             if not momentum:
                 return None
             
             # 가치 지표 (DB 우선 조회)
-            value = fetch_value_indicators_from_db(ticker)
+            value = value_row(fundamentals, ticker)
             if not value:
                 logger.warning(f"No DB financials for {ticker}, falling back to yfinance")
                 value = get_value_indicators(ticker)
                 if not value:
                     return None
             
-            # 평균 거래량
-            avg_volume = data['Volume'].mean() if not data['Volume'].empty else None
-            
             return {
                 'Ticker': ticker,
                 '6M Change': momentum.get('6M Change'),
@@ -111,49 +192,59 @@ def fetch_stock_analysis(tickers, start_date, end_date, min_volume, min_price, m
                 'Revenue Growth': value.get('Revenue Growth'),
                 'Debt to Equity': value.get('Debt to Equity'),
                 'PBR': value.get('PBR'),
-                'Sortino Ratio': sortino_ratio,
-                'Average Volume': avg_volume
+                'Sortino Ratio': row['Sortino Ratio'],
+                'Average Volume': row['Average Volume']
             }
         except Exception as e:
             logger.error(f"Error processing {ticker}: {e}")
             raise
 
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        for ticker in tickers:
-            result = fetch_with_retry(ticker)
-            if result:
-                results.append(result)
-            time.sleep(0.5)
+    started = {}  # 티커 -> 작업 시작 시각 (작업 스레드가 기록)
+
+    def analyze_ticker(ticker):
+        started[ticker] = time.monotonic()
+        # 작업 스레드 안에서 단계를 열어야 종목별 DB round trip과 재시도가 집계됨
+        with metrics.timed('analysis.ticker', rows=1), statement_timeout(ticker_timeout):
+            return fetch_with_retry(ticker)
+
+    finished = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {executor.submit(analyze_ticker, ticker): ticker for ticker in tickers}
+        while pending:
+            # 시작 후 ticker_timeout초가 지난 작업은 포기 (대기 중인 작업의 시간은 세지 않음)
+            now = time.monotonic()
+            for future, ticker in list(pending.items()):
+                if not future.done() and ticker in started and now - started[ticker] >= ticker_timeout:
+                    logger.error(f"Timed out processing {ticker} after {ticker_timeout}s")
+                    metrics.count('analysis.ticker_timeouts')
+                    del pending[future]
+            deadlines = [started[ticker] + ticker_timeout for ticker in pending.values() if ticker in started]
+            timeout = max(0.0, min(deadlines) - now) if deadlines else ticker_timeout
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = pending.pop(future)
+                try:
+                    finished[ticker] = future.result()
+                except Exception as e:
+                    logger.error(f"Giving up on {ticker}: {e}")
+                    metrics.count('analysis.ticker_failures')
+    finally:
+        # 시간 초과된 작업은 기다리지 않음 (위의 제한들로 곧 끝남). 중단된 경우 대기 중인 작업은 취소
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # 입력 순서대로 모아 결과 순서를 고정
+    results = [finished[ticker] for ticker in tickers if finished.get(ticker)]
     
     if not results:
         logger.warning("No valid results obtained")
         return pd.DataFrame()
     
     df = pd.DataFrame(results)
-    df['Weighted Score'] = calculate_weighted_score(df)
+    df['Weighted Score'] = calculate_weighted_score(df, weights)
     return df
 
-def fetch_value_indicators_from_db(ticker):
-    """DB에서 펀더멘털 지표 조회"""
-    query = """
-        SELECT revenue_growth, debt_to_equity, pbr
-        FROM quant_result
-        WHERE ticker = %s
-        ORDER BY trade_date DESC
-        LIMIT 1;
-    """
-    try:
-        with get_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (ticker,))
-                result = cur.fetchone()
-                if result:
-                    return {
-                        'Revenue Growth': result['revenue_growth'],
-                        'Debt to Equity': result['debt_to_equity'],
-                        'PBR': result['pbr']
-                    }
-                return {}
-    except Exception as e:
-        logger.error(f"Error fetching DB financials for {ticker}: {e}")
-        return {}
\ No newline at end of file
+def fetch_value_indicators_from_db(ticker, as_of=None):
+    """DB(stock_financials_history)에서 as_of 시점의 펀더멘털 지표 조회"""
+    as_of = as_of or datetime.now(pytz.timezone('Asia/Seoul')).date()
+    return value_row(fetch_fundamentals_asof_from_db([ticker], as_of), ticker)
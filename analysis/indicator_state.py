@@ -0,0 +1,323 @@
+# analysis/indicator_state.py
+#
+# 종목별 지표 상태(indicator_state)의 증분 갱신
+#
+# main.py/get_momentum_indicators는 후보마다 183일치 원본 행을 다시 읽어 RSI, 이동평균,
+# 기간 수익률, Sortino를 계산합니다. 이 모듈은 183일 window의 종가/거래량 버퍼와 누적
+# 합계(SMA 합, RSI 상승/하락 합, 수익률 합, downside 제곱 합)를 종목별로 저장해 두고,
+# 새 거래일이 들어오면 한 행을 더하고 window 밖으로 나간 행만 빼서 O(1)로 갱신합니다.
+# 계산된 지표도 같은 행에 저장되므로 전 종목 현재 지표는 fetch_indicator_state_from_db
+# 한 번으로 읽습니다. 누적 오차나 과거 날짜 재적재는 --rebuild로 원본에서 다시 맞춥니다.
+#
+#   python -m analysis.indicator_state --update 2025-07-10
+#   python -m analysis.indicator_state --rebuild
+#
+# 지표 정의는 get_momentum_indicators / fetch_stock_analysis와 같습니다. 변화율(1M/3M/6M/1Y)은
+# window 안의 위치 기준이라 183일 window에서는 6M Change(132행 전)가 보통 없습니다.
+
+import argparse
+import math
+import time
+import logging
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from data.database import get_connection
+from data.data_fetcher import fetch_symbols_from_db, fetch_stock_panel_from_db
+from data.data_saver import save_indicator_state_in_db
+from data.trading_calendar import get_trading_calendar
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 183  # fetch_stock_analysis / get_momentum_indicators 구간 (달력일)
+RSI_PERIOD = 14
+RISK_FREE_RATE = 0.01 / 252
+
+STATE_QUERY = """
+    SELECT ticker, as_of, dates, closes, volumes, volume_sum, close_sum_60, close_sum_200, gain_sum, loss_sum,
+           return_sum, return_count, downside_square_sum, downside_count, high
+    FROM indicator_state
+    WHERE (%(tickers)s::text[] IS NULL OR ticker = ANY(%(tickers)s::text[]));
+"""
+
+DAY_QUERY = """
+    SELECT ticker, close_price::float8, volume
+    FROM stock_data
+    WHERE trade_date = %s AND close_price IS NOT NULL;
+"""
+
+class IndicatorState:
+    """
+    한 종목의 183일 window 버퍼와 누적 합계
+
+    window는 날짜순 거래 목록이고, 위치 i의 종가 변화는 d_i = c_i - c_(i-1) (d_0 = 0,
+    compute_rsi의 첫 diff처럼 0으로 취급), 일간 수익률은 위치 1부터 셉니다
+    (fetch_stock_analysis의 pct_change().dropna()와 같음).
+    """
+
+    SUMS = ('volume_sum', 'close_sum_60', 'close_sum_200', 'gain_sum', 'loss_sum',
+            'return_sum', 'return_count', 'downside_square_sum', 'downside_count')
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.as_of = None
+        self.dates, self.closes, self.volumes = [], [], []
+        for name in self.SUMS:
+            setattr(self, name, 0.0)
+        self.return_count = self.downside_count = 0
+        self.high = None
+
+    @classmethod
+    def from_row(cls, row):
+        state = cls(row['ticker'])
+        state.as_of = row['as_of']
+        state.dates, state.closes, state.volumes = list(row['dates']), list(row['closes']), list(row['volumes'])
+        for name in cls.SUMS:
+            setattr(state, name, row[name])
+        state.high = row['high']
+        return state
+
+    # 위치 i의 종가 변화 (d_0 = 0)
+    def _delta(self, i):
+        return self.closes[i] - self.closes[i - 1] if i > 0 else 0.0
+
+    def _add_delta(self, delta, sign=1):
+        if delta > 0:
+            self.gain_sum += sign * delta
+        elif delta < 0:
+            self.loss_sum -= sign * delta
+
+    def _add_return(self, i, sign=1):
+        """위치 i(>= 1)의 일간 수익률을 합계에 더하거나(sign=1) 뺌(sign=-1)"""
+        previous = self.closes[i - 1]
+        if not previous:
+            return
+        value = self.closes[i] / previous - 1
+        self.return_sum += sign * value
+        self.return_count += sign
+        if value < 0:
+            self.downside_square_sum += sign * value ** 2
+            self.downside_count += sign
+
+    def push(self, trade_date, close, volume):
+        """window 끝에 거래 하나 추가"""
+        self.dates.append(trade_date)
+        self.closes.append(float(close))
+        self.volumes.append(int(volume or 0))
+        n = len(self.closes)
+        self.volume_sum += self.volumes[-1]
+        for window, name in ((60, 'close_sum_60'), (200, 'close_sum_200')):
+            total = getattr(self, name) + self.closes[-1]
+            if n > window:
+                total -= self.closes[n - 1 - window]
+            setattr(self, name, total)
+        self._add_delta(self._delta(n - 1))
+        if n > RSI_PERIOD:
+            self._add_delta(self._delta(n - 1 - RSI_PERIOD), sign=-1)
+        if n > 1:
+            self._add_return(n - 1)
+        self.high = self.closes[-1] if self.high is None else max(self.high, self.closes[-1])
+
+    def pop(self):
+        """window 맨 앞 거래 제거 (다음 거래가 새 첫 거래가 되어 그 수익률/변화는 빠짐)"""
+        n = len(self.closes)
+        if n > 1:
+            self._add_return(1, sign=-1)
+            # 위치 1은 새 d_0(=0)이 되므로, RSI 구간(마지막 14개)에 들어 있었다면 뺌
+            if n <= RSI_PERIOD + 1:
+                self._add_delta(self._delta(1), sign=-1)
+        for window, name in ((60, 'close_sum_60'), (200, 'close_sum_200')):
+            if n <= window:
+                setattr(self, name, getattr(self, name) - self.closes[0])
+        self.volume_sum -= self.volumes[0]
+        removed = self.closes[0]
+        del self.dates[0], self.closes[0], self.volumes[0]
+        if not self.closes:
+            self.high = None
+        elif removed >= self.high:
+            self.high = max(self.closes)  # 최고가가 빠질 때만 다시 계산
+
+    def advance(self, trade_date, close=None, volume=None, window_days=WINDOW_DAYS):
+        """trade_date까지 window를 이동 (그날 거래가 있으면 추가하고 window 밖 거래는 제거)"""
+        if self.as_of is not None and trade_date <= self.as_of:
+            raise ValueError(f"{self.ticker}: state is already at {self.as_of}, cannot advance to {trade_date}")
+        if close is not None and not math.isnan(close):
+            self.push(trade_date, close, volume)
+        cutoff = trade_date - timedelta(days=window_days)
+        while self.dates and self.dates[0] < cutoff:
+            self.pop()
+        self.as_of = trade_date
+
+    def indicators(self):
+        """get_momentum_indicators + fetch_stock_analysis 가격 지표 (값이 없으면 None)"""
+        n = len(self.closes)
+        if not n:
+            return {}
+        last = self.closes[-1]
+
+        def change(lag):
+            if n < lag or not self.closes[-lag]:
+                return None
+            return (last - self.closes[-lag]) / self.closes[-lag] * 100
+
+        divisor = min(RSI_PERIOD, n)
+        rs = (self.gain_sum / divisor) / (self.loss_sum / divisor + 1e-10)
+        if self.return_count < 2:
+            sortino = None
+        elif self.downside_count == 0:
+            sortino = 0.0
+        else:
+            downside_deviation = math.sqrt(max(self.downside_square_sum, 0.0) / self.downside_count)
+            mean = self.return_sum / self.return_count
+            sortino = (mean - RISK_FREE_RATE) / downside_deviation * math.sqrt(252) if downside_deviation else 0.0
+        first = self.closes[0]
+        return {
+            'RSI': 100 - (100 / (1 + rs)),
+            '52W High Ratio': last / self.high if self.high else None,
+            '60-Day MA': self.close_sum_60 / min(60, n),
+            '200-Day MA': self.close_sum_200 / min(200, n),
+            '1M Change': change(22),
+            '3M Change': change(66),
+            '6M Change': change(132),
+            '1Y Change': (last - first) / first * 100 if first else None,
+            'Sortino Ratio': sortino,
+            'Average Volume': self.volume_sum / n,
+            'Last Close': last,
+            'Price Increase Ratio': (last - first) / first if first else None,
+        }
+
+    def to_row(self):
+        """indicator_state 테이블 행 (배열은 Postgres 배열 리터럴)"""
+        values = self.indicators()
+        return {
+            'ticker': self.ticker,
+            'as_of': self.as_of,
+            'dates': '{' + ','.join(str(day) for day in self.dates) + '}',
+            'closes': '{' + ','.join(repr(close) for close in self.closes) + '}',
+            'volumes': '{' + ','.join(str(volume) for volume in self.volumes) + '}',
+            **{name: getattr(self, name) for name in self.SUMS},
+            'high': self.high,
+            'last_close': values.get('Last Close'),
+            'rsi': values.get('RSI'),
+            'high_52w_ratio': values.get('52W High Ratio'),
+            'ma_60': values.get('60-Day MA'),
+            'ma_200': values.get('200-Day MA'),
+            'change_1m': values.get('1M Change'),
+            'change_3m': values.get('3M Change'),
+            'change_6m': values.get('6M Change'),
+            'change_1y': values.get('1Y Change'),
+            'sortino_ratio': values.get('Sortino Ratio'),
+            'average_volume': values.get('Average Volume'),
+            'price_increase_ratio': values.get('Price Increase Ratio'),
+        }
+
+def load_states(tickers=None):
+    """indicator_state 행을 {ticker: IndicatorState}로 읽기"""
+    params = {'tickers': None if tickers is None else list(tickers)}
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(STATE_QUERY, params)
+            columns = [column.name for column in cur.description]
+            rows = cur.fetchall()
+    return {row[0]: IndicatorState.from_row(dict(zip(columns, row))) for row in rows}
+
+def rebuild_indicator_state(as_of, tickers=None, window_days=WINDOW_DAYS, save=True):
+    """
+    원본 stock_data로 as_of 기준 상태를 처음부터 계산
+
+    Args:
+        as_of (str or date): window 끝 날짜.
+        tickers (iterable): 대상 종목 (기본값: 전체 심볼).
+
+    Returns:
+        dict: {ticker: IndicatorState}
+    """
+    as_of = pd.Timestamp(as_of).date()
+    if tickers is None:
+        tickers = tuple(fetch_symbols_from_db()['symbol'])
+    arrays = fetch_stock_panel_from_db(tickers, as_of - timedelta(days=window_days), as_of, as_arrays=True)
+    dates = [day.date() for day in arrays['dates']]
+    states = {}
+    for column, ticker in enumerate(arrays['tickers']):
+        state = IndicatorState(ticker)
+        close, volume = arrays['Close'][:, column], arrays['Volume'][:, column]
+        for row in np.flatnonzero(np.isfinite(close)):
+            state.push(dates[row], close[row], 0 if np.isnan(volume[row]) else volume[row])
+        if not state.dates:
+            continue
+        state.advance(as_of, window_days=window_days)
+        states[ticker] = state
+    if save and states:
+        save_indicator_state_in_db([state.to_row() for state in states.values()])
+    logger.info(f"Rebuilt indicator state for {len(states)} tickers as of {as_of}")
+    return states
+
+def update_indicator_state(trade_date, window_days=WINDOW_DAYS):
+    """
+    trade_date 하루치 stock_data를 반영해 전 종목 상태를 한 세션 앞으로 이동
+
+    상태가 없는 종목, 이미 더 뒤 날짜까지 반영된 종목(과거 날짜 재적재), 직전 거래일까지
+    반영되지 않은 종목(갱신을 건너뛴 날이 있음)은 원본에서 다시 계산합니다. save_daily_data가 저장을 마친 뒤 호출합니다.
+
+    Returns:
+        dict: 이동/재계산/저장 종목 수.
+    """
+    trade_date = pd.Timestamp(trade_date).date()
+    started = time.time()
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(DAY_QUERY, (trade_date,))
+            bars = {ticker: (close, volume) for ticker, close, volume in cur.fetchall()}
+    states = load_states()
+    previous_day = get_trading_calendar().previous_trading_day(trade_date)
+
+    rebuild = [ticker for ticker in bars if ticker not in states]
+    changed = []
+    for ticker, state in states.items():
+        close, volume = bars.get(ticker, (None, None))
+        if state.as_of is not None and trade_date <= state.as_of:
+            # 같은 날을 다시 적재했는데 값이 같으면 그대로, 다르거나 과거 날짜면 원본에서 재계산
+            applied = state.dates[-1:] == [trade_date] and state.closes[-1] == close
+            if trade_date < state.as_of or (close is not None and not applied):
+                rebuild.append(ticker)
+            continue
+        if state.as_of is None or state.as_of < previous_day:
+            rebuild.append(ticker)
+            continue
+        state.advance(trade_date, close, volume, window_days=window_days)
+        changed.append(state)
+
+    if changed:
+        save_indicator_state_in_db([state.to_row() for state in changed])
+    if rebuild:
+        rebuild_indicator_state(trade_date, tickers=rebuild, window_days=window_days)
+    summary = {'advanced': len(changed), 'rebuilt': len(rebuild), 'bars': len(bars)}
+    logger.info(f"Indicator state for {trade_date}: {summary} in {time.time() - started:.1f}s")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the per-ticker indicator_state table.")
+    parser.add_argument("--update", type=str, metavar="TRADE_DATE",
+                        help="Advance every ticker's state by one stored trading day")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute state from raw stock_data")
+    parser.add_argument("--as_of", type=str, default=None,
+                        help="Window end for --rebuild (default: latest stored trading day)")
+    parser.add_argument("--tickers", nargs="+", default=None, help="Only these tickers (--rebuild)")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        as_of = args.as_of
+        if as_of is None:
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT MAX(trade_date) FROM trading_days;")
+                    as_of = cur.fetchone()[0]
+        rebuild_indicator_state(as_of, tickers=args.tickers)
+    elif args.update:
+        update_indicator_state(args.update)
+    else:
+        parser.error("Choose --update TRADE_DATE or --rebuild")
+
+if __name__ == "__main__":
+    main()
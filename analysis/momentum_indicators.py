@@ -0,0 +1,23 @@
+# analysis/momentum_indicators.py
+
+import numpy as np
+from utils.factors import FactorGraph
+
+MOMENTUM_COLUMNS = ["RSI", "52W High Ratio", "60-Day MA", "200-Day MA",
+                    "1M Change", "3M Change", "6M Change", "1Y Change"]
+
+def compute_momentum_matrix(close, rsi_period=14):
+    """
+    (날짜 x 종목) 종가 행렬에 대해 get_momentum_indicators와 같은 지표를 한 번에 계산
+
+    Args:
+        close (np.ndarray): 2차원 종가 배열. 거래가 없는 칸은 NaN.
+        rsi_period (int): RSI 기간.
+
+    Returns:
+        dict: MOMENTUM_COLUMNS별 1차원 배열 (값이 없으면 NaN).
+    """
+    close = np.asarray(close, dtype='float64')
+    if close.ndim != 2:
+        raise ValueError("close must be a 2-D (date x ticker) array")
+    return FactorGraph(close, rsi_period=rsi_period).compute(MOMENTUM_COLUMNS)
@@ -0,0 +1,368 @@
+# analysis/reports.py
+#
+# quant_result 상위 종목의 차트/리포트를 화면 없이 일괄 생성
+#
+#   python -m analysis.reports --trade_date 2025-07-10 --top_n 20 --workers 4
+#
+# StockAnalyzer(stock_analyzer2.py)는 종목마다 yfinance에서 1년치 가격과 .info를 받고,
+# 차트를 그릴 때 지표를 다시 계산하며 plt.show()에서 멈춥니다. 여기서는
+#   1. 상위 종목의 가격을 한 번의 panel 조회로 읽고 (이미 읽은 panel을 넘기면 재사용),
+#   2. 요약 지표를 utils.factors로 panel 전체에 대해 한 번 계산한 뒤,
+#   3. 프로세스 풀에서 matplotlib Figure(Agg)로 종목별 PNG와 HTML을 그립니다.
+# 종목별 입력(가격, 지표, quant_result 행, 재무)의 hash를 manifest.json에 남겨 두고,
+# 입력이 지난번과 같고 파일이 남아 있는 종목은 다시 그리지 않습니다.
+
+import os
+import json
+import html
+import hashlib
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from data.data_fetcher import (fetch_quant_result_from_db, fetch_stock_panel_from_db, panel_to_arrays,
+                               fetch_fundamentals_asof_from_db, value_row)
+from data.trading_calendar import trading_days_between
+from utils.factors import FactorGraph
+from analysis.momentum_indicators import MOMENTUM_COLUMNS
+from utils import metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 차트 모양이나 입력 구성을 바꾸면 올려서 기존 결과를 모두 다시 그림
+RENDER_VERSION = 1
+
+CHART_DAYS = 365      # 차트에 표시하는 기간 (달력일)
+WARMUP_DAYS = 300     # 200일 이동평균을 차트 첫날부터 그리기 위해 더 읽는 기간 (달력일)
+RSI_PERIOD = 14
+FORMATS = ('png', 'html')
+MANIFEST_NAME = 'manifest.json'
+
+SUMMARY_FACTORS = MOMENTUM_COLUMNS + ['Sortino Ratio', 'Average Volume', 'Last Close']
+RETURN_COLUMNS = ['1M Change', '3M Change', '6M Change', '1Y Change']
+
+def draw_charts(fig, ticker, close, ma_60, ma_200, rsi, returns):
+    """
+    주가/이동평균, RSI, 최근 상승률 차트를 fig에 그림 (StockAnalyzer.plot_charts와 같은 배치)
+
+    Args:
+        fig (matplotlib.figure.Figure): 그릴 Figure.
+        close, ma_60, ma_200, rsi (pd.Series): 날짜 인덱스 시계열.
+        returns (dict): 이름 -> 상승률(%) (None이면 0으로 표시).
+    """
+    axs = fig.subplots(3, 1)
+
+    axs[0].plot(close, label="Close Price", color="black")
+    axs[0].plot(ma_60, label="60-Day MA", linestyle="dashed", color="blue")
+    axs[0].plot(ma_200, label="200-Day MA", linestyle="dashed", color="red")
+    axs[0].set_title(f"{ticker} Stock Price with Moving Averages")
+    axs[0].legend()
+
+    axs[1].plot(rsi, label="RSI", color="purple")
+    axs[1].axhline(70, linestyle="dashed", color="red", alpha=0.5)
+    axs[1].axhline(30, linestyle="dashed", color="green", alpha=0.5)
+    axs[1].set_title(f"{ticker} RSI Indicator")
+    axs[1].legend()
+
+    axs[2].bar(list(returns.keys()), [value or 0.0 for value in returns.values()],
+               color=["gray", "blue", "green", "red"][:len(returns)])
+    axs[2].set_title(f"{ticker} Recent Returns (%)")
+
+    fig.tight_layout()
+    return axs
+
+def chart_series(close, period=RSI_PERIOD):
+    """종가 시계열의 60/200일 이동평균과 RSI 시계열 (RSI는 compute_rsi와 같은 정의)"""
+    delta = close.diff()
+    avg_gain = delta.where(delta > 0, 0).rolling(window=period, min_periods=1).mean()
+    avg_loss = (-delta.where(delta < 0, 0)).rolling(window=period, min_periods=1).mean()
+    rsi = 100 - (100 / (1 + avg_gain / (avg_loss + 1e-10)))
+    return close.rolling(window=60).mean(), close.rolling(window=200).mean(), rsi
+
+def _clean(values):
+    """NaN/NumPy 값을 JSON과 HTML에 쓸 수 있는 값으로 변환"""
+    result = {}
+    for key, value in values.items():
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            result[key] = None
+        elif isinstance(value, (np.floating, np.integer)):
+            result[key] = None if np.isnan(value) else float(value)
+        elif hasattr(value, 'isoformat'):  # date, datetime, Timestamp
+            result[key] = value.isoformat()
+        elif hasattr(value, 'is_finite'):  # Decimal
+            result[key] = float(value)
+        else:
+            result[key] = value
+    return result
+
+def _panel_covers(panel, tickers, start, end):
+    """panel에 모든 종목이 있고 날짜가 start 이후 첫 거래일부터 end까지 걸쳐 있는지 확인"""
+    if panel is None or panel.empty or not set(tickers) <= set(panel.index.get_level_values('Ticker')):
+        return False
+    dates = panel.index.get_level_values('Trade_date')
+    trading_days = trading_days_between(start.date(), end.date())
+    first = pd.Timestamp(trading_days[0]) if trading_days else end
+    return dates.min() <= first and dates.max() >= end
+
+def load_report_jobs(trade_date=None, top_n=20, panel=None, chart_days=CHART_DAYS):
+    """
+    상위 top_n 종목의 렌더링 입력을 준비
+
+    Args:
+        trade_date (str or date): quant_result 날짜. None이면 가장 최근 날짜.
+        top_n (int): 종목 수.
+        panel (pd.DataFrame): 이미 읽어 둔 fetch_stock_panel_from_db 결과. 없거나 종목이 빠져 있거나
+            차트 기간과 warm-up 기간을 모두 덮지 않으면 DB에서 조회.
+        chart_days (int): 차트 기간 (달력일).
+
+    Returns:
+        tuple: (trade_date, 종목별 job dict 목록). quant_result가 비어 있으면 (None, []).
+    """
+    ranked = fetch_quant_result_from_db(trade_date, top_n)
+    if ranked.empty:
+        return None, []
+    trade_date = pd.Timestamp(ranked['Trade Date'].iloc[0])
+    tickers = list(ranked['Ticker'])
+    chart_start = trade_date - timedelta(days=chart_days)
+    load_start = chart_start - timedelta(days=WARMUP_DAYS)
+
+    # 기간이 짧은 panel로 그리면 이동평균/수익률이 틀린 채 manifest에 최신으로 기록되므로 다시 조회
+    if not _panel_covers(panel, tickers, load_start, trade_date):
+        panel = fetch_stock_panel_from_db(tickers, load_start, trade_date)
+    arrays = panel_to_arrays(panel, tickers, fields=['Close', 'Volume'])
+    dates = arrays['dates']
+    in_range = dates <= trade_date
+    dates, close, volume = dates[in_range], arrays['Close'][in_range], arrays['Volume'][in_range]
+
+    # 요약 지표는 차트 기간에 대해 전 종목 한 번에 계산
+    window = dates >= chart_start
+    summary = FactorGraph(close[window], volume[window], tickers=tickers).table(SUMMARY_FACTORS)
+    fundamentals = fetch_fundamentals_asof_from_db(tickers, trade_date)
+
+    jobs = []
+    for column, row in enumerate(ranked.to_dict('records')):
+        ticker = row['Ticker']
+        valid = ~np.isnan(close[:, column])
+        jobs.append({
+            'ticker': ticker,
+            'rank': column + 1,
+            'trade_date': trade_date.date().isoformat(),
+            'chart_start': chart_start.date().isoformat(),
+            'dates': dates[valid].values.astype('datetime64[D]'),
+            'close': close[valid, column],
+            'volume': volume[valid, column],
+            'quant': _clean({key: value for key, value in row.items() if key != 'Trade Date'}),
+            'summary': _clean(summary.loc[ticker].to_dict()),
+            'value': _clean(value_row(fundamentals, ticker)),
+        })
+    return trade_date.date(), jobs
+
+def input_hash(job):
+    """렌더링 결과를 바꾸는 입력 전체의 hash (RENDER_VERSION 포함)"""
+    digest = hashlib.sha256()
+    scalars = {key: value for key, value in job.items() if key not in ('dates', 'close', 'volume')}
+    digest.update(json.dumps([RENDER_VERSION, scalars], sort_keys=True, default=str).encode())
+    for key in ('dates', 'close', 'volume'):
+        digest.update(np.ascontiguousarray(job[key]).tobytes())
+    return digest.hexdigest()
+
+def _format(value):
+    if value is None:
+        return 'N/A'
+    if isinstance(value, float):
+        return f"{value:,.4f}" if abs(value) < 1e6 else f"{value:,.0f}"
+    return html.escape(str(value))
+
+def _table(title, values):
+    rows = ''.join(f"<tr><th>{html.escape(key)}</th><td>{_format(value)}</td></tr>" for key, value in values.items())
+    return f"<h2>{html.escape(title)}</h2>\n<table>{rows}</table>\n"
+
+PAGE_STYLE = ("body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1.5em}"
+              "th,td{border:1px solid #ccc;padding:4px 8px;text-align:right}th{background:#f4f4f4;text-align:left}")
+
+def _page(title, body):
+    return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+            f"<style>{PAGE_STYLE}</style></head>\n<body>\n<h1>{html.escape(title)}</h1>\n{body}</body></html>\n")
+
+def render_report(job, output_dir, formats=FORMATS):
+    """
+    한 종목의 차트(PNG)와 리포트(HTML) 생성 (프로세스 풀 작업 함수)
+
+    pyplot을 쓰지 않고 Figure를 직접 만들어 저장하므로 화면이나 GUI backend가 필요 없습니다.
+
+    Returns:
+        list: 생성한 파일 이름.
+    """
+    ticker = job['ticker']
+    files = []
+    series = pd.Series(job['close'], index=pd.DatetimeIndex(job['dates']))
+    ma_60, ma_200, rsi = chart_series(series)
+    shown = series.index >= pd.Timestamp(job['chart_start'])
+    returns = {name: job['summary'].get(name) for name in RETURN_COLUMNS}
+
+    if 'png' in formats:
+        fig = Figure(figsize=(10, 12))
+        draw_charts(fig, ticker, series[shown], ma_60[shown], ma_200[shown], rsi[shown], returns)
+        fig.savefig(os.path.join(output_dir, f"{ticker}.png"), dpi=100)
+        files.append(f"{ticker}.png")
+
+    if 'html' in formats:
+        quant = job['quant']
+        title = f"#{job['rank']} {ticker}" + (f" - {quant['Company Name']}" if quant.get('Company Name') else '')
+        body = f"<p>quant_result {job['trade_date']}, sector: {_format(quant.get('Sector'))}</p>\n"
+        if 'png' in formats:
+            body += f"<img src=\"{html.escape(ticker)}.png\" alt=\"{html.escape(ticker)} charts\" width=\"800\">\n"
+        body += _table("quant_result", {key: value for key, value in quant.items()
+                                        if key not in ('Ticker', 'Company Name', 'Sector')})
+        body += _table("Momentum Indicators", job['summary'])
+        body += _table("Value Indicators", job['value'] or {'(no DB financials)': None})
+        with open(os.path.join(output_dir, f"{ticker}.html"), 'w', encoding='utf-8') as f:
+            f.write(_page(title, body))
+        files.append(f"{ticker}.html")
+    return files
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+        return {}
+
+def save_manifest(output_dir, manifest):
+    """manifest를 임시 파일에 쓴 뒤 교체"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def write_index(output_dir, trade_date, jobs, formats=FORMATS):
+    """순위표 index.html (종목 페이지 링크)"""
+    columns = ['Ticker', 'Company Name', 'Sector', 'Weighted Score', '6M Change', 'RSI', 'Sortino Ratio',
+               'Revenue Growth', 'Debt to Equity', 'PBR']
+    header = ''.join(f"<th>{html.escape(col)}</th>" for col in ['Rank'] + columns)
+    rows = []
+    for job in jobs:
+        cells = [str(job['rank'])]
+        for col in columns:
+            value = _format(job['quant'].get(col))
+            if col == 'Ticker' and 'html' in formats:
+                value = f"<a href=\"{html.escape(job['ticker'])}.html\">{value}</a>"
+            cells.append(value)
+        rows.append('<tr>' + ''.join(f"<td>{cell}</td>" for cell in cells) + '</tr>')
+    body = f"<table><tr>{header}</tr>\n" + '\n'.join(rows) + "\n</table>\n"
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(_page(f"quant_result top {len(jobs)} - {trade_date}", body))
+
+def generate_reports(trade_date=None, top_n=20, output_dir=None, workers=None, formats=FORMATS, force=False,
+                     panel=None):
+    """
+    quant_result 상위 종목의 리포트를 생성
+
+    Args:
+        trade_date (str or date): quant_result 날짜. None이면 가장 최근 날짜.
+        top_n (int): 종목 수.
+        output_dir (str): 출력 디렉터리. 기본값은 log/reports/<trade_date>.
+        workers (int): 렌더링 프로세스 수. 1 이하이면 현재 프로세스에서 그림.
+        formats (tuple): 'png', 'html' 중 생성할 형식.
+        force (bool): 입력이 같아도 다시 그림.
+        panel (pd.DataFrame): 이미 읽어 둔 가격 panel (load_report_jobs 참고).
+
+    Returns:
+        dict: trade_date, output_dir, rendered, skipped, failed (티커 목록).
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown or not formats:
+        raise ValueError(f"formats must be a non-empty subset of {FORMATS}")
+    formats = tuple(fmt for fmt in FORMATS if fmt in formats)
+
+    with metrics.timed('reports.load') as span:
+        trade_date, jobs = load_report_jobs(trade_date, top_n, panel)
+        span.rows = len(jobs)
+    if not jobs:
+        logger.warning("No quant_result rows to report")
+        return {'trade_date': None, 'output_dir': None, 'rendered': [], 'skipped': [], 'failed': []}
+
+    output_dir = output_dir or os.path.join('log', 'reports', trade_date.isoformat())
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    entries = manifest.setdefault('tickers', {})
+
+    pending, skipped = [], []
+    for job in jobs:
+        digest = input_hash(job)
+        entry = entries.get(job['ticker'], {})
+        up_to_date = (entry.get('hash') == digest and set(entry.get('formats', [])) >= set(formats) and
+                      all(os.path.exists(os.path.join(output_dir, name)) for name in entry.get('files', [])))
+        if up_to_date and not force:
+            skipped.append(job['ticker'])
+        else:
+            pending.append((job, digest))
+
+    rendered, failed = [], []
+    with metrics.timed('reports.render', rows=len(pending)):
+        if (workers is not None and workers <= 1) or len(pending) <= 1:
+            outcomes = []
+            for job, _ in pending:
+                try:
+                    outcomes.append(render_report(job, output_dir, formats))
+                except Exception as e:
+                    outcomes.append(e)
+        else:
+            workers = workers or min(4, os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                futures = [executor.submit(render_report, job, output_dir, formats) for job, _ in pending]
+                outcomes = []
+                for future in futures:
+                    try:
+                        outcomes.append(future.result())
+                    except Exception as e:
+                        outcomes.append(e)
+
+    for (job, digest), outcome in zip(pending, outcomes):
+        ticker = job['ticker']
+        if isinstance(outcome, Exception):
+            logger.error(f"Rendering report for {ticker} failed: {outcome}")
+            entries.pop(ticker, None)
+            failed.append(ticker)
+            continue
+        entries[ticker] = {'hash': digest, 'files': outcome, 'formats': list(formats),
+                           'rendered_at': datetime.now().isoformat(timespec='seconds')}
+        rendered.append(ticker)
+
+    manifest['trade_date'] = trade_date.isoformat()
+    manifest['render_version'] = RENDER_VERSION
+    save_manifest(output_dir, manifest)
+    write_index(output_dir, trade_date, jobs, formats)
+    logger.info(f"Reports for {trade_date} in {output_dir}: {len(rendered)} rendered, "
+                f"{len(skipped)} unchanged, {len(failed)} failed")
+    return {'trade_date': trade_date, 'output_dir': output_dir, 'rendered': rendered, 'skipped': skipped,
+            'failed': failed}
+
+def main():
+    parser = argparse.ArgumentParser(description="Render chart/HTML reports for the top quant_result tickers.")
+    parser.add_argument("--trade_date", type=str, default=None, help="quant_result date (default: latest)")
+    parser.add_argument("--top_n", type=int, default=20, help="Number of top tickers by Weighted Score")
+    parser.add_argument("--output_dir", type=str, default=None, help="Output directory (default: log/reports/<date>)")
+    parser.add_argument("--workers", type=int, default=None, help="Rendering processes (default: min(4, CPUs))")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS), help="Output formats")
+    parser.add_argument("--force", action="store_true", help="Re-render tickers whose inputs have not changed")
+    parser.add_argument("--metrics_output", type=str, default=None, help="Also write run metrics JSON to this path")
+    args = parser.parse_args()
+
+    with metrics.run('reports', output=args.metrics_output):
+        result = generate_reports(args.trade_date, args.top_n, args.output_dir, args.workers, tuple(args.formats),
+                                  args.force)
+    if result['failed']:
+        exit(1)
+
+if __name__ == "__main__":
+    main()
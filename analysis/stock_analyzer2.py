@@ -1,6 +1,8 @@
 import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from analysis.reports import draw_charts
 
 class StockAnalyzer:
     def __init__(self, ticker):
@@ -56,44 +58,24 @@ class StockAnalyzer:
             "Debt to Equity": self.info.get("debtToEquity", "N/A")
         }
 
-    def plot_charts(self):
-        """ 주가, RSI, 상승률 차트 그리기 """
+    def plot_charts(self, output=None):
+        """ 주가, RSI, 상승률 차트 그리기 (output 경로를 주면 화면 없이 PNG로 저장) """
         close_prices = self.history['Close']
         ma_60 = close_prices.rolling(window=60).mean()
         ma_200 = close_prices.rolling(window=200).mean()
 
-        _, rsi = self.get_momentum_indicators()
-        
-        # 최근 상승률 계산
-        returns = {
-            "1M Change": (close_prices.iloc[-1] - close_prices.iloc[-21]) / close_prices.iloc[-21] * 100,
-            "3M Change": (close_prices.iloc[-1] - close_prices.iloc[-63]) / close_prices.iloc[-63] * 100,
-            "6M Change": (close_prices.iloc[-1] - close_prices.iloc[-126]) / close_prices.iloc[-126] * 100,
-            "1Y Change": (close_prices.iloc[-1] - close_prices.iloc[0]) / close_prices.iloc[0] * 100
-        }
-
-        # 그래프 그리기
-        fig, axs = plt.subplots(3, 1, figsize=(10, 12))
-
-        # 📈 주가 차트
-        axs[0].plot(close_prices, label="Close Price", color="black")
-        axs[0].plot(ma_60, label="60-Day MA", linestyle="dashed", color="blue")
-        axs[0].plot(ma_200, label="200-Day MA", linestyle="dashed", color="red")
-        axs[0].set_title(f"{self.ticker} Stock Price with Moving Averages")
-        axs[0].legend()
-
-        # 📊 RSI 차트
-        axs[1].plot(rsi, label="RSI", color="purple")
-        axs[1].axhline(70, linestyle="dashed", color="red", alpha=0.5)
-        axs[1].axhline(30, linestyle="dashed", color="green", alpha=0.5)
-        axs[1].set_title(f"{self.ticker} RSI Indicator")
-        axs[1].legend()
+        # 지표는 한 번만 계산하고 상승률도 그 결과를 사용
+        indicators, rsi = self.get_momentum_indicators()
+        returns = {name: indicators[name] for name in ("1M Change", "3M Change", "6M Change", "1Y Change")}
 
-        # 📉 주가 상승률 바 차트
-        axs[2].bar(returns.keys(), returns.values(), color=["gray", "blue", "green", "red"])
-        axs[2].set_title(f"{self.ticker} Recent Returns (%)")
+        if output:
+            fig = Figure(figsize=(10, 12))
+            draw_charts(fig, self.ticker, close_prices, ma_60, ma_200, rsi, returns)
+            fig.savefig(output)
+            return output
 
-        plt.tight_layout()
+        fig = plt.figure(figsize=(10, 12))
+        draw_charts(fig, self.ticker, close_prices, ma_60, ma_200, rsi, returns)
         plt.show()
 
     def summarize(self):
@@ -0,0 +1,253 @@
+# analysis/walk_forward.py
+#
+# 과거 거래일마다 main.py를 다시 돌린 것과 같은 quant_result를 한 번에 생성
+#
+# 구간 전체 가격 panel을 한 번 읽고, 스크리닝 지표(평균 거래량, 유동성 일수, Sortino,
+# Price Increase Ratio)는 누적합 차이로 날짜마다 O(1)에 계산합니다. 183일 창을 날짜마다
+# 처음부터 다시 읽거나 계산하지 않고 한 세션씩 앞으로 밀기만 합니다. 모멘텀 지표와
+# 재무 지표는 스크리닝을 통과한 top_n 종목에 대해서만 계산하고, 결과는 batch_days일씩
+# bulk upsert로 저장합니다.
+#
+# main.py와 다른 점:
+#   - trade_date는 실행 시각이 아니라 지표를 계산한 거래일입니다.
+#   - 재무 지표는 그 거래일 시점 as-of 값만 쓰고 yfinance로 보충하지 않습니다
+#     (과거 날짜에 현재 값을 섞지 않도록). DB 기록이 없는 종목은 빠집니다.
+#
+#   python -m analysis.walk_forward --start_date 2024-01-02 --end_date 2024-12-31
+
+import argparse
+import time
+import logging
+import numpy as np
+import pandas as pd
+from data.data_fetcher import fetch_symbols_from_db, fetch_stock_panel_from_db, fetch_fundamentals_asof_from_db
+from data.data_saver import bulk_upsert
+from data.trading_calendar import get_trading_calendar
+from analysis.momentum_indicators import compute_momentum_matrix
+from analysis.financial_momentum import calculate_weighted_score, parse_weights, WEIGHT_KEYS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 183  # main.py 기본 구간 (달력일)
+
+def _prefix(values):
+    """행 방향 누적합 (맨 앞에 0행 추가: 구간 [s, t] 합 = P[t + 1] - P[s])"""
+    values = np.asarray(values, dtype='float64')
+    result = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=result[1:])
+    return result
+
+class RollingScreen:
+    """
+    fetch_momentum_screen_from_db(MOMENTUM_SCREEN_QUERY)와 같은 스크리닝을 panel의 모든 날짜에 대해 수행
+
+    일간 수익률은 종목별 직전 거래 대비이고, 구간 첫 거래일의 수익률(구간 밖 종가 대비)은
+    SQL의 LAG처럼 제외합니다.
+
+    Args:
+        close, volume (np.ndarray): (날짜 x 종목) 배열. 거래가 없는 칸은 NaN.
+        min_volume (float): 유동성 일수(거래량 >= min_volume) 기준.
+    """
+
+    def __init__(self, close, volume, min_volume, risk_free_rate=0.01/252):
+        self.close = np.asarray(close, dtype='float64')
+        self.risk_free_rate = risk_free_rate
+        rows = self.close.shape[0]
+        valid = np.isfinite(self.close)
+        volume = np.where(valid, np.nan_to_num(np.asarray(volume, dtype='float64')), 0.0)
+
+        # 직전 거래일 종가 (NaN 칸 건너뜀)
+        previous = pd.DataFrame(self.close).ffill().shift(1).to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.where(valid & (previous != 0), self.close / previous - 1, np.nan)
+        self.returns = np.where(np.isfinite(returns), returns, 0.0)
+        self.has_return = np.isfinite(returns)
+        self.downside = self.has_return & (self.returns < 0)
+        self.downside_square = np.where(self.downside, self.returns ** 2, 0.0)
+
+        self.p_obs = _prefix(valid)
+        self.p_volume = _prefix(volume)
+        liquid = valid & (volume >= min_volume)
+        self.p_liquid = _prefix(liquid)
+        self.p_liquid_volume = _prefix(np.where(liquid, volume, 0.0))
+        self.p_count = _prefix(self.has_return)
+        self.p_sum = _prefix(self.returns)
+        self.p_down = _prefix(self.downside)
+        self.p_down_square = _prefix(self.downside_square)
+
+        # 각 행 이후(포함) 첫 거래 행 (없으면 rows)
+        index = np.where(valid, np.arange(rows)[:, None], rows)
+        self.next_valid = np.minimum.accumulate(index[::-1], axis=0)[::-1]
+
+    def day(self, start, row):
+        """
+        start행부터 row행까지 구간의 종목별 스크리닝 지표
+
+        Returns:
+            dict: 'avg_volume', 'liquid_avg_volume', 'liquid_days', 'last_close', 'price_ratio', 'sortino',
+                  'return_count' 배열.
+        """
+        columns = np.arange(self.close.shape[1])
+        first = self.next_valid[start]
+        in_window = first <= row
+        first = np.minimum(first, row)
+        # 구간 첫 거래일의 수익률은 구간 밖 종가 대비라 제외
+        drop = in_window & self.has_return[first, columns]
+
+        def window(prefix, first_values):
+            return prefix[row + 1] - prefix[start] - np.where(drop, first_values, 0.0)
+
+        observations = self.p_obs[row + 1] - self.p_obs[start]
+        liquid_days = self.p_liquid[row + 1] - self.p_liquid[start]
+        count = window(self.p_count, 1.0)
+        total = window(self.p_sum, self.returns[first, columns])
+        down = window(self.p_down, self.downside[first, columns])
+        down_square = window(self.p_down_square, self.downside_square[first, columns])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_volume = (self.p_volume[row + 1] - self.p_volume[start]) / observations
+            liquid_avg_volume = (self.p_liquid_volume[row + 1] - self.p_liquid_volume[start]) / liquid_days
+            first_close = np.where(in_window, self.close[first, columns], np.nan)
+            last_close = self.close[row]
+            price_ratio = np.where(first_close != 0, (last_close - first_close) / first_close, np.nan)
+            downside_deviation = np.sqrt(down_square / down)
+            sortino = np.where(count < 2, np.nan,
+                               np.where((down > 0) & (downside_deviation > 0),
+                                        (total / count - self.risk_free_rate) / downside_deviation * np.sqrt(252),
+                                        0.0))
+        return {
+            'avg_volume': avg_volume,
+            'liquid_avg_volume': liquid_avg_volume,
+            'liquid_days': liquid_days,
+            'last_close': last_close,
+            'price_ratio': price_ratio,
+            'sortino': sortino,
+            'return_count': count,
+        }
+
+    def screen(self, start, row, sessions, min_volume, min_price, max_price, min_sortino, min_diff_ratio, top_n):
+        """통과 종목의 열 번호 (유동성 일 평균 거래량 내림차순, 최대 top_n개)와 지표"""
+        metrics = self.day(start, row)
+        with np.errstate(invalid='ignore'):
+            passed = ((metrics['liquid_days'] >= sessions * 0.9) &
+                      (metrics['avg_volume'] >= min_volume) &
+                      (metrics['last_close'] >= min_price) & (metrics['last_close'] <= max_price) &
+                      (metrics['price_ratio'] >= min_diff_ratio) &
+                      (metrics['sortino'] >= min_sortino))
+        picked = np.flatnonzero(passed)
+        picked = picked[np.argsort(-metrics['liquid_avg_volume'][picked], kind='stable')[:top_n]]
+        return picked, metrics
+
+def walk_forward(start_date, end_date, min_volume, min_price, max_price, min_sortino, min_diff_ratio, top_n,
+                 tickers=None, weights=None, window_days=WINDOW_DAYS, batch_days=20, save=True):
+    """
+    start_date ~ end_date의 거래일마다 quant_result 행을 계산하고 batch_days일씩 저장
+
+    Args:
+        tickers (iterable): 유니버스 (기본값: 전체 심볼).
+        weights (dict): calculate_weighted_score 가중치.
+        window_days (int): 지표 계산 구간 (달력일, main.py 기본값 183).
+        save (bool): False면 저장하지 않고 결과만 반환.
+
+    Returns:
+        tuple: (결과 DataFrame (trade_date 컬럼 포함), 저장 결과 합계 dict)
+    """
+    if tickers is None:
+        tickers = tuple(fetch_symbols_from_db()['symbol'])
+    calendar = get_trading_calendar()
+    start_ts, end_ts = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    load_start = pd.Timestamp(calendar.window_start(start_ts, window_days))
+    arrays = fetch_stock_panel_from_db(tickers, load_start, end_ts, as_arrays=True)
+    dates, names = arrays['dates'], arrays['tickers']
+    totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    if len(dates) == 0:
+        logger.warning(f"No price data between {load_start.date()} and {end_ts.date()}")
+        return pd.DataFrame(), totals
+
+    started = time.time()
+    screen = RollingScreen(arrays['Close'], arrays['Volume'], min_volume)
+    day_rows = np.flatnonzero(dates >= start_ts)
+    window_starts = calendar.window_start(dates.values, window_days)
+    start_rows = np.searchsorted(dates.values, window_starts.astype('datetime64[ns]'))
+    sessions = calendar.count_between(window_starts, dates.values)
+
+    frames, pending = [], []
+
+    def flush():
+        if not pending:
+            return
+        batch = pd.concat(pending, ignore_index=True)
+        pending.clear()
+        if save:
+            result = bulk_upsert('quant_result', batch)
+            for key, value in result.items():
+                totals[key] += value
+
+    for count, row in enumerate(day_rows, start=1):
+        trade_date = dates[row].date()
+        picked, metrics = screen.screen(start_rows[row], row, sessions[row], min_volume, min_price, max_price,
+                                        min_sortino, min_diff_ratio, top_n)
+        if picked.size:
+            momentum = compute_momentum_matrix(screen.close[start_rows[row]:row + 1, picked])
+            fundamentals = fetch_fundamentals_asof_from_db(names[picked], trade_date).reindex(names[picked])
+            day = pd.DataFrame({
+                'Ticker': names[picked],
+                '6M Change': momentum['6M Change'],
+                'RSI': momentum['RSI'],
+                'Revenue Growth': pd.to_numeric(fundamentals['Revenue Growth'], errors='coerce').to_numpy(),
+                'Debt to Equity': pd.to_numeric(fundamentals['Debt to Equity'], errors='coerce').to_numpy(),
+                'PBR': pd.to_numeric(fundamentals['PBR'], errors='coerce').to_numpy(),
+                'Sortino Ratio': metrics['sortino'][picked],
+                'Average Volume': metrics['avg_volume'][picked],
+            })
+            day = day[fundamentals['Recorded At'].notna().to_numpy()].reset_index(drop=True)
+            if not day.empty:
+                day['Weighted Score'] = calculate_weighted_score(day, weights)
+                day.insert(0, 'trade_date', trade_date)
+                frames.append(day)
+                pending.append(day)
+        if count % batch_days == 0:
+            flush()
+            logger.info(f"{count}/{len(day_rows)} trading days processed ({trade_date})")
+    flush()
+
+    logger.info(f"Walk-forward over {len(day_rows)} trading days finished in {time.time() - started:.1f}s")
+    result = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return result, totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild quant_result for every trading day in a date range.")
+    parser.add_argument("--start_date", type=str, required=True, help="First trading day to score (YYYY-MM-DD)")
+    parser.add_argument("--end_date", type=str, required=True, help="Last trading day to score (YYYY-MM-DD)")
+    parser.add_argument("--min_volume", type=int, default=10000000, help="Minimum trading volume")
+    parser.add_argument("--min_price", type=float, default=50, help="Minimum stock price")
+    parser.add_argument("--max_price", type=float, default=1000, help="Maximum stock price")
+    parser.add_argument("--min_sortino", type=float, default=-0.5, help="Minimum Sortino ratio")
+    parser.add_argument("--min_diff_ratio", type=float, default=0.2, help="Minimum price increase ratio")
+    parser.add_argument("--top_n", type=int, default=20, help="Number of top stocks per day")
+    parser.add_argument("--weights", nargs="+", metavar="NAME=VALUE", default=None,
+                        help=f"Override Weighted Score weights ({', '.join(WEIGHT_KEYS)})")
+    parser.add_argument("--tickers", nargs="+", default=None, help="Universe (default: every symbol)")
+    parser.add_argument("--batch_days", type=int, default=20, help="Trading days per bulk write")
+    parser.add_argument("--dry_run", action="store_true", help="Compute and print without writing quant_result")
+    args = parser.parse_args()
+
+    weights = None
+    if args.weights:
+        try:
+            weights = parse_weights(args.weights)
+        except ValueError as e:
+            parser.error(str(e))
+
+    result, totals = walk_forward(args.start_date, args.end_date, args.min_volume, args.min_price, args.max_price,
+                                  args.min_sortino, args.min_diff_ratio, args.top_n, tickers=args.tickers,
+                                  weights=weights, batch_days=args.batch_days, save=not args.dry_run)
+    if result.empty:
+        logger.error("No quant_result rows produced")
+        return
+    logger.info(f"{len(result)} rows over {result['trade_date'].nunique()} trading days, saved: {totals}")
+    print(result.groupby('trade_date').size().describe().to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/compare.py
+#
+# 두 benchmarks.suite 결과(JSON)의 단계별 시간 비교
+#
+#   python -m benchmarks.compare log/benchmarks/before.json log/benchmarks/after.json --threshold 0.1
+#
+# 단계별 median 시간 비율(after / before)을 출력하고, threshold보다 느려진 단계가 있으면
+# --fail_on_regression일 때 종료 코드 1로 끝납니다 (CI에서 사용).
+
+import argparse
+import json
+import sys
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare(before, after, threshold=0.1, metric='median_ms'):
+    """
+    공통 단계의 시간 비교
+
+    Returns:
+        list[dict]: 단계별 name, before, after, ratio, status ('regression', 'improvement', 'same', 'missing').
+    """
+    rows = []
+    names = list(before['results']) + [name for name in after['results'] if name not in before['results']]
+    for name in names:
+        old, new = before['results'].get(name), after['results'].get(name)
+        if not old or not new or not old.get(metric) or new.get(metric) is None:
+            rows.append({'name': name, 'before': (old or {}).get(metric), 'after': (new or {}).get(metric),
+                         'ratio': None, 'status': 'missing'})
+            continue
+        ratio = new[metric] / old[metric]
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'improvement'
+        else:
+            status = 'same'
+        rows.append({'name': name, 'before': old[metric], 'after': new[metric], 'ratio': ratio, 'status': status})
+    return rows
+
+def _describe(report):
+    meta = report['meta']
+    commit = (meta.get('commit') or '?')[:10] + ('+dirty' if meta.get('dirty') else '')
+    return f"{commit} {meta['preset']} ({meta['tickers']} tickers x {meta['years']}y, seed {meta['seed']})"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before", help="Baseline result JSON")
+    parser.add_argument("after", help="New result JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change reported as a regression")
+    parser.add_argument("--metric", choices=["median_ms", "min_ms", "per_call_ms", "seconds"], default="median_ms",
+                        help="Timing statistic to compare")
+    parser.add_argument("--fail_on_regression", action="store_true", help="Exit with status 1 on any regression")
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    print(f"before: {_describe(before)}")
+    print(f"after:  {_describe(after)}")
+    for key in ('tickers', 'years', 'seed', 'sample', 'repeat'):
+        if before['meta'].get(key) != after['meta'].get(key):
+            print(f"warning: {key} differs ({before['meta'].get(key)} vs {after['meta'].get(key)})")
+
+    rows = compare(before, after, threshold=args.threshold, metric=args.metric)
+    print(f"{'stage':38s} {'before':>12s} {'after':>12s} {'ratio':>7s}  status")
+    for row in rows:
+        old = f"{row['before']:.2f}" if row['before'] is not None else '-'
+        new = f"{row['after']:.2f}" if row['after'] is not None else '-'
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else '-'
+        print(f"{row['name']:38s} {old:>12s} {new:>12s} {ratio:>7s}  {row['status']}")
+
+    if args.fail_on_regression and any(row['status'] == 'regression' for row in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/explain_screener.py
+#
+# 기존 후보 선별(심볼 쿼리 + 종목별 가격 조회)과 SQL screener의 실행 계획/비용 비교
+#
+#   python -m benchmarks.explain_screener --end_date 2025-01-10 --output log/explain_screener.json
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from data.database import get_connection
+from data.data_fetcher import (MOMENTUM_SYMBOLS_QUERY, STOCK_DATA_QUERY, MOMENTUM_SCREEN_QUERY, fetch_stock_data_from_db,
+                               fetch_momentum_symbols_from_db, fetch_momentum_screen_from_db)
+
+def explain(cur, query, params):
+    """EXPLAIN (ANALYZE, BUFFERS)로 쿼리를 실행하고 주요 지표만 추림"""
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query.strip().rstrip(';'), params)
+    plan = cur.fetchone()[0][0]
+    root = plan['Plan']
+    return {
+        'planning_ms': plan.get('Planning Time', 0.0),
+        'execution_ms': plan.get('Execution Time', 0.0),
+        'rows': root.get('Actual Rows', 0),
+        'shared_hit_blocks': root.get('Shared Hit Blocks', 0),
+        'shared_read_blocks': root.get('Shared Read Blocks', 0),
+        'root_node': root.get('Node Type'),
+        'plan': plan,
+    }
+
+def summarize(name, results, wall_seconds):
+    return {
+        'flow': name,
+        'round_trips': len(results),
+        'planning_ms': sum(r['planning_ms'] for r in results),
+        'execution_ms': sum(r['execution_ms'] for r in results),
+        'shared_hit_blocks': sum(r['shared_hit_blocks'] for r in results),
+        'shared_read_blocks': sum(r['shared_read_blocks'] for r in results),
+        'wall_seconds': wall_seconds,
+    }
+
+def explain_legacy(cur, args, start_date, end_date):
+    params = (end_date, args.min_price, args.max_price, start_date, end_date,
+              args.volume, start_date, end_date, args.top_n)
+    results = [explain(cur, MOMENTUM_SYMBOLS_QUERY, params)]
+    cur.execute(MOMENTUM_SYMBOLS_QUERY, params)
+    for ticker, _ in cur.fetchall():
+        results.append(explain(cur, STOCK_DATA_QUERY, (ticker, start_date, end_date)))
+    return results
+
+def explain_screener(cur, args, start_date, end_date):
+    params = {
+        'start_date': start_date, 'end_date': end_date, 'min_volume': args.volume,
+        'min_price': args.min_price, 'max_price': args.max_price, 'min_sortino': args.min_sortino,
+        'min_diff_ratio': args.min_diff_ratio, 'top_n': args.top_n, 'risk_free_rate': 0.01 / 252
+    }
+    return [explain(cur, MOMENTUM_SCREEN_QUERY, params)]
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy momentum screening with the SQL screener")
+    parser.add_argument('--end_date', type=str, default=datetime.now().strftime('%Y-%m-%d'), help='End date (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, default=183, help='Lookback window in calendar days')
+    parser.add_argument('--volume', type=int, default=500000, help='Minimum volume')
+    parser.add_argument('--min_price', type=float, default=20, help='Minimum price')
+    parser.add_argument('--max_price', type=float, default=2000, help='Maximum price')
+    parser.add_argument('--min_sortino', type=float, default=1.0, help='Minimum Sortino ratio')
+    parser.add_argument('--min_diff_ratio', type=float, default=1.1, help='Minimum price increase ratio')
+    parser.add_argument('--top_n', type=int, default=100, help='Number of candidates')
+    parser.add_argument('--output', type=str, default=None, help='Write the comparison as JSON to this path')
+    parser.add_argument('--with_plans', action='store_true', help='Include full plan trees in the JSON output')
+    args = parser.parse_args()
+
+    end_date = args.end_date
+    start_date = (datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=args.days)).strftime('%Y-%m-%d')
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            legacy = explain_legacy(cur, args, start_date, end_date)
+            screener = explain_screener(cur, args, start_date, end_date)
+        conn.rollback()
+
+    # 실제 함수 호출 기준 wall time (결과 전송과 DataFrame 변환 포함)
+    tickers, legacy_wall = timed(fetch_momentum_symbols_from_db, start_date, end_date, args.volume,
+                                 args.min_price, args.max_price, args.top_n)
+    started = time.perf_counter()
+    for ticker in tickers:
+        fetch_stock_data_from_db(ticker, start_date, end_date)
+    legacy_wall += time.perf_counter() - started
+    screen, screener_wall = timed(fetch_momentum_screen_from_db, start_date, end_date, args.volume,
+                                  args.min_price, args.max_price, args.min_sortino, args.min_diff_ratio, args.top_n)
+
+    report = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'legacy': summarize('legacy', legacy, legacy_wall),
+        'screener': dict(summarize('screener', screener, screener_wall), candidates=len(screen)),
+    }
+    report['legacy']['candidates'] = len(tickers)
+    if args.with_plans:
+        report['legacy']['plans'] = [r['plan'] for r in legacy]
+        report['screener']['plans'] = [r['plan'] for r in screener]
+
+    for flow in ('legacy', 'screener'):
+        r = report[flow]
+        print(f"[{flow}] round_trips={r['round_trips']} planning={r['planning_ms']:.1f}ms "
+              f"execution={r['execution_ms']:.1f}ms buffers(hit/read)={r['shared_hit_blocks']}/{r['shared_read_blocks']} "
+              f"wall={r['wall_seconds']:.3f}s candidates={r['candidates']}")
+    print(f"screener root node: {screener[0]['root_node']}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Saved comparison to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# benchmarks/suite.py
+#
+# 파이프라인 단계별 성능 벤치마크
+#
+# 설정된 Postgres 서버(.env의 DB_*)에 일회용 데이터베이스를 만들어 schema를 적용하고,
+# 합성 OHLCV(benchmarks/synthetic.py)를 적재한 뒤 단계별 시간을 재서 JSON으로 저장합니다.
+# 끝나면 데이터베이스를 지웁니다 (--keep이면 유지). --pgserver DIR을 주면 pgserver 패키지로
+# 로컬 Postgres를 띄워서 사용합니다 (설치되어 있을 때만).
+#
+#   python -m benchmarks.suite --preset smoke
+#   python -m benchmarks.suite --preset full --output log/benchmarks/full.json
+#   python -m benchmarks.compare log/benchmarks/before.json log/benchmarks/after.json
+#
+# 측정 항목
+#   generate / save_stock_data_in_db      합성 데이터 생성, 전체 적재 (chunk 단위 bulk upsert)
+#   save_stock_data_in_db.unchanged       같은 chunk 재저장 (변경 없는 upsert)
+#   build_indexes                         screener/as-of 인덱스 생성 + VACUUM ANALYZE
+#   fetch_stock_data_from_db              표본 종목별 183일 조회
+#   get_momentum_indicators               표본 종목별 (캐시 비운 상태)
+#   calculate_sortino_ratio               표본 종목의 183일 수익률
+#   calculate_weighted_score              top_n 행 / 전체 종목 행 DataFrame
+#   rebuild_indicator_state               전 종목 indicator_state를 종료일 기준으로 생성
+#   main.py                               main.py 전체 실행 (별도 프로세스, 위에서 만든 indicator_state 사용)
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import logging
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import psycopg2
+import data.database as database
+import data.data_fetcher as fetch
+import data.data_saver as save
+from data.trading_calendar import get_trading_calendar
+from analysis.financial_momentum import calculate_weighted_score
+from analysis.indicator_state import rebuild_indicator_state
+from strategies.sortino_ratio import calculate_sortino_ratio
+from benchmarks.synthetic import (PRESETS, synthetic_tickers, synthetic_calendar, iter_ohlcv_chunks,
+                                  generate_ohlcv, generate_symbols, generate_fundamentals)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILES = ['create_stock_symbols.sql', 'create_stock_info.sql', 'create_stock_financials_history.sql',
+                'create_stock_data.sql', 'create_trading_days.sql', 'create_quant_result.sql',
+                'create_indicator_state.sql']
+INDEX_FILES = ['create_momentum_screener_indexes.sql', 'create_stock_financials_asof_index.sql']
+HOLIDAYS_DDL = "CREATE TABLE market_holidays (holiday_date DATE PRIMARY KEY);"
+WINDOW_DAYS = 183
+
+def sql_statements(path):
+    """SQL 파일을 문장 단위로 분리 (주석 줄 제외)"""
+    with open(path) as f:
+        lines = [line for line in f if not line.lstrip().startswith('--')]
+    return [statement.strip() for statement in ''.join(lines).split(';') if statement.strip()]
+
+def _admin_connect(dbname):
+    return psycopg2.connect(user=os.getenv('DB_USER'), password=os.getenv('DB_PASSWORD'),
+                            host=os.getenv('DB_HOST'), port=os.getenv('DB_PORT'), dbname=dbname)
+
+def run_sql_files(files):
+    conn = _admin_connect(os.getenv('DB_NAME'))
+    conn.autocommit = True  # VACUUM은 트랜잭션 밖에서 실행해야 함
+    try:
+        with conn.cursor() as cur:
+            for name in files:
+                for statement in sql_statements(os.path.join(ROOT, 'sql', name)):
+                    cur.execute(statement)
+    finally:
+        conn.close()
+
+def _reset_connections():
+    database.close_pool()
+    get_trading_calendar.cache_clear()
+
+@contextmanager
+def disposable_database(pgserver_dir=None, keep=False):
+    """
+    빈 벤치마크 데이터베이스를 만들고 DB_NAME을 그쪽으로 바꿈 (끝나면 삭제)
+
+    Yields:
+        str: 데이터베이스 이름.
+    """
+    saved_env = {key: os.environ.get(key) for key in ('DB_HOST', 'DB_USER', 'DB_PASSWORD', 'DB_PORT', 'DB_NAME')}
+    if pgserver_dir:
+        try:
+            import pgserver
+        except ImportError:
+            raise RuntimeError("--pgserver requires the pgserver package (pip install pgserver)")
+        pgserver.get_server(pgserver_dir, cleanup_mode=None)
+        os.environ.update({'DB_HOST': pgserver_dir, 'DB_USER': 'postgres', 'DB_PASSWORD': ''})
+        os.environ.pop('DB_PORT', None)
+
+    name = f"quant_bench_{os.getpid()}_{int(time.time())}"
+    admin_db = os.getenv('DB_ADMIN_NAME', 'postgres')
+    conn = _admin_connect(admin_db)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE DATABASE {name};")
+    conn.close()
+    os.environ['DB_NAME'] = name
+    _reset_connections()
+    logger.info(f"Created benchmark database {name}")
+    try:
+        run_sql_files(SCHEMA_FILES)
+        conn = _admin_connect(name)
+        with conn, conn.cursor() as cur:
+            cur.execute(HOLIDAYS_DDL)
+        conn.close()
+        yield name
+    finally:
+        _reset_connections()
+        if not keep:
+            conn = _admin_connect(admin_db)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"DROP DATABASE IF EXISTS {name};")
+            conn.close()
+            logger.info(f"Dropped benchmark database {name}")
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def measure(func, calls=1, rows=None):
+    """func(i)를 calls번 실행한 시간 통계"""
+    samples = []
+    for index in range(calls):
+        started = time.perf_counter()
+        func(index)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples, rows)
+
+def summarize(samples, rows=None):
+    result = {
+        'calls': len(samples),
+        'seconds': sum(samples),
+        'per_call_ms': sum(samples) / len(samples) * 1000 if samples else None,
+        'median_ms': statistics.median(samples) * 1000 if samples else None,
+        'min_ms': min(samples) * 1000 if samples else None,
+    }
+    if rows is not None:
+        result['rows'] = int(rows)
+        result['rows_per_second'] = rows / result['seconds'] if result['seconds'] else None
+    return result
+
+def git_revision():
+    """현재 commit과 작업 트리 변경 여부 (git이 없으면 None)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'diff', '--quiet', 'HEAD'], cwd=ROOT).returncode != 0
+        return {'commit': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+def load_market(tickers, trading_days, holidays, seed, chunk_size, results):
+    """합성 데이터를 생성해 적재 (생성 시간과 저장 시간을 따로 기록)"""
+    conn = _admin_connect(os.getenv('DB_NAME'))
+    with conn, conn.cursor() as cur:
+        cur.executemany("INSERT INTO market_holidays (holiday_date) VALUES (%s);", [(day,) for day in holidays])
+        symbols = generate_symbols(tickers)
+        cur.executemany(
+            "INSERT INTO stock_symbols (symbol, name, exchange, test_issue, etf, financial_status) "
+            "VALUES (%s, %s, %s, %s, %s, %s);",
+            list(symbols.itertuples(index=False, name=None)))
+    conn.close()
+    _reset_connections()
+
+    info, financials = generate_fundamentals(tickers, trading_days[0], seed=seed)
+    save.save_fundamentals_in_db(info, financials)
+
+    generate_samples, save_samples, total_rows = [], [], 0
+    chunks = iter_ohlcv_chunks(tickers, trading_days, seed=seed, chunk_size=chunk_size)
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        generate_samples.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        save.save_stock_data_in_db(chunk)
+        save_samples.append(time.perf_counter() - started)
+        total_rows += len(chunk)
+        logger.info(f"Loaded {total_rows} rows")
+    results['generate'] = summarize(generate_samples, total_rows)
+    results['save_stock_data_in_db'] = summarize(save_samples, total_rows)
+    return total_rows
+
+def run_suite(preset='smoke', tickers=None, years=None, seed=0, end_date=None, sample=50, repeat=5,
+              chunk_size=500, pgserver_dir=None, keep=False, run_main=True):
+    """
+    합성 데이터베이스에서 단계별 벤치마크를 실행
+
+    Returns:
+        dict: 'meta'(preset, 규모, git commit, 환경)와 'results'(단계 이름 -> 시간 통계).
+    """
+    count, span = PRESETS[preset]
+    count, span = tickers or count, years or span
+    # get_momentum_indicators는 오늘 기준 183일을 읽으므로 기본 종료일은 어제
+    end = pd.Timestamp(end_date or date.today() - timedelta(days=1))
+    start = end - pd.DateOffset(years=span) + timedelta(days=1)
+    calendar, holidays, trading_days = synthetic_calendar(start, end)
+    names = synthetic_tickers(count)
+    rng = np.random.default_rng(seed)
+    sampled = list(rng.choice(names, size=min(sample, count), replace=False))
+
+    results = {}
+    meta = {
+        'preset': preset, 'tickers': count, 'years': span, 'seed': seed,
+        'start_date': str(trading_days[0].date()), 'end_date': str(trading_days[-1].date()),
+        'trading_days': len(trading_days), 'sample': len(sampled), 'repeat': repeat,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        **git_revision(),
+        'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+        'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+    }
+
+    saved_cache_dir = os.environ.pop('PRICE_CACHE_DIR', None)  # DB 조회 경로를 잼
+    try:
+        with disposable_database(pgserver_dir, keep=keep) as name:
+            meta['database'] = name
+            meta['rows'] = load_market(names, trading_days, holidays, seed, chunk_size, results)
+
+            first_chunk = generate_ohlcv(names[:chunk_size], trading_days, seed=seed)
+            results['save_stock_data_in_db.unchanged'] = measure(
+                lambda _: save.save_stock_data_in_db(first_chunk), rows=len(first_chunk))
+            results['build_indexes'] = measure(lambda _: run_sql_files(INDEX_FILES))
+
+            window_end = trading_days[-1]
+            window_start = window_end - timedelta(days=WINDOW_DAYS)
+            frames = {}
+
+            def fetch_one(index):
+                ticker = sampled[index % len(sampled)]
+                frames[ticker] = fetch.fetch_stock_data_from_db(ticker, window_start, window_end)
+            results['fetch_stock_data_from_db'] = measure(fetch_one, calls=len(sampled))
+
+            def momentum_one(index):
+                fetch.get_momentum_indicators.cache_clear()
+                fetch.get_momentum_indicators(sampled[index % len(sampled)])
+            results['get_momentum_indicators'] = measure(momentum_one, calls=len(sampled))
+
+            returns = [frame['Close'].pct_change().dropna() for frame in frames.values()]
+            results['calculate_sortino_ratio'] = measure(
+                lambda index: calculate_sortino_ratio(returns[index % len(returns)]),
+                calls=len(returns) * repeat)
+
+            score_rng = np.random.default_rng(seed)
+            columns = ['6M Change', 'RSI', 'Revenue Growth', 'Debt to Equity', 'PBR', 'Sortino Ratio',
+                       'Average Volume']
+            for label, size in (('top_n', 20), ('universe', count)):
+                frame = pd.DataFrame(score_rng.random((size, len(columns))), columns=columns)
+                results[f'calculate_weighted_score.{label}'] = measure(
+                    lambda _: calculate_weighted_score(frame), calls=repeat, rows=size)
+
+            # 운영과 같이 save_daily_data가 갱신해 둔 상태를 main.py가 읽도록 종료일 기준으로 생성
+            results['rebuild_indicator_state'] = measure(
+                lambda _: rebuild_indicator_state(window_end), rows=count)
+
+            if run_main:
+                results['main.py'] = run_main_flow(window_start, window_end)
+    finally:
+        if saved_cache_dir is not None:
+            os.environ['PRICE_CACHE_DIR'] = saved_cache_dir
+    return {'meta': meta, 'results': results}
+
+def run_main_flow(start_date, end_date):
+    """main.py 전체 실행 시간 (벤치마크 데이터베이스를 보도록 환경 변수 전달)"""
+    command = [sys.executable, os.path.join(ROOT, 'main.py'),
+               '--start_date', str(start_date.date()), '--end_date', str(end_date.date()),
+               '--min_volume', '100000', '--min_price', '1', '--max_price', '100000',
+               '--min_sortino', '-100', '--min_diff_ratio', '-1', '--top_n', '20']
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, env=dict(os.environ), capture_output=True, text=True)
+    result = summarize([time.perf_counter() - started])
+    result['returncode'] = completed.returncode
+    if completed.returncode != 0:
+        logger.error(f"main.py failed:\n{completed.stderr[-2000:]}")
+    with database.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM quant_result;")
+            result['rows'] = cur.fetchone()[0]
+    return result
+
+def default_output(report):
+    commit = (report['meta'].get('commit') or 'nogit')[:10]
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join('log', 'benchmarks', f"{report['meta']['preset']}_{commit}_{stamp}.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on a disposable synthetic database.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="smoke",
+                        help="Market size: " + ", ".join(f"{k}={t} tickers x {y}y" for k, (t, y) in PRESETS.items()))
+    parser.add_argument("--tickers", type=int, default=None, help="Override the preset ticker count")
+    parser.add_argument("--years", type=int, default=None, help="Override the preset number of years")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parser.add_argument("--end_date", type=str, default=None, help="Last synthetic day (default: yesterday)")
+    parser.add_argument("--sample", type=int, default=50, help="Tickers timed by the per-ticker stages")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions for the in-memory stages")
+    parser.add_argument("--chunk_size", type=int, default=500, help="Tickers per generated/saved chunk")
+    parser.add_argument("--pgserver", type=str, default=None, metavar="DIR",
+                        help="Start a local Postgres with the pgserver package in DIR instead of using DB_*")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark database afterwards")
+    parser.add_argument("--skip_main", action="store_true", help="Do not run main.py end to end")
+    parser.add_argument("--output", type=str, default=None, help="JSON result path (default: log/benchmarks/...)")
+    args = parser.parse_args()
+
+    report = run_suite(args.preset, tickers=args.tickers, years=args.years, seed=args.seed, end_date=args.end_date,
+                       sample=args.sample, repeat=args.repeat, chunk_size=args.chunk_size,
+                       pgserver_dir=args.pgserver, keep=args.keep, run_main=not args.skip_main)
+
+    output = args.output or default_output(report)
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    for name, result in report['results'].items():
+        rows = f" rows={result['rows']}" if 'rows' in result else ''
+        print(f"{name:38s} calls={result['calls']:<5d} total={result['seconds']:.3f}s "
+              f"median={result['median_ms']:.2f}ms{rows}")
+    print(f"Saved benchmark results to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/synthetic.py
+#
+# 벤치마크용 결정적(deterministic) 합성 시장 데이터
+#
+# 같은 seed면 종목 수나 chunk 크기와 관계없이 종목별로 같은 가격이 나옵니다
+# (종목마다 독립된 난수 스트림 사용). 가격은 일간 로그 수익률 random walk이고,
+# 약 0.2% 확률로 거래가 없는 날(거래 정지)이 섞입니다.
+
+from datetime import date
+import numpy as np
+import pandas as pd
+from data.trading_calendar import TradingCalendar
+
+# 이름: (종목 수, 연수)
+PRESETS = {
+    'smoke': (50, 1),
+    'small': (500, 2),
+    'medium': (2000, 5),
+    'full': (7000, 10),
+}
+
+MISSING_RATE = 0.002
+
+def synthetic_tickers(count):
+    return [f"S{index:05d}" for index in range(count)]
+
+def synthetic_holidays(first_year, last_year):
+    """고정일 휴장일 (신정, 독립기념일, 성탄절 중 평일)"""
+    days = [date(year, month, day) for year in range(first_year, last_year + 1)
+            for month, day in ((1, 1), (7, 4), (12, 25))]
+    return [day for day in days if day.weekday() < 5]
+
+def synthetic_calendar(start_date, end_date):
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    holidays = synthetic_holidays(start.year, end.year)
+    calendar = TradingCalendar(holidays)
+    return calendar, holidays, pd.DatetimeIndex(calendar.trading_days_between(start, end))
+
+def _ticker_rng(seed, index):
+    return np.random.default_rng([seed, index])
+
+def generate_ohlcv(tickers, trading_days, seed=0, offset=0):
+    """
+    종목별 OHLCV를 save_stock_data_in_db 입력 형식(long format)으로 생성
+
+    Args:
+        tickers (list): 종목 이름.
+        trading_days (pd.DatetimeIndex): 거래일.
+        seed (int): 난수 seed.
+        offset (int): tickers[0]의 전체 종목 내 번호 (chunk 단위 생성 시 난수 스트림 고정용).
+
+    Returns:
+        pd.DataFrame: ticker, trade_date, open, high, low, close, volume
+    """
+    days = len(trading_days)
+    frames = []
+    for position, ticker in enumerate(tickers):
+        rng = _ticker_rng(seed, offset + position)
+        drift = rng.normal(0.0004, 0.0006)
+        volatility = rng.uniform(0.01, 0.04)
+        start_price = np.exp(rng.uniform(np.log(5), np.log(800)))
+        returns = rng.normal(drift, volatility, days)
+        close = np.round(start_price * np.exp(np.cumsum(returns)), 2).clip(0.01, 9.9e7)
+        spread = np.abs(rng.normal(0, volatility / 2, (3, days)))
+        open_price = np.round(close * (1 + rng.normal(0, volatility / 3, days)), 2).clip(0.01, 9.9e7)
+        high = np.round(np.maximum(open_price, close) * (1 + spread[0]), 2).clip(0.01, 9.9e7)
+        low = np.round(np.minimum(open_price, close) * (1 - spread[1]), 2).clip(0.01, 9.9e7)
+        volume = np.round(np.exp(rng.normal(np.log(rng.uniform(2e5, 2e7)), 0.5, days))).astype('int64')
+        traded = rng.random(days) >= MISSING_RATE
+        frames.append(pd.DataFrame({
+            'ticker': ticker,
+            'trade_date': trading_days[traded],
+            'open': open_price[traded],
+            'high': high[traded],
+            'low': low[traded],
+            'close': close[traded],
+            'volume': volume[traded],
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['ticker', 'trade_date', 'open', 'high', 'low', 'close', 'volume'])
+    return pd.concat(frames, ignore_index=True)
+
+def iter_ohlcv_chunks(tickers, trading_days, seed=0, chunk_size=500):
+    """종목 chunk_size개씩 generate_ohlcv 결과를 생성 (전체를 메모리에 올리지 않음)"""
+    for offset in range(0, len(tickers), chunk_size):
+        yield generate_ohlcv(tickers[offset:offset + chunk_size], trading_days, seed=seed, offset=offset)
+
+def generate_symbols(tickers):
+    """fetch_symbols_from_db 조건을 통과하는 stock_symbols 행"""
+    return pd.DataFrame({
+        'symbol': tickers,
+        'name': [f"Synthetic {ticker}" for ticker in tickers],
+        'exchange': ['NASDAQ' if index % 2 else 'NYSE' for index in range(len(tickers))],
+        'test_issue': False,
+        'etf': False,
+        'financial_status': 'N',
+    })
+
+def generate_fundamentals(tickers, recorded_at, seed=0):
+    """
+    stock_info와 stock_financials_history 행 (recorded_at 하루치)
+
+    모든 종목에 재무 기록이 있으므로 fetch_stock_analysis가 yfinance로 보충하지 않습니다.
+    """
+    rng = np.random.default_rng([seed, len(tickers), 1])
+    count = len(tickers)
+    info = pd.DataFrame({
+        'ticker': tickers,
+        'company_name': [f"Synthetic {ticker}" for ticker in tickers],
+        'industry': 'Synthetic',
+        'sector': 'Synthetic',
+        'market_cap': np.round(np.exp(rng.uniform(np.log(5e7), np.log(5e11), count))).astype('int64'),
+        'currency': 'USD',
+    })
+    financials = pd.DataFrame({
+        'ticker': tickers,
+        'recorded_at': pd.Timestamp(recorded_at).date(),
+        'trailing_pe': np.round(rng.uniform(5, 60, count), 4),
+        'forward_pe': np.round(rng.uniform(5, 50, count), 4),
+        'book_value': np.round(rng.uniform(1, 100, count), 4),
+        'price_to_book': np.round(rng.uniform(0.5, 15, count), 4),
+        'earnings_growth': np.round(rng.normal(0.05, 0.2, count), 4),
+        'revenue_growth': np.round(rng.normal(0.08, 0.15, count), 4),
+        'return_on_assets': np.round(rng.normal(0.05, 0.05, count), 4),
+        'return_on_equity': np.round(rng.normal(0.12, 0.1, count), 4),
+        'debt_to_equity': np.round(rng.uniform(0, 250, count), 4),
+    })
+    return info, financials
@@ -3,27 +3,33 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import pytz
 from psycopg2.extras import RealDictCursor
 from data.database import get_connection
-from functools import lru_cache
+import data.trading_calendar as trading_calendar
+import data.parquet_cache as parquet_cache
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-import time
+from data.rate_limiter import yfinance_limiter, is_throttle_error
+from utils.cache import ttl_cache
+from utils import metrics
+from utils.factors import FactorGraph, frame_factors
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def fetch_stock_data_from_db(symbol, start_date, end_date):
-    if not isinstance(start_date, (str, datetime)) or not isinstance(end_date, (str, datetime)):
-        raise ValueError("start_date and end_date must be strings or datetime objects")
-    if isinstance(start_date, datetime):
-        start_date = start_date.strftime('%Y-%m-%d')
-    if isinstance(end_date, datetime):
-        end_date = end_date.strftime('%Y-%m-%d')
-    
-    query = """
+# 종목 단위 조회 캐시: (티커, 기준일) 키, 전체 유니버스가 들어갈 크기
+CACHE_MAXSIZE = 10000
+
+# yfinance history 요청 하나의 최대 대기 시간(초)
+YFINANCE_TIMEOUT = 10
+
+# get_momentum_indicators 결과 (analysis.momentum_indicators.MOMENTUM_COLUMNS와 같은 순서)
+MOMENTUM_FACTORS = ["RSI", "52W High Ratio", "60-Day MA", "200-Day MA",
+                    "1M Change", "3M Change", "6M Change", "1Y Change"]
+
+STOCK_DATA_QUERY = """
     SELECT trade_date as Trade_date,
            open_price as Open,
            high_price as High,
@@ -32,7 +38,29 @@ def fetch_stock_data_from_db(symbol, start_date, end_date):
            volume as Volume
     FROM stock_data
     WHERE ticker = %s AND trade_date BETWEEN %s AND %s;
-    """
+"""
+
+@metrics.instrument('db.stock_data', rows=metrics.row_count)
+def fetch_stock_data_from_db(symbol, start_date, end_date):
+    if not isinstance(start_date, (str, datetime)) or not isinstance(end_date, (str, datetime)):
+        raise ValueError("start_date and end_date must be strings or datetime objects")
+    if isinstance(start_date, datetime):
+        start_date = start_date.strftime('%Y-%m-%d')
+    if isinstance(end_date, datetime):
+        end_date = end_date.strftime('%Y-%m-%d')
+
+    if parquet_cache.enabled():
+        try:
+            data = _prices_from_cache([symbol], start_date, end_date)
+        except Exception as e:
+            logger.warning(f"Price cache read failed for {symbol}, falling back to DB: {e}")
+        else:
+            if data.empty:
+                logger.info(f"No data found for {symbol} between {start_date} and {end_date}")
+                return pd.DataFrame(columns=['Trade_date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+            return data.drop(columns='Ticker').set_index('Trade_date')
+
+    query = STOCK_DATA_QUERY
     try:
         with get_connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -50,6 +78,130 @@ def fetch_stock_data_from_db(symbol, start_date, end_date):
         logger.error(f"Query Execution error for {symbol}: {e}")
         return pd.DataFrame(columns=['Trade_date', 'Open', 'High', 'Low', 'Close', 'Volume'])
 
+PANEL_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def _prices_from_cache(tickers, start_date, end_date):
+    """parquet_cache 결과를 DB 조회와 같은 컬럼 이름으로 변환"""
+    data = parquet_cache.read_prices(tickers, start_date, end_date)
+    return data.rename(columns={'ticker': 'Ticker', 'trade_date': 'Trade_date', 'open': 'Open', 'high': 'High',
+                                'low': 'Low', 'close': 'Close', 'volume': 'Volume'})
+
+def fetch_stock_panel_from_db(tickers, start_date, end_date, as_arrays=False):
+    """
+    여러 종목의 OHLCV를 한 번의 쿼리로 조회
+
+    Args:
+        tickers (iterable): 조회할 티커 목록.
+        start_date (str or datetime): 시작일 (포함).
+        end_date (str or datetime): 종료일 (포함).
+        as_arrays (bool): True면 panel_to_arrays 결과(dict)를 반환.
+
+    Returns:
+        pd.DataFrame: (Ticker, Trade_date) MultiIndex, PANEL_FIELDS 컬럼의 long-format DataFrame.
+    """
+    if not isinstance(start_date, (str, date)) or not isinstance(end_date, (str, date)):
+        raise ValueError("start_date and end_date must be strings or date objects")
+    if isinstance(start_date, date):
+        start_date = start_date.strftime('%Y-%m-%d')
+    if isinstance(end_date, date):
+        end_date = end_date.strftime('%Y-%m-%d')
+    tickers = list(dict.fromkeys(tickers))
+
+    query = """
+    SELECT ticker,
+           trade_date,
+           open_price::float8,
+           high_price::float8,
+           low_price::float8,
+           close_price::float8,
+           volume
+    FROM stock_data
+    WHERE ticker = ANY(%s) AND trade_date BETWEEN %s AND %s
+    ORDER BY ticker, trade_date;
+    """
+    panel = None
+    if parquet_cache.enabled():
+        try:
+            with metrics.timed('cache.stock_panel') as span:
+                panel = _prices_from_cache(tickers, start_date, end_date)
+                span.rows = len(panel)
+        except Exception as e:
+            logger.warning(f"Price cache read failed, falling back to DB: {e}")
+    if panel is None:
+        rows = []
+        try:
+            with metrics.timed('db.stock_panel') as span, get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (tickers, start_date, end_date))
+                    rows = cur.fetchall()
+                    span.rows = len(rows)
+        except Exception as e:
+            logger.error(f"Panel query execution error for {len(tickers)} tickers: {e}")
+        panel = pd.DataFrame(rows, columns=['Ticker', 'Trade_date'] + PANEL_FIELDS)
+
+    panel['Trade_date'] = pd.to_datetime(panel['Trade_date'])
+    panel['Volume'] = panel['Volume'].astype('float64')
+    panel = panel.set_index(['Ticker', 'Trade_date'])
+    if panel.empty:
+        logger.info(f"No panel data found for {len(tickers)} tickers between {start_date} and {end_date}")
+    return panel_to_arrays(panel, tickers) if as_arrays else panel
+
+def panel_to_arrays(panel, tickers=None, fields=PANEL_FIELDS):
+    """
+    long-format panel을 (날짜 x 종목) 2차원 NumPy 배열로 변환
+
+    Returns:
+        dict: 'dates'(DatetimeIndex), 'tickers'(Index), 필드별 float64 ndarray.
+              데이터가 없는 칸은 NaN.
+    """
+    if tickers is None:
+        tickers = panel.index.get_level_values('Ticker').unique()
+    dates = panel.index.get_level_values('Trade_date').unique().sort_values()
+    arrays = {'dates': dates, 'tickers': pd.Index(tickers, name='Ticker')}
+    for field in fields:
+        wide = panel[field].unstack('Ticker').reindex(index=dates, columns=arrays['tickers'])
+        arrays[field] = wide.to_numpy(dtype='float64')
+    return arrays
+
+def slice_stock_panel(panel, ticker):
+    """panel에서 한 종목을 fetch_stock_data_from_db와 같은 형태로 꺼냄"""
+    try:
+        return panel.xs(ticker, level='Ticker')
+    except KeyError:
+        return pd.DataFrame(columns=PANEL_FIELDS, index=pd.DatetimeIndex([], name='Trade_date'))
+
+@metrics.instrument('db.missing_days', rows=metrics.row_count)
+def fetch_missing_days_from_db(tickers, trading_days):
+    """
+    종목별로 stock_data에 없는 거래일 조회
+
+    Args:
+        tickers (iterable): 확인할 티커 목록.
+        trading_days (iterable): 있어야 하는 거래일 목록.
+
+    Returns:
+        pd.DataFrame: 누락된 (ticker, trade_date) 쌍.
+    """
+    query = """
+        SELECT t.ticker, d.trade_date
+        FROM unnest(%s::text[]) AS t(ticker)
+        CROSS JOIN unnest(%s::date[]) AS d(trade_date)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM stock_data s
+            WHERE s.ticker = t.ticker AND s.trade_date = d.trade_date
+        )
+        ORDER BY t.ticker, d.trade_date;
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, (list(tickers), list(trading_days)))
+                return pd.DataFrame(cur.fetchall(), columns=['ticker', 'trade_date'])
+    except Exception as e:
+        logger.error(f"Query Execution error: {e}")
+        raise
+
+@metrics.instrument('db.holidays', rows=metrics.row_count)
 def fetch_holidays_from_db(year):
     query = """
         SELECT holiday_date
@@ -68,32 +220,50 @@ def fetch_holidays_from_db(year):
         logger.error(f"Query Execution error: {e}")
         return []
 
+@metrics.instrument('db.holidays', rows=metrics.row_count)
+def fetch_all_holidays_from_db():
+    """전체 휴장일 목록. 조회 실패는 빈 목록 대신 예외로 올려 휴장일 없는 달력이 캐시되지 않게 함"""
+    query = """
+        SELECT holiday_date
+        FROM market_holidays
+        ORDER BY holiday_date;
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query)
+                return [row[0] for row in cur.fetchall()]
+    except Exception as e:
+        logger.error(f"Query Execution error: {e}")
+        raise
+
+@metrics.instrument('db.recent_trading_days')
 def fetch_recent_trading_days_from_db(days=183):  # 6개월로 변경
+    # trading_days(PK trade_date)에서 역순 index scan, 주말/공휴일 판정은 TradingCalendar가 담당
     query = """
-        SELECT MIN(trade_date) AS start_date,
-               MAX(trade_date) AS end_date
-        FROM (
-            SELECT DISTINCT trade_date
-            FROM stock_data
-            WHERE trade_date NOT IN (SELECT holiday_date FROM market_holidays)
-            AND EXTRACT(DOW FROM trade_date) NOT IN (0, 6)
-            ORDER BY trade_date DESC
-            LIMIT %s
-        ) sub;
+        SELECT trade_date
+        FROM trading_days
+        ORDER BY trade_date DESC
+        LIMIT %s;
     """
     try:
         with get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(query, (days,))
-                result = cur.fetchone()
-                return {"start_date": result[0], "end_date": result[1]} if result else {}
+                cur.execute(query, (days + 10,))
+                dates = [row[0] for row in cur.fetchall()]
+        if not dates:
+            return {}
+        dates = np.array(dates, dtype='datetime64[D]')
+        dates = dates[trading_calendar.get_trading_calendar().is_trading_day(dates)][:days]
+        return {"start_date": dates[-1].astype(object), "end_date": dates[0].astype(object)} if len(dates) else {}
     except Exception as e:
         logger.error(f"Query Execution error: {e}")
         return {}
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), 
-       retry=retry_if_exception_type(Exception))
-def fetch_stock_data_from_yfinance(ticker, start_date, end_date):
+       retry=retry_if_exception_type(Exception), before_sleep=metrics.record_retry)
+@metrics.instrument('yfinance.history', rows=metrics.row_count)
+def fetch_stock_data_from_yfinance(ticker, start_date, end_date, timeout=YFINANCE_TIMEOUT):
     if not isinstance(start_date, (str, datetime)) or not isinstance(end_date, (str, datetime)):
         raise ValueError("start_date and end_date must be strings or datetime objects")
     if isinstance(start_date, datetime):
@@ -102,8 +272,7 @@ def fetch_stock_data_from_yfinance(ticker, start_date, end_date):
         end_date = end_date.strftime('%Y-%m-%d')
     
     try:
-        data = yf.Ticker(ticker).history(start=start_date, end=end_date)
-        time.sleep(0.5)
+        data = yfinance_limiter.call(yf.Ticker(ticker).history, start=start_date, end=end_date, timeout=timeout)
         if data.empty:
             logger.info(f"No data available for {ticker} between {start_date} and {end_date}")
             return pd.DataFrame()
@@ -117,6 +286,124 @@ def fetch_stock_data_from_yfinance(ticker, start_date, end_date):
         logger.error(f"Unexpected error for {ticker}: {e}")
         raise
 
+PRICE_COLUMNS = ['ticker', 'trade_date', 'open', 'high', 'low', 'close', 'volume']
+
+class _YFinanceErrorCollector(logging.Handler):
+    """yf.download가 남기는 ERROR 로그 중 요청한 티커에 대한 메시지만 모음"""
+
+    def __init__(self, tickers):
+        super().__init__(level=logging.ERROR)
+        self.tickers = list(tickers)
+        self.messages = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        # 다른 스레드의 동시 다운로드 로그는 제외
+        if any(ticker in message for ticker in self.tickers):
+            self.messages.append(message)
+
+class YFinanceProvider:
+    """yf.download 기반 다중 종목 가격 provider
+
+    provider는 (tickers, start_date, end_date)를 받아 PRICE_COLUMNS 형태의
+    long-format DataFrame을 돌려주는 callable이면 무엇이든 됩니다.
+    """
+
+    def __init__(self, threads=True):
+        self.threads = threads
+
+    def __call__(self, tickers, start_date, end_date):
+        # yf.download는 종목별 오류를 삼키고 'yfinance' logger에 ERROR로만 남기므로 호출 동안 수집
+        errors = _YFinanceErrorCollector(tickers)
+        yf_logger = logging.getLogger('yfinance')
+        yf_logger.addHandler(errors)
+        try:
+            data = yfinance_limiter.call(yf.download, list(tickers), start=start_date, end=end_date,
+                                         group_by='ticker', auto_adjust=True, threads=self.threads, progress=False)
+        finally:
+            yf_logger.removeHandler(errors)
+        # 제한 오류가 있었다면 limiter에 알리고 재시도
+        throttled = [message for message in errors.messages if is_throttle_error(message)]
+        if throttled:
+            yfinance_limiter.record_throttle()
+            raise RuntimeError(f"Rate limited while downloading {len(tickers)} tickers: {throttled[0]}")
+        if data is None or data.empty:
+            return pd.DataFrame(columns=PRICE_COLUMNS)
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([[tickers[0]], data.columns])
+        data = data.stack(level=0, future_stack=True)
+        data.index.names = ['trade_date', 'ticker']
+        data = data.reset_index()[['ticker', 'trade_date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+        data.columns = PRICE_COLUMNS
+        return data
+
+class DataFrameProvider:
+    """미리 준비된 long-format DataFrame을 잘라서 돌려주는 provider (네트워크 없이 batch 조회를 시험할 때 사용)"""
+
+    def __init__(self, frame):
+        self.frame = frame.copy()
+        self.frame['trade_date'] = pd.to_datetime(self.frame['trade_date'])
+
+    def __call__(self, tickers, start_date, end_date):
+        frame = self.frame
+        mask = (frame['ticker'].isin(tickers) &
+                (frame['trade_date'] >= pd.to_datetime(start_date)) &
+                (frame['trade_date'] < pd.to_datetime(end_date)))
+        return frame.loc[mask, PRICE_COLUMNS]
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),
+       retry=retry_if_exception_type(Exception), before_sleep=metrics.record_retry)
+@metrics.instrument('yfinance.download', rows=metrics.row_count)
+def _fetch_price_chunk(provider, tickers, start_date, end_date):
+    return provider(tickers, start_date, end_date)
+
+def fetch_stock_data_batch(tickers, start_date, end_date, chunk_size=200, provider=None):
+    """여러 종목의 가격 데이터를 chunk 단위로 한 번에 조회
+
+    Args:
+        tickers (iterable): 조회할 티커 목록.
+        start_date (str or datetime): 시작일 (포함).
+        end_date (str or datetime): 종료일 (미포함, yfinance 규칙).
+        chunk_size (int): 한 번의 요청에 담을 티커 수.
+        provider (callable): 가격 provider. 기본값은 YFinanceProvider.
+
+    Returns:
+        pd.DataFrame: PRICE_COLUMNS 컬럼의 long-format DataFrame.
+    """
+    if not isinstance(start_date, (str, date)) or not isinstance(end_date, (str, date)):
+        raise ValueError("start_date and end_date must be strings or date objects")
+    if isinstance(start_date, date):
+        start_date = start_date.strftime('%Y-%m-%d')
+    if isinstance(end_date, date):
+        end_date = end_date.strftime('%Y-%m-%d')
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    provider = provider or YFinanceProvider()
+    tickers = list(dict.fromkeys(tickers))
+    frames = []
+    for offset in range(0, len(tickers), chunk_size):
+        chunk = tickers[offset:offset + chunk_size]
+        try:
+            frame = _fetch_price_chunk(provider, chunk, start_date, end_date)
+        except Exception as e:
+            logger.error(f"Batch fetch failed for {len(chunk)} tickers ({chunk[0]}..{chunk[-1]}): {e}")
+            continue
+        if frame is not None and not frame.empty:
+            frames.append(frame)
+
+    if not frames:
+        logger.info(f"No data available for {len(tickers)} tickers between {start_date} and {end_date}")
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+
+    data = pd.concat(frames, ignore_index=True).dropna()
+    data['trade_date'] = pd.to_datetime(data['trade_date'])
+    if data['trade_date'].dt.tz is not None:
+        data['trade_date'] = data['trade_date'].dt.tz_localize(None)
+    data['volume'] = data['volume'].astype('int64')
+    return data.sort_values(['ticker', 'trade_date']).reset_index(drop=True)
+
+@metrics.instrument('db.symbols', rows=metrics.row_count)
 def fetch_symbols_from_db():
     query = """
         SELECT symbol, name, exchange, etf FROM stock_symbols
@@ -134,31 +421,33 @@ def fetch_symbols_from_db():
         logger.error(f"Query Execution error: {e}")
         return pd.DataFrame(columns=['symbol', 'name', 'exchange', 'etf'])
 
-def fetch_momentum_symbols_from_db(start_date, end_date, volume, min_price, max_price, top_n):
-    query = """
-        WITH last_trading_day AS (
-            SELECT MAX(trade_date) AS trade_date
-            FROM stock_data
-            WHERE trade_date <= %s
-            AND trade_date NOT IN (SELECT holiday_date FROM market_holidays)
-            AND EXTRACT(DOW FROM trade_date) NOT IN (0, 6)
-        )
-        SELECT ticker, AVG(volume) AS avg_volume
+MOMENTUM_SYMBOLS_QUERY = """
+    WITH last_trading_day AS (
+        SELECT MAX(trade_date) AS trade_date
+        FROM trading_days
+        WHERE trade_date <= %s
+    )
+    SELECT ticker, AVG(volume) AS avg_volume
+    FROM stock_data
+    WHERE ticker IN (
+        SELECT ticker 
         FROM stock_data
-        WHERE ticker IN (
-            SELECT ticker 
-            FROM stock_data
-            WHERE trade_date = (SELECT trade_date FROM last_trading_day)
-            AND close_price BETWEEN %s AND %s
-        )
-        AND trade_date BETWEEN %s AND %s
-        AND volume >= %s
-        GROUP BY ticker
-        HAVING COUNT(*) >= (SELECT COUNT(DISTINCT trade_date) * 0.9 FROM stock_data
-                           WHERE trade_date BETWEEN %s AND %s)
-        ORDER BY avg_volume DESC
-        LIMIT %s;
-    """
+        WHERE trade_date = (SELECT trade_date FROM last_trading_day)
+        AND close_price BETWEEN %s AND %s
+    )
+    AND trade_date BETWEEN %s AND %s
+    AND volume >= %s
+    GROUP BY ticker
+    HAVING COUNT(*) >= (SELECT COUNT(*) * 0.9 FROM trading_days
+                       WHERE trade_date BETWEEN %s AND %s)
+    ORDER BY avg_volume DESC
+    LIMIT %s;
+"""
+
+@metrics.instrument('db.momentum_symbols', rows=metrics.row_count)
+def fetch_momentum_symbols_from_db(start_date, end_date, volume, min_price, max_price, top_n):
+    # 마지막 거래일과 기간 내 거래일 수는 trading_days에서 index lookup으로 조회
+    query = MOMENTUM_SYMBOLS_QUERY
     try:
         with get_connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -170,77 +459,330 @@ def fetch_momentum_symbols_from_db(start_date, end_date, volume, min_price, max_
         logger.error(f"Query Execution error: {e}")
         return ()
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), 
-       retry=retry_if_exception_type(Exception))
-@lru_cache(maxsize=100)
+FUNDAMENTALS_ASOF_QUERY = """
+    SELECT t.ticker, f.recorded_at,
+           f.trailing_pe::float8, f.price_to_book::float8, f.return_on_equity::float8,
+           f.revenue_growth::float8, f.debt_to_equity::float8
+    FROM unnest(%s::text[]) AS t(ticker)
+    CROSS JOIN LATERAL (
+        SELECT recorded_at, trailing_pe, price_to_book, return_on_equity, revenue_growth, debt_to_equity
+        FROM stock_financials_history h
+        WHERE h.ticker = t.ticker AND h.recorded_at <= %s
+        ORDER BY h.recorded_at DESC
+        LIMIT 1
+    ) f;
+"""
+
+VALUE_COLUMNS = ['PER', 'PBR', 'EPS', 'ROE', 'Revenue Growth', 'Debt to Equity']
+
+@metrics.instrument('db.fundamentals_asof', rows=metrics.row_count)
+def fetch_fundamentals_asof_from_db(tickers, as_of):
+    """
+    종목별로 as_of 이전(포함) 가장 최근의 재무 지표를 한 번의 쿼리로 조회
+
+    종목마다 (ticker, recorded_at) 인덱스를 한 번씩 역순 탐색합니다
+    (sql/create_stock_financials_asof_index.sql).
+
+    Args:
+        tickers (iterable): 조회할 티커 목록.
+        as_of (str or date): 기준일. 이 날짜 이후에 기록된 값은 사용하지 않습니다.
+
+    Returns:
+        pd.DataFrame: 티커 인덱스, 'Recorded At'과 get_value_indicators와 같은 컬럼
+                      (VALUE_COLUMNS). 기록이 없는 종목은 빠집니다.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    as_of = pd.Timestamp(as_of).date()
+    columns = ['Ticker', 'Recorded At', 'PER', 'PBR', 'ROE', 'Revenue Growth', 'Debt to Equity']
+    rows = []
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(FUNDAMENTALS_ASOF_QUERY, (tickers, as_of))
+                rows = cur.fetchall()
+    except Exception as e:
+        logger.error(f"Query Execution error: {e}")
+    data = pd.DataFrame(rows, columns=columns).set_index('Ticker')
+    data['EPS'] = None  # stock_financials_history에 저장하지 않는 항목
+    return data[['Recorded At'] + VALUE_COLUMNS]
+
+def value_row(table, ticker):
+    """fetch_fundamentals_asof_from_db 결과의 한 종목을 get_value_indicators와 같은 dict로 변환 (없으면 빈 dict)"""
+    if ticker not in table.index:
+        return {}
+    return {col: (None if pd.isna(value) else value) for col, value in table.loc[ticker, VALUE_COLUMNS].items()}
+
+INDICATOR_STATE_QUERY = """
+    SELECT ticker, as_of, rsi, high_52w_ratio, ma_60, ma_200, change_1m, change_3m, change_6m, change_1y,
+           sortino_ratio, average_volume, last_close, price_increase_ratio
+    FROM indicator_state
+    WHERE (%(tickers)s::text[] IS NULL OR ticker = ANY(%(tickers)s::text[]));
+"""
+
+INDICATOR_STATE_COLUMNS = ['Ticker', 'As Of', 'RSI', '52W High Ratio', '60-Day MA', '200-Day MA', '1M Change',
+                           '3M Change', '6M Change', '1Y Change', 'Sortino Ratio', 'Average Volume', 'Last Close',
+                           'Price Increase Ratio']
+
+@metrics.instrument('db.indicator_state', rows=metrics.row_count)
+def fetch_indicator_state_from_db(tickers=None):
+    """
+    indicator_state에서 종목별 현재 지표를 한 번에 조회
+
+    analysis/indicator_state.py가 매일 갱신한 값으로, get_momentum_indicators와 같은 컬럼에
+    183일 window의 Sortino Ratio, Average Volume, Last Close, Price Increase Ratio가 더해집니다.
+
+    Args:
+        tickers (iterable or None): 조회할 티커 목록. None이면 전 종목.
+
+    Returns:
+        pd.DataFrame: 티커 인덱스, INDICATOR_STATE_COLUMNS 컬럼 ('As Of'는 마지막 반영 거래일).
+    """
+    params = {'tickers': None if tickers is None else list(dict.fromkeys(tickers))}
+    rows = []
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(INDICATOR_STATE_QUERY, params)
+                rows = cur.fetchall()
+    except Exception as e:
+        logger.error(f"Query Execution error: {e}")
+    data = pd.DataFrame(rows, columns=INDICATOR_STATE_COLUMNS).set_index('Ticker')
+    data[INDICATOR_STATE_COLUMNS[2:]] = data[INDICATOR_STATE_COLUMNS[2:]].astype('float64')
+    return data
+
+QUANT_RESULT_QUERY = """
+    SELECT q.trade_date, q.ticker, i.company_name, i.sector,
+           q.six_month_change, q.rsi, q.revenue_growth, q.debt_to_equity, q.pbr,
+           q.sortino_ratio, q.average_volume, q.weighted_score
+    FROM quant_result q
+    LEFT JOIN stock_info i ON i.ticker = q.ticker
+    WHERE q.trade_date = COALESCE(%(trade_date)s::date, (SELECT MAX(trade_date) FROM quant_result))
+    ORDER BY q.weighted_score DESC NULLS LAST, q.ticker
+    LIMIT %(top_n)s;
+"""
+
+QUANT_RESULT_COLUMNS = ['Trade Date', 'Ticker', 'Company Name', 'Sector', '6M Change', 'RSI', 'Revenue Growth',
+                        'Debt to Equity', 'PBR', 'Sortino Ratio', 'Average Volume', 'Weighted Score']
+
+@metrics.instrument('db.quant_result', rows=metrics.row_count)
+def fetch_quant_result_from_db(trade_date=None, top_n=20):
+    """
+    quant_result에서 하루치 상위 종목을 Weighted Score 순으로 조회
+
+    Args:
+        trade_date (str or date): 조회할 날짜. None이면 가장 최근 날짜.
+        top_n (int): 최대 종목 수.
+
+    Returns:
+        pd.DataFrame: QUANT_RESULT_COLUMNS 컬럼 (fetch_stock_analysis 결과와 같은 이름, 회사명/섹터는 stock_info).
+    """
+    params = {'trade_date': None if trade_date is None else pd.Timestamp(trade_date).date(), 'top_n': top_n}
+    rows = []
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(QUANT_RESULT_QUERY, params)
+                rows = cur.fetchall()
+    except Exception as e:
+        logger.error(f"Query Execution error: {e}")
+    data = pd.DataFrame(rows, columns=QUANT_RESULT_COLUMNS)
+    data[QUANT_RESULT_COLUMNS[4:]] = data[QUANT_RESULT_COLUMNS[4:]].astype('float64')
+    return data
+
+@metrics.instrument('yfinance.info')
+def _fetch_info_from_yfinance(ticker):
+    """Ticker.info 조회 (공유 rate limiter 경유)"""
+    return yfinance_limiter.call(lambda: yf.Ticker(ticker).info)
+
+MOMENTUM_SCREEN_QUERY = """
+    WITH last_trading_day AS (
+        SELECT MAX(trade_date) AS trade_date
+        FROM trading_days
+        WHERE trade_date <= %(end_date)s
+    ),
+    session_count AS (
+        SELECT COUNT(*) AS sessions
+        FROM trading_days
+        WHERE trade_date BETWEEN %(start_date)s AND %(end_date)s
+    ),
+    candidates AS (
+        SELECT ticker
+        FROM stock_data
+        WHERE trade_date = (SELECT trade_date FROM last_trading_day)
+        AND close_price BETWEEN %(min_price)s AND %(max_price)s
+    ),
+    prices AS (
+        SELECT s.ticker,
+               s.volume,
+               s.close_price::float8 AS close,
+               s.close_price::float8 / NULLIF(LAG(s.close_price::float8) OVER w, 0) - 1 AS daily_return,
+               FIRST_VALUE(s.close_price::float8) OVER w AS first_close,
+               LAST_VALUE(s.close_price::float8) OVER (w ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING) AS last_close
+        FROM stock_data s
+        JOIN candidates c ON c.ticker = s.ticker
+        WHERE s.trade_date BETWEEN %(start_date)s AND %(end_date)s
+        WINDOW w AS (PARTITION BY s.ticker ORDER BY s.trade_date)
+    ),
+    metrics AS (
+        SELECT ticker,
+               AVG(volume) AS avg_volume,
+               -- 순위 기준은 기존 fetch_momentum_symbols_from_db처럼 min_volume 이상인 날의 평균
+               AVG(volume) FILTER (WHERE volume >= %(min_volume)s) AS liquid_avg_volume,
+               COUNT(*) FILTER (WHERE volume >= %(min_volume)s) AS liquid_days,
+               MAX(last_close) AS last_close,
+               MAX(first_close) AS first_close,
+               AVG(daily_return) AS mean_return,
+               COUNT(daily_return) AS return_count,
+               SQRT(AVG(daily_return ^ 2) FILTER (WHERE daily_return < 0)) AS downside_deviation
+        FROM prices
+        GROUP BY ticker
+    ),
+    scored AS (
+        SELECT ticker,
+               avg_volume,
+               liquid_avg_volume,
+               liquid_days,
+               last_close,
+               (last_close - first_close) / NULLIF(first_close, 0) AS price_increase_ratio,
+               CASE
+                   WHEN return_count < 2 THEN NULL
+                   WHEN downside_deviation IS NULL OR downside_deviation = 0 THEN 0.0
+                   ELSE (mean_return - %(risk_free_rate)s) / downside_deviation * SQRT(252)
+               END AS sortino_ratio
+        FROM metrics
+    )
+    SELECT ticker, avg_volume, last_close, price_increase_ratio, sortino_ratio
+    FROM scored
+    WHERE liquid_days >= (SELECT sessions * 0.9 FROM session_count)
+    AND avg_volume >= %(min_volume)s
+    AND last_close BETWEEN %(min_price)s AND %(max_price)s
+    AND price_increase_ratio >= %(min_diff_ratio)s
+    AND sortino_ratio >= %(min_sortino)s
+    ORDER BY liquid_avg_volume DESC
+    LIMIT %(top_n)s;
+"""
+
+@metrics.instrument('db.momentum_screen', rows=metrics.row_count)
+def fetch_momentum_screen_from_db(start_date, end_date, min_volume, min_price, max_price, min_sortino,
+                                  min_diff_ratio, top_n, risk_free_rate=0.01/252):
+    """
+    모멘텀 후보 선별을 DB 안에서 한 번에 수행
+
+    fetch_momentum_symbols_from_db + fetch_stock_analysis의 가격 필터(평균 거래량, 종가 범위,
+    Price Increase Ratio, Sortino Ratio)를 window 함수로 계산해 통과한 종목만 돌려줍니다.
+    Sortino Ratio는 strategies.sortino_ratio.calculate_sortino_ratio와 같은 정의입니다.
+    Average Volume과 필터는 fetch_stock_analysis처럼 구간 전체 거래량 평균이고, 순위(top_n)는
+    기존 fetch_momentum_symbols_from_db처럼 거래량이 min_volume 이상인 날만의 평균 내림차순입니다.
+
+    Returns:
+        pd.DataFrame: Ticker, Average Volume, Last Close, Price Increase Ratio, Sortino Ratio
+                      (유동성 일 평균 거래량 내림차순, 최대 top_n개).
+    """
+    params = {
+        'start_date': start_date, 'end_date': end_date, 'min_volume': min_volume,
+        'min_price': min_price, 'max_price': max_price, 'min_sortino': min_sortino,
+        'min_diff_ratio': min_diff_ratio, 'top_n': top_n, 'risk_free_rate': risk_free_rate
+    }
+    columns = ['Ticker', 'Average Volume', 'Last Close', 'Price Increase Ratio', 'Sortino Ratio']
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(MOMENTUM_SCREEN_QUERY, params)
+                rows = cur.fetchall()
+        data = pd.DataFrame(rows, columns=columns)
+        data[columns[1:]] = data[columns[1:]].astype('float64')
+        return data
+    except Exception as e:
+        logger.error(f"Query Execution error: {e}")
+        return pd.DataFrame(columns=columns)
+
+def parse_stock_info(ticker, info):
+    """Ticker.info 응답에서 stock_info 레코드 추출"""
+    return {
+        "ticker": ticker,
+        "company_name": info.get("longName", "N/A"),
+        "industry": info.get("industry", "N/A"),
+        "sector": info.get("sector", "N/A"),
+        "market_cap": info.get("marketCap", None),
+        "currency": info.get("currency", "N/A"),
+    }
+
+def parse_stock_financials(ticker, stats, recorded_at=None):
+    """Ticker.info 응답에서 stock_financials_history 레코드 추출"""
+    return {
+        "ticker": ticker,
+        "recorded_at": recorded_at or datetime.now(pytz.timezone('Asia/Seoul')).strftime('%Y-%m-%d'),
+        "trailing_pe": stats.get("trailingPE", None),
+        "forward_pe": stats.get("forwardPE", None),
+        "book_value": stats.get("bookValue", None),
+        "price_to_book": stats.get("priceToBook", None),
+        "earnings_growth": stats.get("earningsGrowth", None),
+        "revenue_growth": stats.get("revenueGrowth", None),
+        "return_on_assets": stats.get("returnOnAssets", None),
+        "return_on_equity": stats.get("returnOnEquity", None),
+        "debt_to_equity": stats.get("debtToEquity", None)
+    }
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),
+       retry=retry_if_exception_type(Exception), before_sleep=metrics.record_retry)
+def fetch_fundamentals_from_yfinance(ticker, recorded_at=None):
+    """
+    Ticker.info를 한 번만 호출해 stock_info와 stock_financials_history 레코드를 함께 생성
+
+    Returns:
+        tuple: (stock_info dict, financials dict). 정보가 없으면 ({}, {}).
+    """
+    try:
+        info = _fetch_info_from_yfinance(ticker)
+        if not info:
+            logger.info(f"No info available for {ticker}")
+            return {}, {}
+        return parse_stock_info(ticker, info), parse_stock_financials(ticker, info, recorded_at)
+    except Exception as e:
+        logger.error(f"Error fetching fundamentals for {ticker}: {e}")
+        raise
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),
+       retry=retry_if_exception_type(Exception), before_sleep=metrics.record_retry)
+@ttl_cache(maxsize=CACHE_MAXSIZE, ttl=24 * 3600)
 def fetch_stock_info_from_yfinance(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        time.sleep(0.5)
+        info = _fetch_info_from_yfinance(ticker)
         if not info:
             logger.info(f"No info available for {ticker}")
             return {}
-        return {
-            "ticker": ticker,
-            "company_name": info.get("longName", "N/A"),
-            "industry": info.get("industry", "N/A"),
-            "sector": info.get("sector", "N/A"),
-            "market_cap": info.get("marketCap", None),
-            "currency": info.get("currency", "N/A"),
-        }
+        return parse_stock_info(ticker, info)
     except Exception as e:
         logger.error(f"Unexpected error for {ticker}: {e}")
         raise
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), 
-       retry=retry_if_exception_type(Exception))
-@lru_cache(maxsize=100)
+       retry=retry_if_exception_type(Exception), before_sleep=metrics.record_retry)
+@ttl_cache(maxsize=CACHE_MAXSIZE, ttl=24 * 3600)
 def fetch_stock_financials_from_yfinance(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        stats = stock.info
-        time.sleep(0.5)
+        stats = _fetch_info_from_yfinance(ticker)
         if not stats:
             logger.info(f"No financials available for {ticker}")
             return {}
-        return {
-            "ticker": ticker,
-            "recorded_at": datetime.now(pytz.timezone('Asia/Seoul')).strftime('%Y-%m-%d'),
-            "trailing_pe": stats.get("trailingPE", None),
-            "forward_pe": stats.get("forwardPE", None),
-            "book_value": stats.get("bookValue", None),
-            "price_to_book": stats.get("priceToBook", None),
-            "earnings_growth": stats.get("earningsGrowth", None),
-            "revenue_growth": stats.get("revenueGrowth", None),
-            "return_on_assets": stats.get("returnOnAssets", None),
-            "return_on_equity": stats.get("returnOnEquity", None),
-            "debt_to_equity": stats.get("debtToEquity", None)
-        }
+        return parse_stock_financials(ticker, stats)
     except Exception as e:
         logger.error(f"Error fetching financials for {ticker}: {e}")
         raise
 
 def compute_rsi(series, period=14):
     try:
-        delta = series.diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        avg_gain = gain.rolling(window=period, min_periods=1).mean()
-        avg_loss = loss.rolling(window=period, min_periods=1).mean()
-        rs = avg_gain / (avg_loss + 1e-10)
-        if rs.isna().any():
+        rsi = FactorGraph(series.to_numpy(dtype='float64'), rsi_period=period).row(['RSI'])['RSI']
+        if rsi is None:
             logger.warning("RSI calculation resulted in NaN")
-            return None
-        rsi = 100 - (100 / (1 + rs))
-        return rsi.iloc[-1]
+        return rsi
     except Exception as e:
         logger.error(f"Error calculating RSI: {e}")
         return None
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), 
-       retry=retry_if_exception_type(Exception))
-@lru_cache(maxsize=100)
+       retry=retry_if_exception_type(Exception), before_sleep=metrics.record_retry)
+@ttl_cache(maxsize=CACHE_MAXSIZE, ttl=6 * 3600)
 def get_momentum_indicators(ticker):
     try:
         end_date = datetime.now(pytz.timezone('Asia/Seoul'))
@@ -252,32 +794,15 @@ def get_momentum_indicators(ticker):
             logger.info(f"No data for {ticker}")
             return {}
         
-        rsi = compute_rsi(data['Close'])
-        high_52w_ratio = data['Close'].iloc[-1] / data['Close'].max() if not data['Close'].empty else None
-        ma_60 = data['Close'].rolling(window=60, min_periods=1).mean().iloc[-1] if len(data) >= 1 else None
-        ma_200 = data['Close'].rolling(window=200, min_periods=1).mean().iloc[-1] if len(data) >= 1 else None
-        change_1m = None if len(data) < 22 else (data['Close'].iloc[-1] - data['Close'].iloc[-22]) / data['Close'].iloc[-22] * 100
-        change_3m = None if len(data) < 66 else (data['Close'].iloc[-1] - data['Close'].iloc[-66]) / data['Close'].iloc[-66] * 100
-        change_6m = None if len(data) < 132 else (data['Close'].iloc[-1] - data['Close'].iloc[-132]) / data['Close'].iloc[-132] * 100
-        change_1y = None if len(data) < 1 else (data['Close'].iloc[-1] - data['Close'].iloc[0]) / data['Close'].iloc[0] * 100
-        
-        return {
-            "RSI": rsi,
-            "52W High Ratio": high_52w_ratio,
-            "60-Day MA": ma_60,
-            "200-Day MA": ma_200,
-            "1M Change": change_1m,
-            "3M Change": change_3m,
-            "6M Change": change_6m,
-            "1Y Change": change_1y
-        }
+        # RSI, 이동평균, 변화율을 정렬된 종가 하나로 함께 계산
+        return frame_factors(data, MOMENTUM_FACTORS)
     except Exception as e:
         logger.error(f"Error fetching momentum indicators for {ticker}: {e}")
         return {}
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), 
-       retry=retry_if_exception_type(Exception))
-@lru_cache(maxsize=100)
+       retry=retry_if_exception_type(Exception), before_sleep=metrics.record_retry)
+@ttl_cache(maxsize=CACHE_MAXSIZE, ttl=24 * 3600)
 def get_value_indicators(ticker):
     try:
         financials = fetch_stock_financials_from_yfinance(ticker)
@@ -1,95 +1,229 @@
+import io
+import logging
+import pandas as pd
 from data.database import get_connection
+import data.parquet_cache as parquet_cache
+from utils import metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 테이블별 bulk upsert 설정
+#   columns: COPY 대상 컬럼 (순서 유지)
+#   key: ON CONFLICT 키
+#   rename: 입력 DataFrame 컬럼명 -> 테이블 컬럼명
+#   integers: BIGINT 컬럼 (NaN 때문에 float로 바뀐 값을 정수로 되돌림)
+BULK_TABLES = {
+    'stock_data': {
+        'columns': ['ticker', 'trade_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'],
+        'key': ['ticker', 'trade_date'],
+        'rename': {'open': 'open_price', 'high': 'high_price', 'low': 'low_price', 'close': 'close_price'},
+        'integers': ['volume'],
+    },
+    'stock_info': {
+        'columns': ['ticker', 'company_name', 'industry', 'sector', 'market_cap', 'currency'],
+        'key': ['ticker'],
+        'rename': {},
+        'integers': ['market_cap'],
+    },
+    'stock_financials_history': {
+        'columns': ['ticker', 'recorded_at', 'trailing_pe', 'forward_pe', 'book_value', 'price_to_book',
+                    'earnings_growth', 'revenue_growth', 'return_on_assets', 'return_on_equity', 'debt_to_equity'],
+        'key': ['ticker', 'recorded_at'],
+        'rename': {},
+        'integers': [],
+    },
+    'quant_result': {
+        'columns': ['trade_date', 'ticker', 'six_month_change', 'rsi', 'revenue_growth', 'debt_to_equity',
+                    'pbr', 'sortino_ratio', 'average_volume', 'weighted_score'],
+        'key': ['trade_date', 'ticker'],
+        'rename': {'Ticker': 'ticker', '6M Change': 'six_month_change', 'RSI': 'rsi',
+                   'Revenue Growth': 'revenue_growth', 'Debt to Equity': 'debt_to_equity', 'PBR': 'pbr',
+                   'Sortino Ratio': 'sortino_ratio', 'Average Volume': 'average_volume',
+                   'Weighted Score': 'weighted_score'},
+        'integers': [],
+    },
+    'indicator_state': {
+        'columns': ['ticker', 'as_of', 'dates', 'closes', 'volumes', 'volume_sum', 'close_sum_60', 'close_sum_200',
+                    'gain_sum', 'loss_sum', 'return_sum', 'return_count', 'downside_square_sum', 'downside_count',
+                    'high', 'last_close', 'rsi', 'high_52w_ratio', 'ma_60', 'ma_200', 'change_1m', 'change_3m',
+                    'change_6m', 'change_1y', 'sortino_ratio', 'average_volume', 'price_increase_ratio'],
+        'key': ['ticker'],
+        'rename': {},
+        'integers': ['return_count', 'downside_count'],
+    },
+}
+
+def _prepare_frame(spec, frame):
+    frame = pd.DataFrame(frame).rename(columns=spec['rename'])
+    if frame.empty:
+        return pd.DataFrame(columns=spec['columns'])
+    missing = [col for col in spec['columns'] if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns for bulk upsert: {missing}")
+    frame = frame[spec['columns']].copy()
+    for col in spec['integers']:
+        frame[col] = pd.to_numeric(frame[col], errors='coerce').round().astype('Int64')
+    # 같은 키가 한 번에 두 번 들어가면 ON CONFLICT DO UPDATE가 실패하므로 마지막 값만 유지
+    frame = frame.dropna(subset=spec['key']).drop_duplicates(subset=spec['key'], keep='last')
+    return frame
+
+def _upsert_query(table, spec, staging):
+    columns = ', '.join(spec['columns'])
+    key = ', '.join(spec['key'])
+    values = [col for col in spec['columns'] if col not in spec['key']]
+    assignments = ',\n            '.join(f"{col} = EXCLUDED.{col}" for col in values)
+    target = ', '.join(f"{table}.{col}" for col in values)
+    excluded = ', '.join(f"EXCLUDED.{col}" for col in values)
+    return f"""
+        INSERT INTO {table} ({columns})
+        SELECT {columns} FROM {staging}
+        ON CONFLICT ({key}) DO UPDATE
+        SET {assignments}
+        WHERE ({target}) IS DISTINCT FROM ({excluded});
+    """
+
+def _existing_keys_query(table, spec, staging):
+    # partition 테이블은 RETURNING에서 xmax를 읽을 수 없으므로 기존 키 수를 먼저 셈
+    join = ' AND '.join(f"t.{col} = s.{col}" for col in spec['key'])
+    return f"SELECT COUNT(*) FROM {staging} s JOIN {table} t ON {join};"
+
+def bulk_upsert(table, frame, conn=None):
+    """
+    Stream a DataFrame into a table through COPY and merge it with an idempotent upsert.
+
+    Rows are copied into a temporary staging table and merged with a single
+    INSERT ... ON CONFLICT DO UPDATE. Rows whose values did not change are left
+    untouched, so re-running the same load reports zero inserts and updates.
+
+    Args:
+        table (str): Target table, one of BULK_TABLES.
+        frame (pd.DataFrame or list[dict]): Rows to store. Column names may use
+            either the table names or the aliases in BULK_TABLES[table]['rename'].
+        conn: Optional open connection. When given, the caller owns the commit.
+
+    Returns:
+        dict: {'inserted': int, 'updated': int, 'unchanged': int}
+    """
+    if table not in BULK_TABLES:
+        raise ValueError(f"Unsupported table for bulk upsert: {table}")
+    spec = BULK_TABLES[table]
+    frame = _prepare_frame(spec, frame)
+    if frame.empty:
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d', na_rep='\\N')
+    buffer.seek(0)
+
+    staging = f"staging_{table}"
+    columns = ', '.join(spec['columns'])
+    owns_connection = conn is None
+    with metrics.timed(f"save.{table}", rows=len(frame)):
+        try:
+            if owns_connection:
+                conn = get_connection()
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+                    SELECT {columns} FROM {table} WITH NO DATA;
+                """)
+                cur.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+                cur.execute(_existing_keys_query(table, spec, staging))
+                existing = cur.fetchone()[0]
+                cur.execute(_upsert_query(table, spec, staging))
+                changed = cur.rowcount
+                cur.execute(f"DROP TABLE {staging};")
+            if owns_connection:
+                conn.commit()
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"Bulk upsert into {table} failed: {e}")
+            raise
+        finally:
+            if owns_connection and conn:
+                conn.close()
+
+    inserted = len(frame) - existing
+    result = {'inserted': inserted, 'updated': changed - inserted, 'unchanged': existing - (changed - inserted)}
+    logger.info(f"{table}: {result['inserted']} inserted, {result['updated']} updated, "
+                f"{result['unchanged']} unchanged")
+    return result
 
 def save_stock_data_in_db(stock_data):
     """
     Store stock trading data into PostgreSQL with error handling.
 
     Args:
-        stock_data (dict): A dictionary containing stock trading data.
+        stock_data (list[dict] or pd.DataFrame): Stock trading records with
+            ticker, trade_date, open, high, low, close and volume.
+
+    Returns:
+        dict: Inserted/updated/unchanged row counts.
     """
+    stock_data = pd.DataFrame(stock_data)
+    with get_connection() as conn:
+        result = bulk_upsert('stock_data', stock_data, conn=conn)
+        if not stock_data.empty:
+            refresh_trading_days(stock_data['trade_date'].unique(), conn=conn)
+    # commit 이후 저장한 달의 가격 cache만 무효화
+    if result['inserted'] or result['updated']:
+        parquet_cache.invalidate_dates(stock_data['trade_date'].unique())
+    return result
 
-    insert_query = """
-    INSERT INTO stock_data (ticker, trade_date, open_price, high_price, low_price, close_price, volume)
-    VALUES (%s, %s, %s, %s, %s, %s, %s);
+@metrics.instrument('save.trading_days')
+def refresh_trading_days(trade_dates, conn=None):
     """
-    # ON CONFLICT (ticker, trade_date) DO NOTHING
-    conn = None
-    try:
-      # Get database connection
-      conn = get_connection()
-      with conn.cursor() as cur:
-          for index, record in enumerate(stock_data, start=1):  # enumerate로 번호와 데이터를 가져옴
-            try:
-              cur.execute(insert_query, (
-                record["ticker"],
-                record["trade_date"],
-                record["open"],
-                record["high"],
-                record["low"],
-                record["close"],
-                record["volume"]
-              ))
-            except Exception as e:
-              print(f"Error saving stock data: {e}") 
-              continue     
-          conn.commit()  # Commit changes if no exception occurs
+    Recount stored tickers per day in trading_days for the given dates.
 
+    Args:
+        trade_dates (iterable): Dates touched by the latest stock_data write.
+        conn: Optional open connection. When given, the caller owns the commit.
+    """
+    query = """
+    INSERT INTO trading_days (trade_date, ticker_count)
+    SELECT trade_date, COUNT(*)
+    FROM stock_data
+    WHERE trade_date = ANY(%s::date[])
+    GROUP BY trade_date
+    ON CONFLICT (trade_date) DO UPDATE
+    SET ticker_count = EXCLUDED.ticker_count,
+        updated_at = CURRENT_TIMESTAMP;
+    """
+    trade_dates = sorted({pd.Timestamp(day).date() for day in trade_dates})
+    if not trade_dates:
+        return
+    owns_connection = conn is None
+    try:
+        if owns_connection:
+            conn = get_connection()
+        with conn.cursor() as cur:
+            cur.execute(query, (trade_dates,))
+        if owns_connection:
+            conn.commit()
     except Exception as e:
-      if conn:
-        conn.rollback()  # Rollback changes on error
-        print(f"Error saving stock data: {e}")
-        raise  # Re-raise the exception after logging
+        if conn:
+            conn.rollback()
+        logger.error(f"Refreshing trading_days failed: {e}")
+        raise
     finally:
-      if conn:
-        conn.close()  # Ensure connection is closed
+        if owns_connection and conn:
+            conn.close()
 
 def save_stock_info_in_db(stock_info):
     """
     Store stock basic information into PostgreSQL with error handling.
 
     Args:
-        stock_info (dict): A dictionary containing stock basic information.
-    """
+        stock_info (dict, list[dict] or pd.DataFrame): Stock basic information.
 
-    insert_query = """
-    INSERT INTO stock_info (ticker, company_name, industry, sector, market_cap, currency)
-    VALUES (%s, %s, %s, %s, %s, %s)
-    ON CONFLICT (ticker) DO UPDATE 
-    SET company_name = EXCLUDED.company_name,
-        industry = EXCLUDED.industry,
-        sector = EXCLUDED.sector,
-        market_cap = EXCLUDED.market_cap,
-        currency = EXCLUDED.currency;
+    Returns:
+        dict: Inserted/updated/unchanged row counts.
     """
-    
-    conn = None
-    try:
-        # Get database connection
-        conn = get_connection()
-        with conn.cursor() as cur:
-            try:
-                cur.execute(insert_query, (
-                    stock_info["ticker"],
-                    stock_info["company_name"],
-                    stock_info["industry"],
-                    stock_info["sector"],
-                    stock_info["market_cap"],
-                    stock_info["currency"]
-                ))
-            except Exception as e:
-                print(f"Error saving stock info: {e}")
-                return  # 에러 발생 시 종료
-            
-            conn.commit()  # 커밋하여 변경사항 저장
-
-    except Exception as e:
-        if conn:
-            conn.rollback()  # 오류 발생 시 롤백
-            print(f"Database error: {e}")
-            raise  # 예외 재발생
-    finally:
-        if conn:
-            conn.close()  # 연결 닫기
+    if isinstance(stock_info, dict):
+        stock_info = [stock_info]
+    return bulk_upsert('stock_info', stock_info)
 
 
 def save_stock_financials_in_db(financials_data):
@@ -97,41 +231,61 @@ def save_stock_financials_in_db(financials_data):
     Store stock financials history into PostgreSQL.
 
     Args:
-        financials_data (dict): A dictionary of financials history.
+        financials_data (dict, list[dict] or pd.DataFrame): Financials history.
+
+    Returns:
+        dict: Inserted/updated/unchanged row counts.
     """
-    insert_query = """
-    INSERT INTO stock_financials_history (
-        ticker, recorded_at, trailing_pe, forward_pe, book_value, 
-        price_to_book, earnings_growth, revenue_growth, 
-        return_on_assets, return_on_equity, debt_to_equity
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT (ticker, recorded_at) DO NOTHING;
+    if isinstance(financials_data, dict):
+        financials_data = [financials_data]
+    return bulk_upsert('stock_financials_history', financials_data)
+
+
+def save_fundamentals_in_db(stock_info, financials_data):
     """
+    Store stock_info and stock_financials_history rows in one transaction.
 
-    conn = None
-    try:
-        conn = get_connection()
-        with conn.cursor() as cur:
-            cur.execute(insert_query, (
-                financials_data["ticker"],
-                financials_data["recorded_at"],
-                financials_data["trailing_pe"],
-                financials_data["forward_pe"],
-                financials_data["book_value"],
-                financials_data["price_to_book"],
-                financials_data["earnings_growth"],
-                financials_data["revenue_growth"],
-                financials_data["return_on_assets"],
-                financials_data["return_on_equity"],
-                financials_data["debt_to_equity"]
-            ))
-        conn.commit()  # 변경 사항 적용
+    stock_info is written first because stock_financials_history references it.
 
-    except Exception as e:
-        if conn:
-            conn.rollback()
-        print(f"Database error while saving {financials_data['ticker']}: {e}")
-        raise
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+    Args:
+        stock_info (list[dict] or pd.DataFrame): Stock basic information.
+        financials_data (list[dict] or pd.DataFrame): Financials history.
+
+    Returns:
+        dict: Row counts per table.
+    """
+    with get_connection() as conn:
+        return {
+            'stock_info': bulk_upsert('stock_info', stock_info, conn=conn),
+            'stock_financials_history': bulk_upsert('stock_financials_history', financials_data, conn=conn),
+        }
+
+
+def save_quant_result_in_db(quant_result, trade_date):
+    """
+    Store momentum analysis results into quant_result.
+
+    Args:
+        quant_result (pd.DataFrame): fetch_stock_analysis result with display column names.
+        trade_date (str or date): Date to stamp the rows with.
+
+    Returns:
+        dict: Inserted/updated/unchanged row counts.
+    """
+    frame = pd.DataFrame(quant_result)
+    frame = frame[frame['Ticker'].astype(bool)].assign(trade_date=trade_date)
+    return bulk_upsert('quant_result', frame)
+
+
+def save_indicator_state_in_db(states):
+    """
+    Store per-ticker indicator state rows.
+
+    Args:
+        states (list[dict] or pd.DataFrame): IndicatorState.to_row() records. Array
+            columns are Postgres array literals.
+
+    Returns:
+        dict: Inserted/updated/unchanged row counts.
+    """
+    return bulk_upsert('indicator_state', states)
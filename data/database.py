@@ -1,20 +1,265 @@
+
 import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 import psycopg2
+import psycopg2.extensions
 from dotenv import load_dotenv
 import logging
+from utils import metrics
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-def get_connection():
+class PoolTimeout(Exception):
+  """풀에서 지정된 시간 안에 커넥션을 얻지 못함"""
+
+@lru_cache(maxsize=None)
+def counting_cursor(base):
+  """base cursor 클래스에 DB round trip 계측을 덧붙인 서브클래스 (RealDictCursor 등도 그대로 동작)"""
+  class CountingCursor(base):
+    def execute(self, query, vars=None):
+      metrics.record_round_trip()
+      return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+      vars_list = list(vars_list)
+      metrics.record_round_trip(len(vars_list))
+      return super().executemany(query, vars_list)
+
+    def callproc(self, procname, parameters=None):
+      metrics.record_round_trip()
+      return super().callproc(procname, parameters)
+
+    def copy_expert(self, sql, file, size=8192):
+      metrics.record_round_trip()
+      return super().copy_expert(sql, file, size)
+
+    def copy_from(self, *args, **kwargs):
+      metrics.record_round_trip()
+      return super().copy_from(*args, **kwargs)
+
+    def copy_to(self, *args, **kwargs):
+      metrics.record_round_trip()
+      return super().copy_to(*args, **kwargs)
+
+  CountingCursor.__name__ = f"Counting{base.__name__}"
+  return CountingCursor
+
+class CountingConnection(psycopg2.extensions.connection):
+  """모든 cursor의 execute/COPY 호출 수를 utils.metrics에 기록하는 커넥션"""
+
+  def cursor(self, *args, **kwargs):
+    base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+    kwargs['cursor_factory'] = counting_cursor(base)
+    return super().cursor(*args, **kwargs)
+
+def _connect():
   return psycopg2.connect(
     user = os.getenv('DB_USER'),
     password = os.getenv('DB_PASSWORD'),
     host = os.getenv('DB_HOST'),
     port = os.getenv('DB_PORT'),
-    dbname = os.getenv('DB_NAME')
+    dbname = os.getenv('DB_NAME'),
+    connection_factory = CountingConnection
   )
 
-    
+class PooledConnection:
+  """
+  Pool에서 빌려온 psycopg2 커넥션 래퍼.
+
+  속성 접근은 실제 커넥션으로 위임합니다. `with` 블록을 빠져나가면
+  commit(예외 시 rollback) 후 풀에 반납하며, close()도 반납으로 동작합니다.
+  """
+
+  def __init__(self, pool, conn, statement_timeout=None):
+    self._pool = pool
+    self._conn = conn
+    self._statement_timeout = statement_timeout
+    if statement_timeout is not None:
+      with conn.cursor() as cur:
+        cur.execute("SET statement_timeout = %s", (int(statement_timeout * 1000),))
+      conn.commit()
+
+  @property
+  def raw(self):
+    return self._conn
+
+  def __getattr__(self, name):
+    if self._conn is None:
+      raise psycopg2.InterfaceError("connection already returned to the pool")
+    return getattr(self._conn, name)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    try:
+      if self._conn is not None and not self._conn.closed:
+        if exc_type is None:
+          self._conn.commit()
+        else:
+          self._conn.rollback()
+    finally:
+      self.close()
+
+  def close(self):
+    if self._conn is not None:
+      conn, self._conn = self._conn, None
+      if self._statement_timeout is not None and not conn.closed:
+        # 다른 작업이 같은 커넥션을 빌려도 제한이 남지 않도록 되돌림
+        try:
+          if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+          with conn.cursor() as cur:
+            cur.execute("RESET statement_timeout")
+          conn.commit()
+        except Exception as e:
+          logger.warning(f"Discarding pooled connection after statement_timeout reset failed: {e}")
+          conn.close()
+      self._pool.release(conn)
+
+class ConnectionPool:
+  """
+  스레드 간에 공유 가능한 커넥션 풀.
+
+  Args:
+    minconn (int): 처음 생성 시 미리 열어 둘 커넥션 수.
+    maxconn (int): 동시에 빌려줄 수 있는 최대 커넥션 수.
+    timeout (float): 빈 커넥션을 기다리는 최대 시간(초).
+    connect (callable): 새 커넥션을 만드는 함수.
+  """
+
+  def __init__(self, minconn=1, maxconn=10, timeout=30.0, connect=_connect):
+    if minconn < 0 or maxconn < 1 or minconn > maxconn:
+      raise ValueError("pool size must satisfy 0 <= minconn <= maxconn and maxconn >= 1")
+    self.maxconn = maxconn
+    self.timeout = timeout
+    self._connect = connect
+    self._slots = threading.BoundedSemaphore(maxconn)
+    self._lock = threading.Lock()
+    self._idle = []
+    self._stats = {'checkouts': 0, 'wait_time': 0.0, 'max_wait': 0.0,
+                   'connections_created': 0, 'in_use': 0}
+    for _ in range(minconn):
+      self._idle.append(self._new_connection())
+
+  def _new_connection(self):
+    conn = self._connect()
+    with self._lock:
+      self._stats['connections_created'] += 1
+    return conn
+
+  def getconn(self, timeout=None):
+    timeout = self.timeout if timeout is None else timeout
+    started = time.perf_counter()
+    if not self._slots.acquire(timeout=timeout):
+      raise PoolTimeout(f"no database connection available within {timeout}s")
+    waited = time.perf_counter() - started
+
+    conn = None
+    with self._lock:
+      while self._idle and conn is None:
+        candidate = self._idle.pop()
+        if not candidate.closed:
+          conn = candidate
+    try:
+      if conn is None:
+        conn = self._new_connection()
+    except Exception:
+      self._slots.release()
+      raise
+
+    with self._lock:
+      self._stats['checkouts'] += 1
+      self._stats['wait_time'] += waited
+      self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+      self._stats['in_use'] += 1
+    try:
+      return PooledConnection(self, conn, getattr(_local, 'statement_timeout', None))
+    except Exception:
+      self.release(conn)
+      raise
+
+  def release(self, conn):
+    try:
+      if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()  # 커밋되지 않은 작업은 버림
+    except Exception as e:
+      logger.warning(f"Discarding broken pooled connection: {e}")
+      conn.close()
+    with self._lock:
+      if not conn.closed:
+        self._idle.append(conn)
+      self._stats['in_use'] -= 1
+    self._slots.release()
+
+  def stats(self):
+    with self._lock:
+      return dict(self._stats, idle=len(self._idle), max_size=self.maxconn)
+
+  def closeall(self):
+    with self._lock:
+      idle, self._idle = self._idle, []
+    for conn in idle:
+      conn.close()
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+@contextmanager
+def statement_timeout(seconds):
+  """
+  이 스레드에서 블록 안에 빌리는 커넥션의 쿼리 실행 시간을 seconds초로 제한
+
+  커넥션을 빌릴 때 SET statement_timeout을 보내고 반납할 때 되돌리므로, 제한은
+  블록 안에서 get_connection()으로 얻은 커넥션에만 적용됩니다. 시간을 넘긴 쿼리는
+  psycopg2.errors.QueryCanceled로 실패합니다.
+  """
+  previous = getattr(_local, 'statement_timeout', None)
+  _local.statement_timeout = seconds
+  try:
+    yield
+  finally:
+    _local.statement_timeout = previous
+
+def get_pool():
+  """프로세스 전역 커넥션 풀 (DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT 환경변수로 크기 지정)"""
+  global _pool, _pool_pid
+  with _pool_lock:
+    # fork된 자식 프로세스는 부모의 커넥션을 공유하면 안 되므로 새 풀을 만든다
+    if _pool is None or _pool_pid != os.getpid():
+      _pool = ConnectionPool(
+        minconn = int(os.getenv('DB_POOL_MIN', '1')),
+        maxconn = int(os.getenv('DB_POOL_MAX', '10')),
+        timeout = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+      )
+      _pool_pid = os.getpid()
+    return _pool
+
+def get_connection():
+  return get_pool().getconn()
+
+def pool_stats():
+  """checkouts, wait_time, connections_created 등 커넥션 풀 통계"""
+  return get_pool().stats()
+
+def _pool_stats_if_open():
+  # 요약만을 위해 풀(커넥션)을 새로 만들지 않음
+  pool = _pool if _pool_pid == os.getpid() else None
+  return pool.stats() if pool is not None else {}
+
+metrics.register_source('db_pool', _pool_stats_if_open)
+
+def close_pool():
+  global _pool
+  with _pool_lock:
+    if _pool is not None and _pool_pid == os.getpid():
+      _pool.closeall()
+    _pool = None
@@ -0,0 +1,142 @@
+# data/ingest_pipeline.py
+
+import asyncio
+import time
+import logging
+import pandas as pd
+import data.data_fetcher as fetch
+import data.data_saver as save
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # 조회 단계 종료 신호
+
+class StageStats:
+    """파이프라인 단계별 처리량 집계"""
+
+    def __init__(self, name):
+        self.name = name
+        self.batches = 0
+        self.rows = 0
+        self.busy = 0.0      # 실제 작업 시간 합계
+        self.blocked = 0.0   # 큐가 가득 차거나 비어서 기다린 시간 합계
+        self.errors = 0
+
+    def summary(self, elapsed):
+        rate = self.rows / self.busy if self.busy else 0.0
+        return (f"[{self.name}] batches={self.batches} rows={self.rows} busy={self.busy:.1f}s "
+                f"blocked={self.blocked:.1f}s errors={self.errors} "
+                f"rows/s(busy)={rate:,.0f} rows/s(wall)={self.rows / elapsed if elapsed else 0:,.0f}")
+
+async def _fetch_stage(chunks, start_date, end_date, queue, stats, concurrency, provider):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_chunk(chunk):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                frame = await asyncio.to_thread(fetch.fetch_stock_data_batch, chunk, start_date, end_date,
+                                                chunk_size=len(chunk), provider=provider)
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"Fetch stage failed for {chunk[0]}..{chunk[-1]}: {e}")
+                return
+            finally:
+                stats.busy += time.perf_counter() - started
+            stats.batches += 1
+            stats.rows += len(frame)
+            if not frame.empty:
+                waiting = time.perf_counter()
+                await queue.put(frame)  # 큐가 가득 차면 writer가 따라올 때까지 대기 (backpressure)
+                stats.blocked += time.perf_counter() - waiting
+
+    await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+
+async def _write_stage(queue, stats, flush_rows, flush_interval, writer, totals):
+    pending = []
+    pending_rows = 0
+    last_flush = time.monotonic()
+    done = False
+
+    async def flush():
+        nonlocal pending, pending_rows, last_flush
+        if pending:
+            frame = pd.concat(pending, ignore_index=True)
+            started = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(writer, frame)
+                for key, value in (result or {}).items():
+                    totals[key] = totals.get(key, 0) + value
+                stats.batches += 1
+                stats.rows += len(frame)
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"Write stage failed for {len(frame)} rows: {e}")
+            finally:
+                stats.busy += time.perf_counter() - started
+        pending, pending_rows = [], 0
+        last_flush = time.monotonic()
+
+    while not done:
+        timeout = max(0.0, flush_interval - (time.monotonic() - last_flush))
+        waiting = time.perf_counter()
+        try:
+            frame = await asyncio.wait_for(queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            frame = None
+        stats.blocked += time.perf_counter() - waiting
+
+        if frame is _DONE:
+            done = True
+        elif frame is not None:
+            pending.append(frame)
+            pending_rows += len(frame)
+
+        # N행 이상 쌓였거나 T초가 지났거나 입력이 끝나면 flush
+        if done or pending_rows >= flush_rows or time.monotonic() - last_flush >= flush_interval:
+            await flush()
+
+async def run_ingest_pipeline(tickers, start_date, end_date, chunk_size=200, fetch_concurrency=2,
+                              queue_size=4, flush_rows=50000, flush_interval=30.0, provider=None,
+                              writer=save.save_stock_data_in_db):
+    """
+    가격 조회와 DB 저장을 겹쳐 실행하는 asyncio producer/consumer 파이프라인
+
+    Args:
+        tickers (iterable): 수집할 티커 목록.
+        start_date, end_date: fetch_stock_data_batch에 전달할 기간 (end_date 미포함).
+        chunk_size (int): 한 번의 조회에 담을 티커 수.
+        fetch_concurrency (int): 동시에 진행할 조회 chunk 수.
+        queue_size (int): 조회 단계와 저장 단계 사이 큐에 쌓아 둘 수 있는 chunk 수.
+        flush_rows (int): 이 행 수 이상 쌓이면 저장.
+        flush_interval (float): 마지막 저장 후 이 시간(초)이 지나면 저장.
+        provider (callable): 가격 provider (기본값 yfinance).
+        writer (callable): long-format DataFrame을 저장하는 함수.
+
+    Returns:
+        dict: 단계별 StageStats와 저장 결과 합계.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    queue = asyncio.Queue(maxsize=queue_size)
+    fetch_stats, write_stats = StageStats('fetch'), StageStats('write')
+    totals = {}
+
+    started = time.perf_counter()
+    writer_task = asyncio.create_task(_write_stage(queue, write_stats, flush_rows, flush_interval, writer, totals))
+    try:
+        await _fetch_stage(chunks, start_date, end_date, queue, fetch_stats, fetch_concurrency, provider)
+    finally:
+        await queue.put(_DONE)
+        await writer_task
+    elapsed = time.perf_counter() - started
+
+    for stats in (fetch_stats, write_stats):
+        logger.info(stats.summary(elapsed))
+    logger.info(f"[total] tickers={len(tickers)} elapsed={elapsed:.1f}s saved={totals}")
+    return {'fetch': fetch_stats, 'write': write_stats, 'saved': totals, 'elapsed': elapsed}
+
+def ingest(tickers, start_date, end_date, **kwargs):
+    """run_ingest_pipeline의 동기 진입점"""
+    return asyncio.run(run_ingest_pipeline(tickers, start_date, end_date, **kwargs))
@@ -0,0 +1,272 @@
+# data/migrate_stock_data_partitions.py
+#
+# 단일 테이블 stock_data를 연도별 range partition 테이블로 온라인 이전
+#
+#   python -m data.migrate_stock_data_partitions --dry_run
+#   python -m data.migrate_stock_data_partitions            # 복사 + 검증 + 교체
+#   python -m data.migrate_stock_data_partitions --ensure_only
+#
+# 1. stock_data_new (partitioned)와 연도별 partition을 만듭니다.
+# 2. 기존 stock_data에 trigger를 걸어 이후의 INSERT/UPDATE/DELETE를 새 테이블에 그대로 반영합니다.
+# 3. 기존 데이터를 월 단위 batch(짧은 transaction)로 복사합니다. 수집/조회는 계속 동작합니다.
+# 4. 연도별 행 수를 비교한 뒤, 짧은 ACCESS EXCLUSIVE lock 안에서 이름을 바꿔 교체합니다.
+#    기존 테이블은 stock_data_old로 남겨 두며 --drop_old로 삭제합니다.
+
+import argparse
+import logging
+from datetime import date
+from data.database import get_connection
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['ticker', 'trade_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+SOURCE = 'stock_data'
+TARGET = 'stock_data_new'
+OLD = 'stock_data_old'
+MIRROR_FUNCTION = 'stock_data_migration_mirror'
+
+def partition_name(table, year):
+    return f"{table}_y{year}"
+
+def table_exists(cur, table):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cur.fetchone()[0]
+
+def is_partitioned(cur, table):
+    cur.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", (table,))
+    return cur.fetchone()[0]
+
+def create_partitioned_table(cur, table, suffix=''):
+    """sql/create_stock_data_partitioned.sql과 같은 구조 (인덱스 이름에 suffix를 붙임)"""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            ticker VARCHAR(10) NOT NULL,
+            trade_date DATE NOT NULL,
+            open_price NUMERIC(10, 2),
+            high_price NUMERIC(10, 2),
+            low_price NUMERIC(10, 2),
+            close_price NUMERIC(10, 2),
+            volume BIGINT,
+            CONSTRAINT stock_data_ticker_date_pkey{suffix} PRIMARY KEY (ticker, trade_date)
+        ) PARTITION BY RANGE (trade_date);
+        CREATE INDEX IF NOT EXISTS idx_stock_data_trade_date_brin{suffix}
+            ON {table} USING brin (trade_date) WITH (pages_per_range = 32);
+        CREATE INDEX IF NOT EXISTS idx_stock_data_ticker_date_cover{suffix}
+            ON {table} (ticker, trade_date) INCLUDE (close_price, volume);
+        CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT;
+    """)
+
+def ensure_partitions(cur, table, first_year, last_year):
+    """
+    first_year ~ last_year 연도 partition이 없으면 생성
+
+    default partition에 이미 해당 연도 행이 있으면 새 테이블로 옮긴 뒤 ATTACH 합니다
+    (그대로 PARTITION OF로 만들면 default 검증에서 실패합니다).
+
+    Returns:
+        list: 새로 만든 partition 이름.
+    """
+    created = []
+    for year in range(first_year, last_year + 1):
+        name = partition_name(table, year)
+        if table_exists(cur, name):
+            continue
+        lower, upper = date(year, 1, 1), date(year + 1, 1, 1)
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE trade_date >= %s AND trade_date < %s)",
+                    (lower, upper))
+        if cur.fetchone()[0]:
+            cols = ', '.join(COLUMNS)
+            cur.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cur.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {table}_default WHERE trade_date >= %s AND trade_date < %s RETURNING {cols}
+                )
+                INSERT INTO {name} ({cols}) SELECT {cols} FROM moved
+            """, (lower, upper))
+            logger.info(f"Moved {cur.rowcount} rows from {table}_default to {name}")
+            cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", (lower, upper))
+        else:
+            cur.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", (lower, upper))
+        created.append(name)
+    return created
+
+def install_mirror_trigger(cur, source, target):
+    """이전 중 source에 들어오는 변경을 target에도 반영하는 trigger"""
+    cols = ', '.join(COLUMNS)
+    new_values = ', '.join(f"NEW.{col}" for col in COLUMNS)
+    updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in COLUMNS[2:])
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION {MIRROR_FUNCTION}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                DELETE FROM {target} WHERE ticker = OLD.ticker AND trade_date = OLD.trade_date;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {target} ({cols}) VALUES ({new_values})
+                ON CONFLICT (ticker, trade_date) DO UPDATE SET {updates};
+                RETURN NEW;
+            END IF;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS {MIRROR_FUNCTION} ON {source};
+        CREATE TRIGGER {MIRROR_FUNCTION}
+            AFTER INSERT OR UPDATE OR DELETE ON {source}
+            FOR EACH ROW EXECUTE FUNCTION {MIRROR_FUNCTION}();
+    """)
+
+def month_batches(first_day, last_day, months=1):
+    """[시작, 끝) 월 단위 구간 목록"""
+    batches = []
+    year, month = first_day.year, first_day.month
+    while date(year, month, 1) <= last_day:
+        lower = date(year, month, 1)
+        month += months
+        year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+        batches.append((lower, date(year, month, 1)))
+    return batches
+
+def copy_batch(source, target, lower, upper):
+    """
+    한 구간을 복사하고 commit
+
+    FOR SHARE로 복사 중인 행만 잠가, 동시에 삭제/수정된 행이 trigger 반영 이후
+    옛 값으로 되살아나지 않도록 합니다. trigger가 먼저 넣은 행은 DO NOTHING으로 유지됩니다.
+    """
+    cols = ', '.join(COLUMNS)
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                INSERT INTO {target} ({cols})
+                SELECT {cols} FROM {source}
+                WHERE trade_date >= %s AND trade_date < %s
+                FOR SHARE
+                ON CONFLICT (ticker, trade_date) DO NOTHING
+            """, (lower, upper))
+            return cur.rowcount
+
+def yearly_counts(cur, table):
+    cur.execute(f"SELECT EXTRACT(YEAR FROM trade_date)::int, COUNT(*) FROM {table} GROUP BY 1 ORDER BY 1")
+    return dict(cur.fetchall())
+
+def verify(source, target):
+    """연도별 행 수 비교. 다른 연도 목록을 반환"""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            expected, actual = yearly_counts(cur, source), yearly_counts(cur, target)
+    mismatched = []
+    for year in sorted(set(expected) | set(actual)):
+        ok = expected.get(year, 0) == actual.get(year, 0)
+        logger.info(f"{year}: {source}={expected.get(year, 0)} {target}={actual.get(year, 0)}{'' if ok else '  MISMATCH'}")
+        if not ok:
+            mismatched.append(year)
+    return mismatched
+
+def swap(lock_timeout):
+    """짧은 lock 안에서 이름 교체: stock_data -> stock_data_old, stock_data_new -> stock_data"""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout)}s'")
+            cur.execute(f"LOCK TABLE {SOURCE} IN ACCESS EXCLUSIVE MODE")
+            cur.execute(f"DROP TRIGGER IF EXISTS {MIRROR_FUNCTION} ON {SOURCE}")
+            cur.execute(f"DROP FUNCTION IF EXISTS {MIRROR_FUNCTION}()")
+
+            # 인덱스 이름은 schema 안에서 유일해야 하므로 기존 인덱스부터 비켜 둠
+            cur.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass", (SOURCE,))
+            for (index,) in cur.fetchall():
+                cur.execute(f"ALTER INDEX {index} RENAME TO {index}_old")
+            cur.execute(f"ALTER TABLE {SOURCE} RENAME TO {OLD}")
+
+            cur.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass", (TARGET,))
+            for (index,) in cur.fetchall():
+                if index.endswith('_new'):
+                    cur.execute(f"ALTER INDEX {index} RENAME TO {index[:-len('_new')]}")
+            cur.execute("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass", (TARGET,))
+            for (partition,) in cur.fetchall():
+                cur.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass",
+                            (partition,))
+                for (index,) in cur.fetchall():
+                    if index.startswith(TARGET):
+                        cur.execute(f"ALTER INDEX {index} RENAME TO {SOURCE}{index[len(TARGET):]}")
+                cur.execute(f"ALTER TABLE {partition} RENAME TO {SOURCE}{partition[len(TARGET):]}")
+            cur.execute(f"ALTER TABLE {TARGET} RENAME TO {SOURCE}")
+    logger.info(f"Swapped {TARGET} into {SOURCE}; previous table kept as {OLD}")
+
+def migrate(months=1, dry_run=False, do_swap=True, drop_old=False, lock_timeout=10):
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            if is_partitioned(cur, SOURCE):
+                logger.info(f"{SOURCE} is already partitioned, nothing to migrate")
+                return
+            cur.execute(f"SELECT MIN(trade_date), MAX(trade_date), COUNT(*) FROM {SOURCE}")
+            first_day, last_day, rows = cur.fetchone()
+
+    today = date.today()
+    first_day, last_day = first_day or today, last_day or today
+    batches = month_batches(first_day, last_day, months)
+    years = (first_day.year, max(last_day.year, today.year) + 1)
+    logger.info(f"{SOURCE}: {rows} rows, {first_day} ~ {last_day}; partitions {years[0]}~{years[1]}, "
+                f"{len(batches)} batches of {months} month(s)")
+    if dry_run:
+        for lower, upper in batches:
+            logger.info(f"[dry run] copy {lower} <= trade_date < {upper}")
+        return
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            create_partitioned_table(cur, TARGET, suffix='_new')
+            ensure_partitions(cur, TARGET, *years)
+            install_mirror_trigger(cur, SOURCE, TARGET)
+    logger.info(f"Created {TARGET} and installed mirror trigger on {SOURCE}")
+
+    copied = 0
+    for lower, upper in batches:
+        count = copy_batch(SOURCE, TARGET, lower, upper)
+        copied += count
+        logger.info(f"Copied {count} rows for {lower} ~ {upper} (total {copied})")
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {TARGET}")
+
+    mismatched = verify(SOURCE, TARGET)
+    if mismatched:
+        logger.error(f"Row counts differ for {mismatched}; mirror trigger left in place, not swapping")
+        return
+    if not do_swap:
+        logger.info("Copy verified; run again without --no_swap to switch tables")
+        return
+
+    swap(lock_timeout)
+    if drop_old:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE {OLD}")
+        logger.info(f"Dropped {OLD}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate stock_data to a yearly range-partitioned table online.")
+    parser.add_argument("--months", type=int, default=1, help="Months copied per batch transaction")
+    parser.add_argument("--dry_run", action="store_true", help="Only print the migration plan")
+    parser.add_argument("--no_swap", action="store_true", help="Copy and verify, but keep the old table in place")
+    parser.add_argument("--drop_old", action="store_true", help="Drop stock_data_old after a successful swap")
+    parser.add_argument("--lock_timeout", type=int, default=10, help="Seconds to wait for the swap lock")
+    parser.add_argument("--ensure_only", action="store_true",
+                        help="Create partitions for this year and next on the partitioned stock_data")
+    args = parser.parse_args()
+
+    if args.ensure_only:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                if not is_partitioned(cur, SOURCE):
+                    parser.error(f"{SOURCE} is not partitioned yet")
+                year = date.today().year
+                created = ensure_partitions(cur, SOURCE, year, year + 1)
+        logger.info(f"Created partitions: {created or 'none'}")
+        return
+
+    migrate(args.months, args.dry_run, not args.no_swap, args.drop_old, args.lock_timeout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# data/parquet_cache.py
+#
+# stock_data의 월별 Parquet read-through cache
+#
+# PRICE_CACHE_DIR 환경 변수를 지정하면 켜집니다 (지정하지 않으면 항상 DB에서 조회).
+#   {PRICE_CACHE_DIR}/stock_data/month=2024-07.parquet  ← 2024년 7월 전 종목, (ticker, trade_date) 정렬
+#
+# 조회할 때 필요한 월 파일이 없으면 그 달 전체를 DB에서 한 번 읽어 저장하고,
+# 이후에는 memory map + predicate pushdown(ticker, 날짜 필터)으로 읽습니다.
+# save_stock_data_in_db가 저장한 달의 파일만 무효화하므로, 매일 적재 후 다음 조회는
+# 진행 중인 한 달만 DB에서 다시 읽습니다. 읽기 직전에 다시 무효화되면 그 조회는
+# 파일 없이 DB에서 바로 가져옵니다.
+#
+#   python -m data.parquet_cache --warm 2015 2025
+#   python -m data.parquet_cache --clear
+
+import argparse
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+from data.database import get_connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow가 없으면 cache 없이 DB에서 조회
+    pa = pc = pq = None
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['ticker', 'trade_date', 'open', 'high', 'low', 'close', 'volume']
+ROW_GROUP_SIZE = 64 * 1024  # ticker 순으로 정렬되어 있어 ticker 필터가 row group 단위로 걸러짐
+
+RANGE_QUERY = """
+    SELECT ticker, trade_date,
+           open_price::float8, high_price::float8, low_price::float8, close_price::float8,
+           volume
+    FROM stock_data
+    WHERE trade_date BETWEEN %(start_date)s AND %(end_date)s
+    AND (%(tickers)s::text[] IS NULL OR ticker = ANY(%(tickers)s::text[]))
+    ORDER BY ticker, trade_date;
+"""
+
+def cache_dir():
+    """cache 디렉터리 (꺼져 있으면 None)"""
+    root = os.getenv('PRICE_CACHE_DIR')
+    if not root or pq is None:
+        return None
+    return os.path.join(root, 'stock_data')
+
+def enabled():
+    return cache_dir() is not None
+
+def _month_path(month):
+    return os.path.join(cache_dir(), f"month={month}.parquet")
+
+def _stamp_path(month):
+    return os.path.join(cache_dir(), f"month={month}.invalidated")
+
+def _schema():
+    return pa.schema([
+        ('ticker', pa.string()), ('trade_date', pa.date32()),
+        ('open', pa.float64()), ('high', pa.float64()), ('low', pa.float64()), ('close', pa.float64()),
+        ('volume', pa.int64()),
+    ])
+
+def _query_table(start_date, end_date, tickers=None):
+    """DB에서 기간(양끝 포함) 가격을 읽어 cache 파일과 같은 schema의 Table로 반환"""
+    params = {'start_date': start_date, 'end_date': end_date,
+              'tickers': None if tickers is None else list(tickers)}
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(RANGE_QUERY, params)
+            rows = cur.fetchall()
+    return pa.Table.from_pandas(pd.DataFrame(rows, columns=COLUMNS), schema=_schema(), preserve_index=False)
+
+def _load_month(month):
+    """DB에서 한 달 전체를 읽어 Parquet로 저장 (month: pd.Period)"""
+    started = time.time()
+    table = _query_table(month.start_time.date(), month.end_time.date())
+
+    # 쓰는 도중 읽어도 깨진 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체
+    os.makedirs(cache_dir(), exist_ok=True)
+    path = _month_path(month)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+    # 읽는 동안 같은 달에 저장이 있었으면 방금 만든 파일은 이미 오래된 것
+    stamp = _stamp_path(month)
+    if os.path.exists(stamp) and os.path.getmtime(stamp) >= started:
+        _remove(path)
+        logger.info(f"Price cache for {month} invalidated while loading, not kept")
+    else:
+        logger.info(f"Cached {table.num_rows} rows for {month} in {time.time() - started:.1f}s")
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def read_prices(tickers, start_date, end_date):
+    """
+    cache에서 기간 내 가격 조회 (없는 달은 DB에서 채움)
+
+    Args:
+        tickers (iterable or None): 조회할 티커 목록. None이면 전 종목.
+        start_date, end_date (str or date): 조회 기간 (양끝 포함).
+
+    Returns:
+        pd.DataFrame: COLUMNS 컬럼의 long-format DataFrame ((ticker, trade_date) 정렬).
+    """
+    start_date, end_date = pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date()
+    filters = [('trade_date', '>=', start_date), ('trade_date', '<=', end_date)]
+    if tickers is not None:
+        filters.append(('ticker', 'in', list(tickers)))
+
+    tables = []
+    for month in pd.period_range(start_date, end_date, freq='M'):
+        path = _month_path(month)
+        try:
+            if not os.path.exists(path):
+                _load_month(month)
+            tables.append(pq.read_table(path, columns=COLUMNS, filters=filters, memory_map=True))
+        except FileNotFoundError:
+            # 읽기 전에 다시 무효화된 경우: 이번 조회는 그 달 구간만 DB에서 바로 읽음
+            tables.append(_query_table(max(start_date, month.start_time.date()),
+                                       min(end_date, month.end_time.date()), tickers))
+
+    table = pa.concat_tables(tables) if tables else _schema().empty_table()
+    if len(tables) > 1:
+        table = table.take(_ticker_order(table))
+    # date32를 timestamp로 바꿔 두면 to_pandas가 object 대신 datetime64 컬럼을 바로 만듦
+    table = table.set_column(1, 'trade_date', table['trade_date'].cast(pa.timestamp('s')))
+    return table.to_pandas()
+
+def _ticker_order(table):
+    """월 파일은 각각 (ticker, trade_date) 순이므로 ticker 기준 stable 정렬만 하면 됨"""
+    encoded = pc.dictionary_encode(table['ticker']).combine_chunks()
+    rank = np.argsort(np.argsort(encoded.dictionary.to_numpy(zero_copy_only=False)))
+    return np.argsort(rank[encoded.indices.to_numpy()], kind='stable')
+
+def invalidate_months(months):
+    """저장된 달의 cache 파일 삭제 (다음 조회 때 DB에서 다시 채움)"""
+    if not enabled():
+        return
+    os.makedirs(cache_dir(), exist_ok=True)
+    for month in sorted(set(months)):
+        stamp = _stamp_path(month)
+        with open(stamp, 'a'):
+            os.utime(stamp)
+        _remove(_month_path(month))
+
+def invalidate_dates(trade_dates):
+    invalidate_months(pd.to_datetime(pd.Series(list(trade_dates))).dt.to_period('M').unique())
+
+def clear():
+    if not enabled() or not os.path.isdir(cache_dir()):
+        return
+    for name in os.listdir(cache_dir()):
+        _remove(os.path.join(cache_dir(), name))
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Parquet price cache (PRICE_CACHE_DIR).")
+    parser.add_argument("--warm", nargs=2, type=int, metavar=("FIRST_YEAR", "LAST_YEAR"),
+                        help="Rebuild the monthly cache files for a range of years")
+    parser.add_argument("--clear", action="store_true", help="Delete every cache file")
+    args = parser.parse_args()
+
+    if not enabled():
+        parser.error("Set PRICE_CACHE_DIR (and install pyarrow) to use the price cache")
+    if args.clear:
+        clear()
+        logger.info(f"Cleared {cache_dir()}")
+    if args.warm:
+        for month in pd.period_range(f"{args.warm[0]}-01", f"{args.warm[1]}-12", freq='M'):
+            _load_month(month)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# data/rate_limiter.py
+
+import os
+import threading
+import time
+import logging
+from utils import metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+THROTTLE_MARKERS = ('too many requests', 'rate limit', '429')
+
+def is_throttle_error(error):
+    """upstream이 요청을 제한(429/rate limit)했을 때 발생한 예외인지 판별"""
+    if type(error).__name__ == 'YFRateLimitError':
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+class AdaptiveRateLimiter:
+    """
+    처리량을 스스로 조절하는 스레드 안전 token bucket.
+
+    요청마다 acquire()로 토큰을 받고, 결과를 record_success()/record_throttle()로
+    알려줍니다. 제한 오류가 나면 속도를 decrease 배로 줄이고 버킷을 비우며,
+    recovery_successes번 연속 성공할 때마다 increase만큼 속도를 올립니다 (AIMD).
+
+    Args:
+        rate (float): 초당 요청 수 초기값.
+        burst (float): 버킷 용량. 기본값은 rate.
+        min_rate (float): 속도 하한.
+        max_rate (float): 속도 상한.
+        increase (float): 회복 시 더하는 초당 요청 수.
+        decrease (float): 제한 오류 시 곱하는 비율.
+        recovery_successes (int): 속도를 올리기 위한 연속 성공 횟수.
+    """
+
+    def __init__(self, rate=2.0, burst=None, min_rate=0.2, max_rate=10.0,
+                 increase=0.25, decrease=0.5, recovery_successes=20):
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError("rate limits must satisfy 0 < min_rate <= rate <= max_rate")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.recovery_successes = recovery_successes
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._streak = 0
+        self._lock = threading.Lock()
+        self._stats = {'acquired': 0, 'wait_time': 0.0, 'throttled': 0, 'successes': 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1.0):
+        """토큰을 얻을 때까지 대기하고, 대기한 시간(초)을 반환"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self._stats['acquired'] += 1
+                    self._stats['wait_time'] += waited
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def record_success(self):
+        with self._lock:
+            self._stats['successes'] += 1
+            self._streak += 1
+            if self._streak >= self.recovery_successes and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+                self._streak = 0
+
+    def record_throttle(self):
+        with self._lock:
+            self._stats['throttled'] += 1
+            self._streak = 0
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            rate = self.rate
+        logger.warning(f"Upstream throttling detected, lowering request rate to {rate:.2f}/s")
+
+    def call(self, func, *args, **kwargs):
+        """토큰을 받은 뒤 func를 호출하고 결과에 따라 속도를 조절"""
+        self.acquire()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_throttle_error(e):
+                self.record_throttle()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, rate=self.rate)
+
+# 프로세스 전체에서 공유하는 yfinance 요청 limiter
+yfinance_limiter = AdaptiveRateLimiter(
+    rate=float(os.getenv('YF_RATE', '2')),
+    min_rate=float(os.getenv('YF_MIN_RATE', '0.2')),
+    max_rate=float(os.getenv('YF_MAX_RATE', '10'))
+)
+metrics.register_source('yfinance_limiter', yfinance_limiter.stats)
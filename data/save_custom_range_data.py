@@ -1,9 +1,10 @@
 import data.data_fetcher as fetch
 import data.data_saver as save
-from data.trading_calendar import is_trading_day
+from data.trading_calendar import trading_days_between
 from datetime import datetime, timedelta, date
-import time
 import argparse
+import json
+import os
 from datetime import datetime
 
 def validate_date(date_str):
@@ -15,10 +16,91 @@ def validate_date(date_str):
     except ValueError:
         raise argparse.ArgumentTypeError(f"Invalid date format: {date_str}. Use YYYY-MM-DD.")
 
+def missing_ranges(missing_days, trading_days, merge_gap=5):
+    """
+    종목의 누락 거래일을 연속 구간 (시작일, 종료일) 목록으로 묶습니다.
+
+    merge_gap 거래일 이하로 떨어진 구간은 하나로 합쳐 요청 수를 줄입니다
+    (이미 있는 날짜를 다시 받아도 upsert라 결과는 같습니다).
+    """
+    position = {day: index for index, day in enumerate(trading_days)}
+    ranges = []
+    for day in sorted(missing_days):
+        if ranges and position[day] - position[ranges[-1][1]] <= merge_gap:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(r) for r in ranges]
+
+def plan_backfill(tickers, trading_days, merge_gap=5):
+    """
+    stock_data의 기존 데이터와 거래일을 비교해, 같은 누락 구간을 가진 종목끼리 묶습니다.
+
+    Returns:
+        dict: {(시작일, 종료일): [티커, ...]}
+    """
+    missing = fetch.fetch_missing_days_from_db(tickers, trading_days)
+    plan = {}
+    for ticker, group in missing.groupby('ticker', sort=False):
+        for gap in missing_ranges(group['trade_date'], trading_days, merge_gap):
+            plan.setdefault(gap, []).append(ticker)
+    return plan
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f).get('done', []))
+
+def save_checkpoint(path, done):
+    # 중간에 종료돼도 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'done': sorted(done), 'updated_at': datetime.now().isoformat(timespec='seconds')}, f)
+    os.replace(tmp_path, path)
+
+def backfill(plan, done, checkpoint, chunk_size=200, provider=None):
+    """
+    plan_backfill 결과의 구간별로 가격을 받아 저장하고 checkpoint를 갱신합니다.
+
+    fetch_stock_data_batch는 실패한 chunk를 로그만 남기고 건너뛰고 yf.download도 실패한
+    종목을 조용히 빼므로, 구간 데이터가 실제로 돌아온 종목만 그 구간을 끝낸 것으로 봅니다.
+    모든 구간을 받은 종목만 done에 추가하고 나머지는 다음 실행에서 다시 시도합니다.
+
+    Returns:
+        int: 새로 저장되거나 갱신된 행 수.
+    """
+    # 종목별 남은 구간 수 (모든 구간을 받아야 완료 처리)
+    remaining = {}
+    for group in plan.values():
+        for ticker in group:
+            remaining[ticker] = remaining.get(ticker, 0) + 1
+
+    saved_rows = 0
+    for (gap_start, gap_end), group in sorted(plan.items()):
+        fetched = 0
+        for offset in range(0, len(group), chunk_size):
+            chunk = group[offset:offset + chunk_size]
+            stock_data = fetch.fetch_stock_data_batch(chunk, gap_start, gap_end + timedelta(days=1),
+                                                      chunk_size=chunk_size, provider=provider)
+            if stock_data.empty:
+                continue
+            result = save.save_stock_data_in_db(stock_data)
+            saved_rows += result['inserted'] + result['updated']
+            returned = set(stock_data['ticker']) & set(chunk)
+            fetched += len(returned)
+            for ticker in returned:
+                remaining[ticker] -= 1
+                if remaining[ticker] == 0:
+                    done.add(ticker)
+            save_checkpoint(checkpoint, done)
+        print(f"{gap_start} ~ {gap_end} : {fetched}/{len(group)} 종목 완료")  # 구간별 진행 상황 출력
+    return saved_rows
+
 def main():
     # ArgumentParser 초기화
     parser = argparse.ArgumentParser(
-        description="Save stock data for a specific symbol and date range."
+        description="Backfill missing stock data for every symbol over a date range."
     )
     # 명령줄 인자 추가
     parser.add_argument(
@@ -27,31 +109,57 @@ def main():
     parser.add_argument(
         "end_date", type=validate_date, help="End date in YYYY-MM-DD format"
     )
+    parser.add_argument(
+        "--chunk_size", type=int, default=200, help="Number of tickers per download request"
+    )
+    parser.add_argument(
+        "--merge_gap", type=int, default=5, help="Merge missing ranges separated by at most this many trading days"
+    )
+    parser.add_argument(
+        "--checkpoint", type=str, default=None, help="Checkpoint file (default: log/backfill_<start>_<end>.json)"
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore an existing checkpoint and start over"
+    )
 
     # 인자 파싱
     args = parser.parse_args()
     start_date = args.start_date.date();
     end_date = args.end_date.date()
-    adjusted_end_date = end_date + timedelta(days=1)
+    checkpoint = args.checkpoint or os.path.join('log', f"backfill_{start_date}_{end_date}.json")
+    os.makedirs(os.path.dirname(checkpoint) or '.', exist_ok=True)
 
     symbols = fetch.fetch_symbols_from_db()
-    tickers = tuple(row['symbol'] for row in symbols)
+    tickers = tuple(symbols['symbol'])
 
     # 시작 시간 기록
     start_time = datetime.now()
     print(f"전체 데이터 개수 : {len(tickers)}")  # 전체 데이터 개수 출력
 
-    # for symbol in tickers:
-    for index, symbol in enumerate(tickers, start=1):  # enumerate로 번호와 데이터를 가져옴
-      stock_data = fetch.fetch_stock_data_from_yfinance(symbol, start_date, adjusted_end_date)
-      time.sleep(2.2)
-      save.save_stock_data_in_db(stock_data)
-      print(f"{index} {symbol} {start_date} {end_date} ")  # 현재 번호와 ticker 출력
-    
+    # 이전 실행에서 끝낸 종목은 건너뜀
+    done = set() if args.restart else load_checkpoint(checkpoint)
+    pending = [ticker for ticker in tickers if ticker not in done]
+    print(f"체크포인트 완료 종목 : {len(tickers) - len(pending)}")
+
+    # 누락 구간만 계산해서 같은 구간끼리 묶어 조회
+    trading_days = trading_days_between(start_date, end_date)
+    plan = plan_backfill(pending, trading_days, args.merge_gap)
+    planned = {ticker for group in plan.values() for ticker in group}
+    done.update(ticker for ticker in pending if ticker not in planned)  # 빠진 날짜가 없는 종목
+    save_checkpoint(checkpoint, done)
+    print(f"누락 구간 수 : {len(plan)}, 대상 종목 수 : {len(planned)}")
+
+    saved_rows = backfill(plan, done, checkpoint, args.chunk_size)
+    pending = {ticker for group in plan.values() for ticker in group} - done
+    if pending:
+        print(f"미완료 종목 : {len(pending)} (다시 실행하면 이어서 받습니다)")
+
+    print(f"저장 행 수 : {saved_rows}")
+
     # 종료 시간 기록
     end_time = datetime.now()
 
-    print(f"시작시간: {start_time.strftime("%Y-%m-%d %H:%M:%S")}")  # 시작 시간 출력    
-    print(f"종료시간: {end_time.strftime("%Y-%m-%d %H:%M:%S")}")  # 종료 시간 출력
+    print(f"시작시간: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")  # 시작 시간 출력
+    print(f"종료시간: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")  # 종료 시간 출력
 if __name__ == "__main__":
     main()
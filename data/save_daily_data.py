@@ -1,37 +1,66 @@
 import data.data_fetcher as fetch
 import data.data_saver as save
 from data.trading_calendar import is_trading_day
+from data.ingest_pipeline import ingest
+from analysis.indicator_state import update_indicator_state
+from utils import metrics
 from datetime import datetime, timedelta, date
-import time
+import argparse
 
 def main():
+  parser = argparse.ArgumentParser(description="Save yesterday's stock data for every symbol.")
+  parser.add_argument("--mode", choices=["batch", "async"], default="batch",
+                      help="batch: fetch everything then save, async: overlap fetching and saving")
+  parser.add_argument("--chunk_size", type=int, default=200, help="Number of tickers per download request")
+  parser.add_argument("--fetch_concurrency", type=int, default=2, help="Concurrent download chunks (async mode)")
+  parser.add_argument("--flush_rows", type=int, default=50000, help="Rows buffered before each DB write (async mode)")
+  parser.add_argument("--flush_interval", type=float, default=30.0, help="Seconds between DB writes (async mode)")
+  parser.add_argument("--skip_indicator_state", action="store_true",
+                      help="Do not advance indicator_state after saving")
+  parser.add_argument("--metrics_output", type=str, default=None,
+                      help="Also write the per-stage run metrics JSON to this path (always logged at the end)")
+  parser.add_argument("--profile", choices=metrics.PROFILE_MODES, default=None,
+                      help="Profile the run with cProfile or the sampling profiler")
+  parser.add_argument("--profile_output", type=str, default=None, help="Profile output path")
+  args = parser.parse_args()
 
   today = date.today()
   yesterday = (today - timedelta(days=1)).strftime('%Y-%m-%d')
 
-  if (is_trading_day(yesterday)):
-    symbols = fetch.fetch_symbols_from_db()
-    tickers = tuple(row['symbol'] for row in symbols)
+  # 네트워크/재시도/DB 시간을 단계별로 기록하고 끝날 때 JSON 요약을 cron 로그에 남김
+  with metrics.run('save_daily_data', output=args.metrics_output, profile_mode=args.profile,
+                   profile_output=args.profile_output):
+    if (is_trading_day(yesterday)):
+      symbols = fetch.fetch_symbols_from_db()
+      tickers = tuple(symbols['symbol'])
 
-    # 시작 시간 기록
-    start_time = datetime.now()
+      # 시작 시간 기록
+      start_time = datetime.now()
 
-    # for symbol in tickers:
-    for index, symbol in enumerate(tickers, start=1):  # enumerate로 번호와 데이터를 가져옴
-      stock_data = fetch.fetch_stock_data_from_yfinance(symbol, yesterday, today)
-      time.sleep(1.5)
-      if stock_data:
-        save.save_stock_data_in_db(stock_data)
-        print(f"{index}/{len(tickers)} {symbol} 저장 완료")
+      if args.mode == "async":
+        # 조회와 저장을 겹쳐 실행, 단계별 처리량 요약은 파이프라인이 출력
+        ingest(tickers, yesterday, today, chunk_size=args.chunk_size, fetch_concurrency=args.fetch_concurrency,
+               flush_rows=args.flush_rows, flush_interval=args.flush_interval)
       else:
-        print(f"{index}/{len(tickers)} {symbol} 정보 없음")
+        # 전체 종목을 chunk 단위로 한 번에 조회 후 일괄 저장
+        stock_data = fetch.fetch_stock_data_batch(tickers, yesterday, today, chunk_size=args.chunk_size)
+        if not stock_data.empty:
+          save.save_stock_data_in_db(stock_data)
+        print(f"저장 종목 수 : {stock_data['ticker'].nunique()}/{len(tickers)}")
+
+      # 저장한 하루치로 종목별 지표 상태를 한 세션 앞으로 이동 (실패해도 적재 결과는 유지)
+      if not args.skip_indicator_state:
+        try:
+          update_indicator_state(yesterday)
+        except Exception as e:
+          print(f"indicator_state 갱신 실패: {e}")
     
-    # 종료 시간 기록
-    end_time = datetime.now()
+      # 종료 시간 기록
+      end_time = datetime.now()
 
-    print(f"전체 종목 수 : {len(tickers)}")  # 전체 데이터 개수 출력
-    print(f"시작시간: {start_time.strftime("%Y-%m-%d %H:%M:%S")}")  # 시작 시간 출력    
-    print(f"종료시간: {end_time.strftime("%Y-%m-%d %H:%M:%S")}")  # 종료 시간 출력
+      print(f"전체 종목 수 : {len(tickers)}")  # 전체 데이터 개수 출력
+      print(f"시작시간: {start_time.strftime("%Y-%m-%d %H:%M:%S")}")  # 시작 시간 출력    
+      print(f"종료시간: {end_time.strftime("%Y-%m-%d %H:%M:%S")}")  # 종료 시간 출력
 
 if __name__ == '__main__':
   main()
@@ -0,0 +1,108 @@
+import data.data_fetcher as fetch
+import data.data_saver as save
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import argparse
+import pytz
+
+FUNDAMENTAL_TABLES = ('stock_info', 'stock_financials_history')
+
+def _flush(info_rows, financial_rows, tables):
+    """모아 둔 레코드를 테이블별로 일괄 저장"""
+    if tables == FUNDAMENTAL_TABLES:
+        return save.save_fundamentals_in_db(info_rows, financial_rows)
+    if 'stock_info' in tables:
+        return {'stock_info': save.save_stock_info_in_db(info_rows)}
+    return {'stock_financials_history': save.save_stock_financials_in_db(financial_rows)}
+
+def run_fundamentals_ingest(tickers, workers=4, batch_size=200, tables=FUNDAMENTAL_TABLES,
+                            fetcher=fetch.fetch_fundamentals_from_yfinance):
+    """
+    종목마다 Ticker.info를 한 번만 조회해 stock_info와 stock_financials_history를 함께 채움
+
+    요청 속도는 공유 yfinance rate limiter가 조절하고, 저장은 batch_size 종목마다
+    bulk upsert 한 번으로 처리합니다.
+
+    Args:
+        tickers (iterable): 대상 티커 목록.
+        workers (int): 동시에 조회할 스레드 수.
+        batch_size (int): 몇 종목마다 저장할지.
+        tables (tuple): 저장할 테이블 (FUNDAMENTAL_TABLES의 부분집합).
+        fetcher (callable): (ticker, recorded_at) -> (info dict, financials dict).
+
+    Returns:
+        dict: 처리 종목 수, 빈 응답/오류 수, 테이블별 저장 결과 합계.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    # 한 번의 실행에서 저장하는 재무 정보는 같은 기록일을 사용
+    recorded_at = datetime.now(pytz.timezone('Asia/Seoul')).strftime('%Y-%m-%d')
+    summary = {'tickers': len(tickers), 'fetched': 0, 'empty': 0, 'errors': 0, 'saved': {}}
+    info_rows, financial_rows = [], []
+
+    def flush():
+        if not info_rows and not financial_rows:
+            return
+        for table, result in _flush(info_rows, financial_rows, tables).items():
+            totals = summary['saved'].setdefault(table, {})
+            for key, value in result.items():
+                totals[key] = totals.get(key, 0) + value
+        info_rows.clear()
+        financial_rows.clear()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetcher, ticker, recorded_at): ticker for ticker in tickers}
+        for index, future in enumerate(as_completed(futures), start=1):
+            ticker = futures[future]
+            try:
+                stock_info, financials = future.result()
+            except Exception as e:
+                summary['errors'] += 1
+                print(f"오류 발생: {ticker}, {e}")
+                continue
+            if not stock_info:
+                summary['empty'] += 1
+                continue
+            summary['fetched'] += 1
+            info_rows.append(stock_info)
+            financial_rows.append(financials)
+            if len(info_rows) >= batch_size:
+                flush()
+                print(f"{index}/{len(tickers)} 저장 완료")
+    flush()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fetch Ticker.info once per symbol and save stock_info and stock_financials_history."
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent Ticker.info requests")
+    parser.add_argument("--batch_size", type=int, default=200, help="Tickers per bulk write")
+    parser.add_argument("--tables", nargs="+", choices=FUNDAMENTAL_TABLES, default=list(FUNDAMENTAL_TABLES),
+                        help="Tables to fill")
+    parser.add_argument("--tickers", nargs="+", default=None, help="Only these tickers (default: every symbol)")
+    args = parser.parse_args()
+
+    if args.tickers:
+        tickers = tuple(args.tickers)
+    else:
+        symbols = fetch.fetch_symbols_from_db()
+        tickers = tuple(symbols['symbol'])
+    tables = tuple(table for table in FUNDAMENTAL_TABLES if table in args.tables)
+
+    # 시작 시간 기록
+    start_time = datetime.now()
+    print(f"전체 종목 수: {len(tickers)}")
+
+    summary = run_fundamentals_ingest(tickers, workers=args.workers, batch_size=args.batch_size, tables=tables)
+
+    # 종료 시간 기록
+    end_time = datetime.now()
+
+    print(f"조회 {summary['fetched']} / 정보 없음 {summary['empty']} / 오류 {summary['errors']}")
+    for table, result in summary['saved'].items():
+        print(f"{table}: {result}")
+    print(f"시작시간: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"종료시간: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+if __name__ == '__main__':
+    main()
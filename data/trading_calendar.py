@@ -1,5 +1,8 @@
 import locale
 from datetime import datetime
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 import data.data_fetcher as dl
 
 # def us_stock_holidays(year):
@@ -20,6 +23,91 @@ import data.data_fetcher as dl
 #     # 추가 공휴일을 추가하세요.
 #   ]
 
+class TradingCalendar:
+  """
+  In-memory U.S. stock market calendar with vectorized trading-day arithmetic.
+
+  Every method accepts a single date (str, date, datetime, np.datetime64) or an
+  array-like of dates and returns a scalar or an array accordingly.
+
+  Args:
+    holidays (iterable): Market holiday dates.
+  """
+
+  def __init__(self, holidays=()):
+    self.holidays = np.unique(np.asarray(pd.to_datetime(list(holidays)).values, dtype='datetime64[D]'))
+    self._busdaycal = np.busdaycalendar(weekmask='1111100', holidays=self.holidays)
+
+  @staticmethod
+  def _to_days(dates):
+    if np.ndim(dates) == 0:
+      return np.datetime64(pd.Timestamp(dates).date(), 'D'), True
+    return np.asarray(pd.to_datetime(np.asarray(dates)).values, dtype='datetime64[D]'), False
+
+  @staticmethod
+  def _from_days(days, scalar):
+    return days.astype(object) if scalar else days
+
+  def is_trading_day(self, dates):
+    """True for weekdays that are not market holidays."""
+    days, scalar = self._to_days(dates)
+    result = np.is_busday(days, busdaycal=self._busdaycal)
+    return bool(result) if scalar else result
+
+  def rollback(self, dates):
+    """The trading day on or before each date."""
+    days, scalar = self._to_days(dates)
+    return self._from_days(np.busday_offset(days, 0, roll='backward', busdaycal=self._busdaycal), scalar)
+
+  def rollforward(self, dates):
+    """The trading day on or after each date."""
+    days, scalar = self._to_days(dates)
+    return self._from_days(np.busday_offset(days, 0, roll='forward', busdaycal=self._busdaycal), scalar)
+
+  def previous_trading_day(self, dates, n=1):
+    """The n-th trading day strictly before each date."""
+    days, scalar = self._to_days(dates)
+    return self._from_days(np.busday_offset(days, -n, roll='forward', busdaycal=self._busdaycal), scalar)
+
+  def offset(self, dates, sessions):
+    """Move each date (rolled back to a trading day) by the given number of sessions."""
+    days, scalar = self._to_days(dates)
+    return self._from_days(np.busday_offset(days, sessions, roll='backward', busdaycal=self._busdaycal), scalar)
+
+  def count_between(self, start_dates, end_dates):
+    """Number of trading days in [start, end] (both inclusive)."""
+    start, scalar = self._to_days(start_dates)
+    end, _ = self._to_days(end_dates)
+    result = np.busday_count(start, end + np.timedelta64(1, 'D'), busdaycal=self._busdaycal)
+    return int(result) if scalar else result
+
+  def trading_days_between(self, start_date, end_date):
+    """Trading days in [start, end] (both inclusive) as a datetime64[D] array."""
+    start, _ = self._to_days(start_date)
+    end, _ = self._to_days(end_date)
+    days = np.arange(start, end + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+    return days[np.is_busday(days, busdaycal=self._busdaycal)]
+
+  def window_start(self, end_dates, calendar_days):
+    """
+    First trading day of a calendar-day lookback window, e.g. "183 days back".
+
+    Maps end - calendar_days onto the first trading session on or after it.
+    """
+    end, scalar = self._to_days(end_dates)
+    return self._from_days(np.busday_offset(end - np.timedelta64(calendar_days, 'D'), 0, roll='forward',
+                                            busdaycal=self._busdaycal), scalar)
+
+@lru_cache(maxsize=1)
+def get_trading_calendar():
+  """
+  Process-wide TradingCalendar; market_holidays is read only once.
+
+  A failed holiday query raises instead of returning an empty list, and
+  lru_cache does not keep exceptions, so the next call retries the load.
+  """
+  return TradingCalendar(dl.fetch_all_holidays_from_db())
+
 def is_trading_day(date):
   """
   Check if the given date is a trading day.
@@ -30,17 +118,17 @@ def is_trading_day(date):
   Returns:
     bool: True if the date is a trading day, False otherwise.
   """
-  if isinstance(date, str):
-    date = datetime.strptime(date, '%Y-%m-%d').date()
+  return get_trading_calendar().is_trading_day(date)
 
-  # Check if the date is a weekend
-  if date.weekday() in [5, 6]:  # 5 = Saturday, 6 = Sunday
-    return False
+def trading_days_between(start_date, end_date):
+  """
+  Return the trading days between two dates (inclusive).
 
-  # Check if the date is a U.S. stock market holiday
-  year = date.year
-  holidays = dl.fetch_holidays_from_db(year)
-  holiday_dates = [holiday[0] for holiday in holidays]  # 공휴일 리스트
+  Args:
+    start_date (str or date): First date of the range.
+    end_date (str or date): Last date of the range.
 
-  #return date.strftime('%Y-%m-%d') not in holidays
-  return date not in holiday_dates
\ No newline at end of file
+  Returns:
+    list[date]: Weekdays in the range that are not U.S. stock market holidays.
+  """
+  return list(get_trading_calendar().trading_days_between(start_date, end_date).astype(object))
@@ -5,10 +5,11 @@ import logging
 from datetime import datetime, timedelta
 import pandas as pd
 import pytz
-from data.data_fetcher import fetch_momentum_symbols_from_db, fetch_recent_trading_days_from_db
-from analysis.financial_momentum import fetch_stock_analysis
-from data.database import get_connection
-from psycopg2.extras import execute_batch
+from data.data_fetcher import fetch_momentum_symbols_from_db, fetch_momentum_screen_from_db, fetch_recent_trading_days_from_db
+from analysis.financial_momentum import fetch_stock_analysis, parse_weights, WEIGHT_KEYS
+from data.data_saver import save_quant_result_in_db
+from data.trading_calendar import get_trading_calendar
+from utils import metrics
 
 # Logging 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,43 +17,11 @@ logger = logging.getLogger(__name__)
 
 def save_to_quant_result(data, trade_date):
     """quant_result 테이블에 지표 데이터 저장"""
-    query = """
-        INSERT INTO quant_result (trade_date, ticker, six_month_change, rsi, revenue_growth, 
-                                 debt_to_equity, pbr, sortino_ratio, average_volume, weighted_score)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (trade_date, ticker) DO UPDATE 
-        SET six_month_change = EXCLUDED.six_month_change,
-            rsi = EXCLUDED.rsi,
-            revenue_growth = EXCLUDED.revenue_growth,
-            debt_to_equity = EXCLUDED.debt_to_equity,
-            pbr = EXCLUDED.pbr,
-            sortino_ratio = EXCLUDED.sortino_ratio,
-            average_volume = EXCLUDED.average_volume,
-            weighted_score = EXCLUDED.weighted_score;
-    """
     try:
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                records = [
-                    (
-                        trade_date,
-                        row['Ticker'],
-                        row['6M Change'],
-                        row['RSI'],
-                        row['Revenue Growth'],
-                        row['Debt to Equity'],
-                        row['PBR'],
-                        row['Sortino Ratio'],
-                        row['Average Volume'],
-                        row['Weighted Score']
-                    ) for _, row in data.iterrows() if row['Ticker']
-                ]
-                execute_batch(cur, query, records)
-                conn.commit()
-                logger.info(f"Successfully saved {len(records)} records for {trade_date}")
+        result = save_quant_result_in_db(data, trade_date)
+        logger.info(f"Successfully saved {result['inserted'] + result['updated']} records for {trade_date}")
     except Exception as e:
         logger.error(f"Error saving to quant_result: {e}")
-        conn.rollback()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Calculate and save momentum stock indicators to quant_result.")
@@ -60,7 +29,8 @@ if __name__ == "__main__":
     # 기본 파라미터
     result = fetch_recent_trading_days_from_db()  # 6개월 기간
     default_end_date = result.get('end_date', datetime.now(pytz.timezone('Asia/Seoul')).strftime('%Y-%m-%d'))
-    default_start_date = (pd.to_datetime(default_end_date) - timedelta(days=183)).strftime('%Y-%m-%d')
+    # 183일 전을 거래일 기준으로 맞춤 (그 날 또는 이후의 첫 거래일)
+    default_start_date = get_trading_calendar().window_start(default_end_date, 183).strftime('%Y-%m-%d')
     default_min_volume = 10000000
     default_min_price = 50
     default_max_price = 1000
@@ -77,28 +47,62 @@ if __name__ == "__main__":
     parser.add_argument("--min_sortino", type=float, default=default_min_sortino, help="Minimum Sortino ratio")
     parser.add_argument("--min_diff_ratio", type=float, default=default_min_diff_ratio, help="Minimum price increase ratio")
     parser.add_argument("--top_n", type=int, default=default_top_n, help="Number of top stocks")
+    parser.add_argument("--screener", choices=["sql", "legacy"], default="sql",
+                        help="sql: screen prices/Sortino inside Postgres, legacy: symbol query + per-ticker filters")
+    parser.add_argument("--workers", type=int, default=8, help="Number of concurrent analysis workers")
+    parser.add_argument("--ticker_timeout", type=float, default=60, help="Per-ticker analysis timeout in seconds")
+    parser.add_argument("--weights", nargs="+", metavar="NAME=VALUE", default=None,
+                        help=f"Override Weighted Score weights, e.g. from a parameter sweep ({', '.join(WEIGHT_KEYS)})")
+    parser.add_argument("--metrics_output", type=str, default=None,
+                        help="Also write the per-stage run metrics JSON to this path (always logged at the end)")
+    parser.add_argument("--profile", choices=metrics.PROFILE_MODES, default=None,
+                        help="cprofile: deterministic profile of the main thread, sample: low-overhead sampling of all threads")
+    parser.add_argument("--profile_output", type=str, default=None,
+                        help="Profile output path (default: log/profile/<timestamp>.prof or .folded)")
 
     args = parser.parse_args()
 
-    # 모멘텀 종목 추출
-    logger.info(f"Fetching momentum symbols for {args.start_date} to {args.end_date}")
-    tickers = fetch_momentum_symbols_from_db(
-        args.start_date, args.end_date, args.min_volume, args.min_price, args.max_price, args.top_n
-    )
-    if not tickers:
-        logger.error("No tickers found matching criteria")
-        exit(1)
+    # 가중치 (parameter_sweep 결과 표와 같은 이름 사용)
+    weights = None
+    if args.weights:
+        try:
+            weights = parse_weights(args.weights)
+        except ValueError as e:
+            parser.error(str(e))
 
-    # 지표 계산
-    logger.info(f"Calculating indicators for {len(tickers)} tickers")
-    fm_result = fetch_stock_analysis(tickers, args.start_date, args.end_date, args.min_volume, 
-                                    args.min_price, args.max_price, args.min_sortino, args.min_diff_ratio)
-    if fm_result.empty:
-        logger.error("No analysis results obtained")
-        exit(1)
+    # 단계별 시간/DB round trip/재시도를 기록하고 끝날 때 JSON 요약을 남김
+    with metrics.run('main', output=args.metrics_output, profile_mode=args.profile,
+                     profile_output=args.profile_output):
+        # 모멘텀 종목 추출
+        logger.info(f"Fetching momentum symbols for {args.start_date} to {args.end_date}")
+        if args.screener == "sql":
+            # 가격/거래량/Sortino 필터를 DB에서 계산해 통과한 종목만 가져옴
+            screen = fetch_momentum_screen_from_db(
+                args.start_date, args.end_date, args.min_volume, args.min_price, args.max_price,
+                args.min_sortino, args.min_diff_ratio, args.top_n
+            )
+            tickers = tuple(screen['Ticker'])
+        else:
+            screen = None
+            tickers = fetch_momentum_symbols_from_db(
+                args.start_date, args.end_date, args.min_volume, args.min_price, args.max_price, args.top_n
+            )
+        if not tickers:
+            logger.error("No tickers found matching criteria")
+            exit(1)
 
-    # quant_result 테이블에 저장
-    trade_date = datetime.now(pytz.timezone('Asia/Seoul')).strftime('%Y-%m-%d')
-    save_to_quant_result(fm_result, trade_date)
-    logger.info(f"Analysis completed and saved for {trade_date}")
-    print(fm_result.sort_values(by='Weighted Score', ascending=False))
\ No newline at end of file
+        # 지표 계산
+        logger.info(f"Calculating indicators for {len(tickers)} tickers")
+        fm_result = fetch_stock_analysis(tickers, args.start_date, args.end_date, args.min_volume, 
+                                        args.min_price, args.max_price, args.min_sortino, args.min_diff_ratio,
+                                        max_workers=args.workers, ticker_timeout=args.ticker_timeout, weights=weights,
+                                        screen=screen)
+        if fm_result.empty:
+            logger.error("No analysis results obtained")
+            exit(1)
+
+        # quant_result 테이블에 저장
+        trade_date = datetime.now(pytz.timezone('Asia/Seoul')).strftime('%Y-%m-%d')
+        save_to_quant_result(fm_result, trade_date)
+        logger.info(f"Analysis completed and saved for {trade_date}")
+        print(fm_result.sort_values(by='Weighted Score', ascending=False))
\ No newline at end of file
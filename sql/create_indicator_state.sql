@@ -0,0 +1,42 @@
+-- 종목별 지표 상태: 최근 183일 window의 종가/거래량 버퍼와 누적 합계, 계산된 지표
+-- save_daily_data가 하루치를 저장한 뒤 analysis/indicator_state.py가 종목마다 O(1)로 갱신합니다.
+-- 전 종목의 현재 지표는 이 테이블 한 번 조회로 얻습니다 (fetch_indicator_state_from_db).
+--
+-- 처음 만들었거나 과거 날짜를 다시 적재한 뒤에는 원본 데이터로 다시 계산합니다.
+--   python -m analysis.indicator_state --rebuild
+CREATE TABLE indicator_state (
+    ticker VARCHAR(10) PRIMARY KEY,
+    as_of DATE NOT NULL,               -- window 끝 날짜 (마지막으로 반영한 거래일)
+    -- window 버퍼 (as_of - 183일 이후의 거래, 날짜순)
+    dates DATE[] NOT NULL,
+    closes FLOAT8[] NOT NULL,
+    volumes BIGINT[] NOT NULL,
+    -- 누적 합계
+    volume_sum FLOAT8 NOT NULL,
+    close_sum_60 FLOAT8 NOT NULL,      -- 최근 60개 종가 합 (SMA)
+    close_sum_200 FLOAT8 NOT NULL,     -- 최근 200개 종가 합 (SMA)
+    gain_sum FLOAT8 NOT NULL,          -- 최근 14개 종가 변화 중 상승분 합 (RSI)
+    loss_sum FLOAT8 NOT NULL,          -- 최근 14개 종가 변화 중 하락분 합 (RSI)
+    return_sum FLOAT8 NOT NULL,        -- window 일간 수익률 합 (Sortino)
+    return_count INTEGER NOT NULL,
+    downside_square_sum FLOAT8 NOT NULL, -- 음수 수익률 제곱 합 (downside deviation)
+    downside_count INTEGER NOT NULL,
+    high FLOAT8,                       -- window 최고 종가
+    -- 계산된 지표 (get_momentum_indicators / fetch_stock_analysis와 같은 정의)
+    last_close FLOAT8,
+    rsi FLOAT8,
+    high_52w_ratio FLOAT8,
+    ma_60 FLOAT8,
+    ma_200 FLOAT8,
+    change_1m FLOAT8,
+    change_3m FLOAT8,
+    change_6m FLOAT8,
+    change_1y FLOAT8,
+    sortino_ratio FLOAT8,
+    average_volume FLOAT8,
+    price_increase_ratio FLOAT8,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 오래 갱신되지 않은 종목(상장폐지 등) 확인용
+CREATE INDEX IF NOT EXISTS idx_indicator_state_as_of ON indicator_state (as_of);
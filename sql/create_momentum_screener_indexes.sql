@@ -0,0 +1,14 @@
+-- fetch_momentum_screen_from_db (SQL pushdown 모멘텀 screener) 지원 인덱스
+-- partition 레이아웃(create_stock_data_partitioned.sql)에는 covering index가 이미 포함되어 있고,
+-- 날짜 조건은 BRIN(idx_stock_data_trade_date_brin)이 처리하므로 아래 두 번째 인덱스는 필요 없습니다.
+
+-- 후보 종목의 기간 데이터를 heap 접근 없이 읽기 위한 covering index (index-only scan)
+CREATE INDEX IF NOT EXISTS idx_stock_data_ticker_date_cover
+    ON stock_data (ticker, trade_date) INCLUDE (close_price, volume);
+
+-- 마지막 거래일의 종가 범위 필터용 (trading_days에서 구한 하루치만 읽음)
+CREATE INDEX IF NOT EXISTS idx_stock_data_date_close
+    ON stock_data (trade_date) INCLUDE (ticker, close_price);
+
+-- index-only scan이 visibility map을 활용하도록 통계/VM 갱신
+VACUUM ANALYZE stock_data;
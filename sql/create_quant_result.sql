@@ -9,6 +9,7 @@ CREATE TABLE quant_result (
     pbr FLOAT,
     sortino_ratio FLOAT,
     average_volume FLOAT,
+    weighted_score FLOAT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(trade_date, ticker)
 );
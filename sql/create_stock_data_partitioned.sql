@@ -0,0 +1,45 @@
+-- 연도별 range partition stock_data (신규 설치용)
+-- 기존 단일 테이블은 data/migrate_stock_data_partitions.py로 온라인 이전합니다.
+--
+-- * trade_date 범위 조건이 있는 조회는 해당 연도 partition만 읽습니다 (partition pruning).
+--   최근 6개월 screening window는 많아야 2개 partition만 읽습니다.
+-- * 일 단위로 날짜 순서대로 적재되므로 trade_date는 BRIN으로 충분합니다.
+-- * partition 테이블의 PK/UNIQUE에는 partition key가 포함되어야 하므로 id 컬럼 없이
+--   (ticker, trade_date)를 PK로 사용합니다 (ON CONFLICT 키와 동일).
+-- * 오래된 데이터 정리는 DELETE 대신 DETACH/DROP PARTITION으로 처리합니다.
+CREATE TABLE stock_data (
+    ticker VARCHAR(10) NOT NULL,
+    trade_date DATE NOT NULL,
+    open_price NUMERIC(10, 2),
+    high_price NUMERIC(10, 2),
+    low_price NUMERIC(10, 2),
+    close_price NUMERIC(10, 2),
+    volume BIGINT,
+    CONSTRAINT stock_data_ticker_date_pkey PRIMARY KEY (ticker, trade_date)
+) PARTITION BY RANGE (trade_date);
+
+-- 날짜 범위 조회/일자별 집계용 (partition마다 자동 생성)
+CREATE INDEX idx_stock_data_trade_date_brin
+    ON stock_data USING brin (trade_date) WITH (pages_per_range = 32);
+
+-- fetch_momentum_screen_from_db의 covering index (create_momentum_screener_indexes.sql 참고)
+CREATE INDEX idx_stock_data_ticker_date_cover
+    ON stock_data (ticker, trade_date) INCLUDE (close_price, volume);
+
+-- 연도별 partition: 데이터가 있는 첫 해부터 다음 해까지 미리 생성
+CREATE TABLE stock_data_y2023 PARTITION OF stock_data FOR VALUES FROM ('2023-01-01') TO ('2024-01-01');
+CREATE TABLE stock_data_y2024 PARTITION OF stock_data FOR VALUES FROM ('2024-01-01') TO ('2025-01-01');
+CREATE TABLE stock_data_y2025 PARTITION OF stock_data FOR VALUES FROM ('2025-01-01') TO ('2026-01-01');
+CREATE TABLE stock_data_y2026 PARTITION OF stock_data FOR VALUES FROM ('2026-01-01') TO ('2027-01-01');
+
+-- 범위 밖 날짜를 받아두는 안전망. 새 연도 partition은
+--   python -m data.migrate_stock_data_partitions --ensure_only
+-- 로 만들면 default에 들어간 해당 연도 행도 함께 옮겨집니다.
+CREATE TABLE stock_data_default PARTITION OF stock_data DEFAULT;
+
+-- 오래된 연도 정리 예시
+-- ALTER TABLE stock_data DETACH PARTITION stock_data_y2023;
+-- DROP TABLE stock_data_y2023;
+
+-- pruning 확인
+-- EXPLAIN SELECT * FROM stock_data WHERE trade_date BETWEEN '2025-01-01' AND '2025-06-30';
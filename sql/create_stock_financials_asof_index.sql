@@ -0,0 +1,19 @@
+-- fetch_fundamentals_asof_from_db (종목별 as-of 재무 지표 일괄 조회) 지원 인덱스
+
+-- 종목마다 recorded_at <= 기준일인 최신 1건을 역순 index scan으로 찾고,
+-- 조회 컬럼을 INCLUDE 해서 heap 접근 없이 읽음 (index-only scan)
+CREATE INDEX IF NOT EXISTS idx_financials_ticker_recorded_cover
+    ON stock_financials_history (ticker, recorded_at DESC)
+    INCLUDE (trailing_pe, price_to_book, return_on_equity, revenue_growth, debt_to_equity);
+
+VACUUM ANALYZE stock_financials_history;
+
+-- 확인
+-- EXPLAIN ANALYZE
+-- SELECT t.ticker, f.*
+-- FROM unnest(ARRAY['AAPL', 'MSFT']) AS t(ticker)
+-- CROSS JOIN LATERAL (
+--     SELECT recorded_at, price_to_book FROM stock_financials_history h
+--     WHERE h.ticker = t.ticker AND h.recorded_at <= '2025-07-10'
+--     ORDER BY h.recorded_at DESC LIMIT 1
+-- ) f;
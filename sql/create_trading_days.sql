@@ -0,0 +1,22 @@
+-- 거래일 차원 테이블: stock_data에 적재된 거래일과 일자별 종목 수
+-- save_stock_data_in_db가 저장할 때마다 해당 일자의 ticker_count를 갱신합니다.
+CREATE TABLE trading_days (
+    trade_date DATE PRIMARY KEY,
+    ticker_count INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 일자별 종목 수 재집계를 index-only scan으로 처리하기 위한 인덱스
+CREATE INDEX IF NOT EXISTS idx_stock_data_trade_date ON stock_data (trade_date);
+
+-- 기존 데이터로 초기 적재 (한 번만 실행)
+INSERT INTO trading_days (trade_date, ticker_count)
+SELECT trade_date, COUNT(*)
+FROM stock_data
+GROUP BY trade_date
+ON CONFLICT (trade_date) DO UPDATE
+SET ticker_count = EXCLUDED.ticker_count,
+    updated_at = CURRENT_TIMESTAMP;
+
+-- 최근 N 거래일
+-- SELECT trade_date FROM trading_days ORDER BY trade_date DESC LIMIT 183;
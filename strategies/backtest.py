@@ -1,7 +1,9 @@
+import argparse
 import backtrader as bt
 import pandas as pd
-from data.data_fetcher import fetch_symbols_from_db, fetch_momentum_symbols_from_db, fetch_recent_trading_days_from_db, fetch_stock_data_from_db
+from data.data_fetcher import fetch_symbols_from_db, fetch_momentum_symbols_from_db, fetch_recent_trading_days_from_db, fetch_stock_panel_from_db, slice_stock_panel
 from strategies.momentum import filter_and_rank_stocks
+from strategies.vector_backtest import run_vector_backtest
 
 # 전략 정의
 class MomentumStrategy(bt.Strategy):
@@ -30,20 +32,39 @@ class MomentumStrategy(bt.Strategy):
                 print(f'SELL EXECUTED, {order.data._name}, Date: {bt.num2date(order.executed.dt)}, Price: {order.executed.price}, Cost: {order.executed.value}, Comm: {order.executed.comm}')
 
 # 백테스트 실행
-def run_backtest(tickers, start_date, end_date):
+def run_backtest(tickers, start_date, end_date, engine='backtrader', plot=True, **vector_kwargs):
+    """
+    backtrader 또는 NumPy vector 엔진으로 백테스트 실행
+
+    Args:
+        engine (str): 'backtrader' (종목별 feed, bar 단위 전략) 또는
+                      'vector' (run_vector_backtest, 대규모 유니버스용).
+        plot (bool): backtrader 결과 차트 표시 여부.
+        vector_kwargs: run_vector_backtest에 넘길 옵션 (top_n, rebalance_every, commission 등).
+
+    Returns:
+        backtrader: 최종 포트폴리오 가치, vector: run_vector_backtest 결과 dict.
+    """
+    if engine == 'vector':
+        result = run_vector_backtest(tickers, start_date, end_date, **vector_kwargs)
+        if not result['equity'].empty:
+            print('Starting Portfolio Value: %.2f' % result['equity'].iloc[0])
+            print('Ending Portfolio Value: %.2f' % result['equity'].iloc[-1])
+            print(result['stats'])
+        return result
+
     cerebro = bt.Cerebro()
     cerebro.addstrategy(MomentumStrategy)
 
-    # 필터링된 종목 데이터 로드
+    # 필터링된 종목 데이터를 한 번의 쿼리로 로드
+    panel = fetch_stock_panel_from_db(tickers, start_date, end_date)
     for ticker in tickers:
-        data = fetch_stock_data_from_db(ticker, start_date, end_date)
-        
-        # Trade_date 열을 datetime 형식으로 변환
-        data['Trade_date'] = pd.to_datetime(data['Trade_date'])
-        data.set_index('Trade_date', inplace=True)
+        data = slice_stock_panel(panel, ticker)
         
         # NaN 값 제거
-        data.dropna(inplace=True)
+        data = data.dropna()
+        if data.empty:
+            continue
         
         data_bt = bt.feeds.PandasData(dataname=data, name=ticker)
         cerebro.adddata(data_bt)
@@ -61,9 +82,16 @@ def run_backtest(tickers, start_date, end_date):
     print('Ending Portfolio Value: %.2f' % cerebro.broker.getvalue())
 
     # 결과 시각화
-    cerebro.plot(style='candlestick')
+    if plot:
+        cerebro.plot(style='candlestick')
+    return cerebro.broker.getvalue()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the momentum selection")
+    parser.add_argument("--engine", choices=["backtrader", "vector"], default="backtrader", help="Backtest engine")
+    parser.add_argument("--no_plot", action="store_true", help="Skip the backtrader chart")
+    args = parser.parse_args()
+
     start_date = '2025-01-03'
     end_date = '2025-01-24'
     min_volume = 8000000
@@ -79,4 +107,4 @@ if __name__ == "__main__":
     result = filter_and_rank_stocks(tickers, start_date, end_date, min_volume, min_price, max_price, 0.2, 0.2, top_n)
     print(result)
     # print(result['Ticker'])
-    run_backtest(result['Ticker'], start_date, end_date)
\ No newline at end of file
+    run_backtest(result['Ticker'], start_date, end_date, engine=args.engine, plot=not args.no_plot)
\ No newline at end of file
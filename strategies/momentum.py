@@ -1,8 +1,9 @@
 # strategies/momentum.py
 
 import pandas as pd
-from strategies.sortino_ratio import calculate_sortino_ratio
-from data.data_fetcher import fetch_stock_data_from_db, fetch_stock_data_from_yfinance
+from data.data_fetcher import (fetch_stock_data_from_db, fetch_stock_data_from_yfinance, fetch_stock_panel_from_db,
+                               slice_stock_panel, panel_to_arrays)
+from utils.factors import FactorGraph, factor_row, frame_factors
 from datetime import datetime, timedelta
 import logging
 import pytz
@@ -10,47 +11,67 @@ import pytz
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_stock_data(ticker, start_date, end_date):
-    """DB 또는 yfinance에서 주식 데이터 조회"""
+def get_stock_data(ticker, start_date, end_date, panel=None):
+    """DB(또는 미리 읽어 둔 panel) 또는 yfinance에서 주식 데이터 조회"""
     start_date = pd.to_datetime(start_date).strftime('%Y-%m-%d')
     end_date = pd.to_datetime(end_date).strftime('%Y-%m-%d')
     
-    data = fetch_stock_data_from_db(ticker, start_date, end_date)
+    if panel is not None:
+        data = slice_stock_panel(panel, ticker).copy()
+    else:
+        data = fetch_stock_data_from_db(ticker, start_date, end_date)
     if data.empty:
         logger.warning(f"No DB data for {ticker}, fetching from yfinance")
         data = fetch_stock_data_from_yfinance(ticker, start_date, end_date)
-        if not data:
+        if data.empty:
             return pd.DataFrame()
     
     data['Daily Return'] = data['Close'].pct_change()
     data = data.loc[data.index >= pd.to_datetime(start_date)].dropna()
     return data
 
+RANK_FACTORS = ['Average Volume', 'Last Close', 'Min Close', 'Max Close', 'Sortino Ratio', 'Price Increase Ratio']
+
 def filter_and_rank_stocks(tickers, start_date, end_date, min_volume, min_price, max_price, min_sortino, min_diff_ratio, top_n):
-    """종목 필터링 및 Sortino Ratio, Price Increase Ratio로 랭킹"""
+    """
+    종목 필터링 및 Sortino Ratio, Price Increase Ratio로 랭킹
+
+    필터와 점수에 쓰는 팩터는 panel 전체에 대해 utils.factors로 한 번에 계산하며,
+    정의는 fetch_stock_analysis와 같습니다 (구간 첫 거래일부터의 평균 거래량과 상승률).
+    """
     filtered_stocks = []
 
+    # 전체 종목을 한 번의 쿼리로 읽어 두고 팩터도 한 번에 계산
+    panel = fetch_stock_panel_from_db(tickers, pd.to_datetime(start_date), pd.to_datetime(end_date))
+    arrays = panel_to_arrays(panel, tickers, fields=['Close', 'Volume'])
+    factor_table = FactorGraph.from_arrays(arrays).table(RANK_FACTORS)
+
     for ticker in tickers:
         try:
-            data = get_stock_data(ticker, start_date, end_date)
-            if data.empty:
-                logger.warning(f"No data for {ticker}")
-                continue
+            row = factor_row(factor_table, ticker)
+            if not row:
+                logger.warning(f"No DB data for {ticker}, fetching from yfinance")
+                data = fetch_stock_data_from_yfinance(ticker, pd.to_datetime(start_date).strftime('%Y-%m-%d'),
+                                                      pd.to_datetime(end_date).strftime('%Y-%m-%d'))
+                if data.empty:
+                    logger.warning(f"No data for {ticker}")
+                    continue
+                row = frame_factors(data, RANK_FACTORS)
             
             # 필터 조건
-            if (data['Volume'].mean() < min_volume or
-                data['Close'].iloc[-1] < min_price or
-                data['Close'].iloc[-1] > max_price):
+            if (row['Average Volume'] < min_volume or
+                row['Last Close'] < min_price or
+                row['Last Close'] > max_price):
                 continue
 
-            # Sortino Ratio 계산
-            sortino_ratio = calculate_sortino_ratio(data['Daily Return'])
-            if sortino_ratio < min_sortino:
+            # Sortino Ratio
+            sortino_ratio = row['Sortino Ratio']
+            if sortino_ratio is None or sortino_ratio < min_sortino:
                 continue
 
-            # Price Increase Ratio 계산
-            price_increase_ratio = (data['Close'].iloc[-1] - data['Close'].iloc[0]) / data['Close'].iloc[0]
-            if price_increase_ratio < min_diff_ratio:
+            # Price Increase Ratio
+            price_increase_ratio = row['Price Increase Ratio']
+            if price_increase_ratio is None or price_increase_ratio < min_diff_ratio:
                 continue
 
             filtered_stocks.append({
@@ -58,13 +79,13 @@ def filter_and_rank_stocks(tickers, start_date, end_date, min_volume, min_price,
                 "Sortino Ratio": sortino_ratio,
                 "Price Increase Ratio": price_increase_ratio,
                 "Combined Score": sortino_ratio + price_increase_ratio,
-                "Price Range": f"{data['Close'].min():.2f} - {data['Close'].max():.2f}",
-                "Last Close": data['Close'].iloc[-1],
-                "Average Volume": data['Volume'].mean()
+                "Price Range": f"{row['Min Close']:.2f} - {row['Max Close']:.2f}",
+                "Last Close": row['Last Close'],
+                "Average Volume": row['Average Volume']
             })
 
         except Exception as e:
             logger.error(f"Error processing {ticker}: {e}")
 
     filtered_stocks.sort(key=lambda x: x['Combined Score'], reverse=True)
-    return pd.DataFrame(filtered_stocks[:top_n])
\ No newline at end of file
+    return pd.DataFrame(filtered_stocks[:top_n])
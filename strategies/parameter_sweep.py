@@ -0,0 +1,338 @@
+# strategies/parameter_sweep.py
+#
+# main.py 스크리닝 파라미터와 calculate_weighted_score 가중치 조합을 한꺼번에 백테스트
+#
+# 가격/거래량 panel과 리밸런싱 날짜별 지표(Sortino, 상승률, 평균 거래량, RSI, 6M Change,
+# as-of 재무 지표)를 한 번만 읽어 계산한 뒤 shared memory에 올리고, 각 조합은
+# 프로세스 풀에서 그 배열을 읽기 전용으로 참조해 평가합니다.
+#
+# 리밸런싱 날짜마다 전일 종가까지의 데이터로 main.py와 같은 순서로 종목을 고르고 그날 종가에 체결합니다.
+#   1. 필터(min_volume, min_price, max_price, min_sortino, min_diff_ratio) 통과 종목 중
+#      평균 거래량 상위 top_n (SQL screener와 같은 기준)
+#   2. 그 종목들로 calculate_weighted_score를 계산해 상위 hold_n 종목을 동일 비중으로 보유
+#
+#   python -m strategies.parameter_sweep --start_date 2022-01-01 --end_date 2024-12-31 \
+#       --grid min_sortino=-0.5,0,0.5 --grid top_n=20,50 --grid w_rsi=0.1,0.2,0.3
+#   python -m strategies.parameter_sweep --start_date 2022-01-01 --end_date 2024-12-31 --samples 200
+
+import argparse
+import itertools
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from data.data_fetcher import fetch_symbols_from_db, fetch_stock_panel_from_db, fetch_fundamentals_asof_from_db
+from data.trading_calendar import get_trading_calendar
+from analysis.momentum_indicators import compute_momentum_matrix
+from analysis.financial_momentum import calculate_weighted_score, DEFAULT_WEIGHTS, WEIGHT_KEYS, weights_from_params
+from strategies.vector_backtest import momentum_scores, simulate, performance_stats
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+FILTER_KEYS = ('min_volume', 'min_price', 'max_price', 'min_sortino', 'min_diff_ratio', 'top_n')
+PARAMETER_KEYS = FILTER_KEYS + tuple(WEIGHT_KEYS)
+
+# main.py 기본값
+DEFAULT_PARAMS = {
+    'min_volume': 10000000,
+    'min_price': 50,
+    'max_price': 1000,
+    'min_sortino': -0.5,
+    'min_diff_ratio': 0.2,
+    'top_n': 20,
+    **{key: DEFAULT_WEIGHTS[column] for key, column in WEIGHT_KEYS.items()},
+}
+
+# --grid를 주지 않았을 때 탐색할 범위. 기본 lookback(126)에서는 6M Change가 항상 NaN(정규화 후 0)이라
+# w_6m_change는 점수를 바꾸지 못하므로 넣지 않음 (--lookback 132 이상일 때 --grid로 지정)
+DEFAULT_GRID = {
+    'min_volume': [1000000, 5000000, 10000000],
+    'min_sortino': [-0.5, 0.0, 0.5],
+    'min_diff_ratio': [0.0, 0.1, 0.2],
+    'top_n': [20, 50],
+    'w_rsi': [0.1, 0.2, 0.3],
+    'w_sortino': [0.05, 0.2],
+}
+
+# 리밸런싱 날짜 x 종목 배열 (shared memory에 올리는 항목)
+FACTOR_FIELDS = ('covered', 'avg_volume', 'last_close', 'sortino', 'price_ratio', 'rsi', 'six_month',
+                 'has_fundamentals', 'revenue_growth', 'debt_to_equity', 'pbr')
+
+def parse_grid(items):
+    """['min_sortino=-0.5,0', 'top_n=20,50', ...] -> {이름: [값, ...]}"""
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition('=')
+        name = name.strip()
+        if name not in PARAMETER_KEYS:
+            raise ValueError(f"Unknown sweep parameter {name!r} (choose from {', '.join(PARAMETER_KEYS)})")
+        cast = int if name in ('min_volume', 'top_n') else float
+        grid[name] = [cast(value) for value in values.split(',') if value.strip()]
+        if not grid[name]:
+            raise ValueError(f"No values given for {name}")
+    return grid
+
+def expand_grid(grid, samples=None, seed=None, base=None):
+    """
+    grid의 전체 조합(또는 그중 중복 없는 무작위 samples개)을 파라미터 dict 목록으로 반환
+
+    grid에 없는 파라미터는 base(기본값: main.py 기본값)를 사용합니다. 조합 수가 많아도
+    무작위 추출은 전체 목록을 만들지 않고 인덱스만 뽑습니다.
+    """
+    base = dict(DEFAULT_PARAMS if base is None else base)
+    names = list(grid)
+    sizes = [len(grid[name]) for name in names]
+    total = int(np.prod(sizes)) if names else 1
+
+    if samples is None or samples >= total:
+        indexes = range(total)
+    else:
+        indexes = np.sort(np.random.default_rng(seed).choice(total, size=samples, replace=False))
+
+    combos = []
+    for index in indexes:
+        params = dict(base)
+        # index를 각 파라미터 값 위치로 분해 (마지막 이름이 가장 빨리 변함)
+        for name, size in zip(reversed(names), reversed(sizes)):
+            index, position = divmod(int(index), size)
+            params[name] = grid[name][position]
+        combos.append(params)
+    return combos
+
+def load_sweep_data(start_date, end_date, tickers=None, lookback=126, rebalance_every=21, min_coverage=0.9):
+    """
+    백테스트 구간의 가격 panel과 리밸런싱 날짜별 지표를 한 번에 계산
+
+    지표는 main.py와 같은 기준으로 리밸런싱 날짜까지 lookback 거래일(기본값 126 ≈ 183일)
+    구간에서 계산합니다. 6M Change는 132거래일이 필요하므로 lookback이 그보다 짧으면
+    main.py처럼 항상 NaN(정규화 후 0)입니다. 재무 지표는 as-of 값입니다.
+    simulate가 전일 점수로 체결하므로 지표와 재무 지표는 리밸런싱 전일(row - 1) 기준입니다.
+
+    Returns:
+        dict: 'close'(날짜 x 종목), 'rebalance_rows', FACTOR_FIELDS(리밸런싱 날짜 x 종목) 배열과
+              'dates', 'tickers', 'start'.
+    """
+    if tickers is None:
+        tickers = tuple(fetch_symbols_from_db()['symbol'])
+    start_ts, end_ts = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    load_start = pd.Timestamp(get_trading_calendar().offset(start_ts, -lookback))
+    arrays = fetch_stock_panel_from_db(tickers, load_start, end_ts, as_arrays=True)
+    dates, names = arrays['dates'], arrays['tickers']
+    close = np.asarray(arrays['Close'], dtype='float64')
+    if len(dates) == 0:
+        raise ValueError(f"No price data between {load_start.date()} and {end_ts.date()}")
+
+    start = max(1, int(np.searchsorted(dates.values, start_ts.to_datetime64())))
+    rows = np.arange(start, len(dates), max(1, rebalance_every))
+    signals = rows - 1  # 리밸런싱 전일 (simulate가 이 행의 점수로 고름)
+    stats = momentum_scores(close, arrays['Volume'], lookback=lookback, min_coverage=min_coverage)
+
+    data = {
+        'close': close,
+        'rebalance_rows': rows,
+        'covered': np.isfinite(stats['score'][signals]),
+        'avg_volume': stats['avg_volume'][signals],
+        'last_close': close[signals],
+        'sortino': stats['sortino'][signals],
+        'price_ratio': stats['price_ratio'][signals],
+    }
+    data['rsi'] = np.empty((len(rows), len(names)))
+    data['six_month'] = np.empty((len(rows), len(names)))
+    for i, row in enumerate(signals):
+        momentum = compute_momentum_matrix(close[max(0, row - lookback + 1):row + 1])
+        data['rsi'][i] = momentum['RSI']
+        data['six_month'][i] = momentum['6M Change']
+
+    for field in ('has_fundamentals', 'revenue_growth', 'debt_to_equity', 'pbr'):
+        data[field] = np.full((len(rows), len(names)), np.nan)
+    for i, row in enumerate(signals):
+        fundamentals = fetch_fundamentals_asof_from_db(names, dates[row]).reindex(names)
+        data['has_fundamentals'][i] = fundamentals['Recorded At'].notna().to_numpy(dtype='float64')
+        data['revenue_growth'][i] = pd.to_numeric(fundamentals['Revenue Growth'], errors='coerce').to_numpy()
+        data['debt_to_equity'][i] = pd.to_numeric(fundamentals['Debt to Equity'], errors='coerce').to_numpy()
+        data['pbr'][i] = pd.to_numeric(fundamentals['PBR'], errors='coerce').to_numpy()
+
+    data['covered'] = data['covered'].astype('float64')
+    data.update({'dates': dates, 'tickers': names, 'start': start})
+    logger.info(f"Loaded {len(dates)} days x {len(names)} tickers, {len(rows)} rebalance dates")
+    return data
+
+def evaluate(data, params, hold_n=10, rebalance_every=21, initial_cash=100000.0, commission=0.001, slippage=0.0005):
+    """
+    파라미터 조합 하나를 백테스트
+
+    Returns:
+        dict: performance_stats 결과와 리밸런싱당 평균 후보/보유 종목 수.
+    """
+    close = data['close']
+    scores = np.full(close.shape, np.nan)
+    weights = weights_from_params(params)
+    candidates = 0
+
+    for i, row in enumerate(data['rebalance_rows']):
+        avg_volume, last_close = data['avg_volume'][i], data['last_close'][i]
+        with np.errstate(invalid='ignore'):
+            eligible = ((data['covered'][i] > 0) & (data['has_fundamentals'][i] > 0) &
+                        (avg_volume >= params['min_volume']) &
+                        (last_close >= params['min_price']) & (last_close <= params['max_price']) &
+                        (data['sortino'][i] >= params['min_sortino']) &
+                        (data['price_ratio'][i] >= params['min_diff_ratio']))
+        picked = np.flatnonzero(eligible)
+        picked = picked[np.argsort(-avg_volume[picked], kind='stable')[:int(params['top_n'])]]
+        if not picked.size:
+            continue
+        candidates += picked.size
+        frame = pd.DataFrame({
+            '6M Change': data['six_month'][i, picked],
+            'RSI': data['rsi'][i, picked],
+            'Revenue Growth': data['revenue_growth'][i, picked],
+            'Debt to Equity': data['debt_to_equity'][i, picked],
+            'PBR': data['pbr'][i, picked],
+            'Sortino Ratio': data['sortino'][i, picked],
+            'Average Volume': avg_volume[picked],
+        })
+        scores[row - 1, picked] = calculate_weighted_score(frame, weights).to_numpy(dtype='float64')
+
+    result = simulate(close, scores, start=data['start'], top_n=hold_n, rebalance_every=rebalance_every,
+                      initial_cash=initial_cash, commission=commission, slippage=slippage)
+    stats = performance_stats(result['equity'][data['start']:], result['turnover'], result['costs'])
+    rebalances = max(1, len(data['rebalance_rows']))
+    stats['avg_candidates'] = candidates / rebalances
+    stats['avg_holdings'] = float((result['weights'] > 0).sum() / rebalances)
+    return stats
+
+class SharedArrays:
+    """
+    numpy 배열을 shared memory 블록에 복사해 두고 작업 프로세스가 이름으로 붙게 함
+
+    close()는 이 프로세스의 매핑만 닫고, unlink()까지 해야 블록이 해제됩니다.
+    """
+
+    def __init__(self, arrays):
+        self._blocks = []
+        self.specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+_worker_blocks = []  # 작업 프로세스가 붙은 shared memory (참조를 유지해야 매핑이 살아 있음)
+_worker_data = {}
+
+def _attach(specs, extra):
+    """ProcessPoolExecutor initializer: shared memory 배열을 읽기 전용 view로 연결"""
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        view.flags.writeable = False
+        _worker_data[name] = view
+    _worker_data.update(extra)
+
+def _evaluate_shared(params, options):
+    try:
+        return {**params, **evaluate(_worker_data, params, **options)}
+    except Exception as e:
+        logger.error(f"Sweep combination {params} failed: {e}")
+        return {**params, 'error': str(e)}
+
+def run_sweep(data, combos, workers=None, rank_by='sharpe', hold_n=10, rebalance_every=21,
+              initial_cash=100000.0, commission=0.001, slippage=0.0005):
+    """
+    조합 목록을 프로세스 풀에서 평가해 rank_by 내림차순으로 정렬한 결과 표를 반환
+
+    Args:
+        data (dict): load_sweep_data 결과.
+        combos (list): expand_grid 결과.
+        workers (int): 작업 프로세스 수 (기본값: CPU 수, 1이면 현재 프로세스에서 실행).
+        rank_by (str): 정렬 기준 지표 (performance_stats 키).
+    """
+    options = {'hold_n': hold_n, 'rebalance_every': rebalance_every, 'initial_cash': initial_cash,
+               'commission': commission, 'slippage': slippage}
+    workers = workers or os.cpu_count() or 1
+    started = time.time()
+
+    if workers == 1:
+        rows = []
+        for params in combos:
+            try:
+                rows.append({**params, **evaluate(data, params, **options)})
+            except Exception as e:
+                logger.error(f"Sweep combination {params} failed: {e}")
+                rows.append({**params, 'error': str(e)})
+    else:
+        arrays = {name: data[name] for name in ('close', 'rebalance_rows') + FACTOR_FIELDS}
+        shared = SharedArrays(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(shared.specs, {'start': data['start']})) as executor:
+                chunksize = max(1, len(combos) // (workers * 4))
+                rows = list(executor.map(_evaluate_shared, combos, itertools.repeat(options),
+                                         chunksize=chunksize))
+        finally:
+            shared.close()
+
+    logger.info(f"Evaluated {len(combos)} combinations with {workers} workers in {time.time() - started:.1f}s")
+    # 실패한 조합은 통계 없이 error만 가지므로 컬럼은 모든 행의 키를 합쳐서 만듦
+    stats = dict.fromkeys(key for row in rows for key in row if key not in PARAMETER_KEYS + ('error',))
+    errors = ['error'] if any('error' in row for row in rows) else []
+    result = pd.DataFrame(rows, columns=list(PARAMETER_KEYS) + list(stats) + errors)
+    if rank_by in result:
+        result = result.sort_values(rank_by, ascending=False, na_position='last', kind='stable')
+    result.insert(0, 'rank', range(1, len(result) + 1))
+    return result.reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest a grid or random sample of main.py screening parameters and score weights."
+    )
+    parser.add_argument("--start_date", type=str, required=True, help="Backtest start date (YYYY-MM-DD)")
+    parser.add_argument("--end_date", type=str, required=True, help="Backtest end date (YYYY-MM-DD)")
+    parser.add_argument("--grid", action="append", metavar="NAME=V1,V2,...",
+                        help=f"Values to sweep, repeatable. Names: {', '.join(PARAMETER_KEYS)}")
+    parser.add_argument("--samples", type=int, default=None, help="Evaluate this many random combinations")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for --samples")
+    parser.add_argument("--tickers", nargs="+", default=None, help="Universe (default: every symbol)")
+    parser.add_argument("--lookback", type=int, default=126, help="Screening window in trading days")
+    parser.add_argument("--rebalance_every", type=int, default=21, help="Trading days between rebalances")
+    parser.add_argument("--hold_n", type=int, default=10, help="Stocks held, by Weighted Score")
+    parser.add_argument("--commission", type=float, default=0.001, help="Commission rate per trade")
+    parser.add_argument("--slippage", type=float, default=0.0005, help="Slippage rate per trade")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--rank_by", type=str, default="sharpe",
+                        help="Metric to rank by (sharpe, cagr, total_return, max_drawdown, ...)")
+    parser.add_argument("--output", type=str, default=None, help="CSV path for the ranked results")
+    args = parser.parse_args()
+
+    try:
+        grid = parse_grid(args.grid) if args.grid else DEFAULT_GRID
+    except ValueError as e:
+        parser.error(str(e))
+    combos = expand_grid(grid, samples=args.samples, seed=args.seed)
+    logger.info(f"Sweeping {len(combos)} combinations over {', '.join(grid)}")
+
+    data = load_sweep_data(args.start_date, args.end_date, tickers=args.tickers, lookback=args.lookback,
+                           rebalance_every=args.rebalance_every)
+    result = run_sweep(data, combos, workers=args.workers, rank_by=args.rank_by, hold_n=args.hold_n,
+                       rebalance_every=args.rebalance_every, commission=args.commission,
+                       slippage=args.slippage)
+
+    output = args.output or f"parameter_sweep_{args.start_date}_{args.end_date}.csv"
+    result.to_csv(output, index=False)
+    logger.info(f"Saved {len(result)} results to {output}")
+    print(result.head(20).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
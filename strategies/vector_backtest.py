@@ -0,0 +1,168 @@
+# strategies/vector_backtest.py
+
+import numpy as np
+import pandas as pd
+import logging
+from data.data_fetcher import fetch_stock_panel_from_db
+from data.trading_calendar import get_trading_calendar
+from utils.factors import rolling_factors
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+def momentum_scores(close, volume, lookback=63, min_volume=0, min_price=0, max_price=np.inf,
+                    min_sortino=-np.inf, min_diff_ratio=-np.inf, min_coverage=0.9, risk_free_rate=0.01/252):
+    """
+    filter_and_rank_stocks의 Combined Score(Sortino Ratio + Price Increase Ratio)를 모든 날짜에 대해 계산
+
+    날짜 t의 팩터는 utils.factors.rolling_factors로 t까지 lookback 거래일 구간에서 계산하므로
+    그 구간 panel에 filter_and_rank_stocks를 돌린 값과 같은 정의입니다. 필터(평균 거래량,
+    t 종가 범위, Sortino, 상승률)를 통과하지 못했거나 구간 거래일이 min_coverage 비율보다
+    적으면 NaN입니다.
+
+    Args:
+        close, volume (np.ndarray): (날짜 x 종목) 배열. 거래가 없는 칸은 NaN.
+
+    Returns:
+        dict: 'score', 'sortino', 'price_ratio', 'avg_volume' (날짜 x 종목) 배열.
+    """
+    close = np.asarray(close, dtype='float64')
+    factors = rolling_factors(close, volume, window=lookback, risk_free_rate=risk_free_rate)
+    sortino, price_ratio = factors['Sortino Ratio'], factors['Price Increase Ratio']
+    avg_volume = factors['Average Volume']
+    with np.errstate(invalid='ignore'):
+        eligible = ((factors['counts'] >= max(2, np.ceil(lookback * min_coverage))) & np.isfinite(close) &
+                    np.isfinite(price_ratio) & (avg_volume >= min_volume) & (close >= min_price) &
+                    (close <= max_price) & (sortino >= min_sortino) & (price_ratio >= min_diff_ratio))
+    return {
+        'score': np.where(eligible, sortino + price_ratio, np.nan),
+        'sortino': sortino,
+        'price_ratio': price_ratio,
+        'avg_volume': avg_volume,
+    }
+
+def top_n_weights(scores, top_n):
+    """점수 상위 top_n 종목에 동일 비중 (점수가 NaN인 종목 제외)"""
+    weights = np.zeros_like(scores)
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if candidates.size:
+        picked = candidates[np.argsort(-scores[candidates], kind='stable')[:top_n]]
+        weights[picked] = 1.0 / picked.size
+    return weights
+
+def simulate(close, scores, start=0, top_n=20, rebalance_every=21, initial_cash=100000.0,
+             commission=0.001, slippage=0.0005):
+    """
+    주기적 리밸런싱 포트폴리오 시뮬레이션
+
+    start행부터 rebalance_every행마다 전일(row - 1) 종가까지의 점수 상위 top_n 종목을
+    그날 종가에 동일 비중으로 다시 맞춥니다 (신호 다음 bar에 체결하는 backtrader 경로와
+    같이 같은 bar의 종가로 고르고 체결하지 않음). 거래 금액에 commission + slippage 비율만큼
+    비용을 차감하고, 리밸런싱 사이에는 보유 수량을 유지한 채 평가합니다 (행렬 곱 한 번으로
+    구간 전체 평가).
+
+    Returns:
+        dict: 'equity'(날짜별 평가액), 'rebalance_rows', 'turnover'(거래 금액 / 평가액),
+              'costs', 'weights'(리밸런싱 시점 목표 비중) 배열.
+    """
+    close = np.asarray(close, dtype='float64')
+    rows, tickers = close.shape
+    prices = pd.DataFrame(close).ffill().to_numpy()  # 거래 없는 날은 직전 종가로 평가
+    valued = np.nan_to_num(prices)
+
+    rebalance_rows = np.arange(max(1, start), rows, max(1, rebalance_every))
+    equity = np.full(rows, float(initial_cash))
+    turnover = np.zeros(len(rebalance_rows))
+    costs = np.zeros(len(rebalance_rows))
+    weights = np.zeros((len(rebalance_rows), tickers))
+    shares = np.zeros(tickers)
+    cash = float(initial_cash)
+    cost_rate = commission + slippage
+
+    for i, row in enumerate(rebalance_rows):
+        value = cash + valued[row] @ shares
+        tradable = np.where(np.isfinite(close[row]) & (close[row] > 0), scores[row - 1], np.nan)
+        target = top_n_weights(tradable, top_n)
+        current = valued[row] * shares
+        traded = np.abs(target * value - current).sum()
+        cost = traded * cost_rate
+        invested = target * (value - cost)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shares = np.where(invested > 0, invested / close[row], 0.0)
+        cash = value - cost - invested.sum()
+
+        end = rebalance_rows[i + 1] if i + 1 < len(rebalance_rows) else rows
+        equity[row:end] = cash + valued[row:end] @ shares
+        turnover[i] = traded / value if value else 0.0
+        costs[i] = cost
+        weights[i] = target
+
+    return {'equity': equity, 'rebalance_rows': rebalance_rows, 'turnover': turnover, 'costs': costs,
+            'weights': weights}
+
+def performance_stats(equity, turnover=None, costs=None):
+    """평가액 곡선 요약 통계"""
+    equity = pd.Series(equity).dropna()
+    returns = equity.pct_change().dropna()
+    years = len(returns) / TRADING_DAYS
+    drawdown = equity / equity.cummax() - 1
+    stats = {
+        'total_return': equity.iloc[-1] / equity.iloc[0] - 1 if len(equity) else np.nan,
+        'cagr': (equity.iloc[-1] / equity.iloc[0]) ** (1 / years) - 1 if years > 0 else np.nan,
+        'volatility': returns.std() * np.sqrt(TRADING_DAYS) if len(returns) > 1 else np.nan,
+        'sharpe': returns.mean() / returns.std() * np.sqrt(TRADING_DAYS) if len(returns) > 1 and returns.std() else np.nan,
+        'max_drawdown': drawdown.min() if len(drawdown) else np.nan,
+    }
+    stats = {key: float(value) for key, value in stats.items()}
+    if turnover is not None:
+        stats['avg_turnover'] = float(np.mean(turnover)) if len(turnover) else 0.0
+    if costs is not None:
+        stats['total_costs'] = float(np.sum(costs))
+    return stats
+
+def run_vector_backtest(tickers, start_date, end_date, top_n=20, rebalance_every=21, lookback=63,
+                        min_volume=0, min_price=0, max_price=np.inf, min_sortino=-np.inf, min_diff_ratio=-np.inf,
+                        initial_cash=100000.0, commission=0.001, slippage=0.0005, arrays=None):
+    """
+    (날짜 x 종목) panel 위에서 모멘텀 top-N 리밸런싱 전략을 백테스트
+
+    backtrader 경로(run_backtest)와 달리 종목별 feed나 bar 단위 Python 콜백이 없어서
+    수천 종목, 수년 구간도 몇 초 안에 끝납니다.
+
+    Args:
+        tickers (iterable): 유니버스.
+        start_date, end_date: 백테스트 구간. 점수 계산용으로 start_date 이전 lookback 거래일을 함께 읽습니다.
+        arrays (dict): 이미 읽어 둔 panel_to_arrays 결과 (없으면 DB에서 조회).
+
+    Returns:
+        dict: 'equity'(pd.Series), 'turnover'/'costs'(리밸런싱 날짜 인덱스 pd.Series),
+              'holdings'({날짜: [티커, ...]}), 'stats'(performance_stats).
+    """
+    start_ts = pd.Timestamp(start_date)
+    if arrays is None:
+        load_start = pd.Timestamp(get_trading_calendar().offset(start_ts, -lookback))
+        arrays = fetch_stock_panel_from_db(tickers, load_start, pd.Timestamp(end_date), as_arrays=True)
+    dates, names = arrays['dates'], arrays['tickers']
+    if len(dates) == 0:
+        logger.warning("No price data for vector backtest")
+        return {'equity': pd.Series(dtype='float64'), 'turnover': pd.Series(dtype='float64'),
+                'costs': pd.Series(dtype='float64'), 'holdings': {}, 'stats': {}}
+
+    scores = momentum_scores(arrays['Close'], arrays['Volume'], lookback=lookback, min_volume=min_volume,
+                             min_price=min_price, max_price=max_price, min_sortino=min_sortino,
+                             min_diff_ratio=min_diff_ratio)['score']
+    start = int(np.searchsorted(dates.values, start_ts.to_datetime64()))
+    result = simulate(arrays['Close'], scores, start=start, top_n=top_n, rebalance_every=rebalance_every,
+                      initial_cash=initial_cash, commission=commission, slippage=slippage)
+
+    rebalance_dates = dates[result['rebalance_rows']]
+    equity = pd.Series(result['equity'][start:], index=dates[start:], name='Equity')
+    return {
+        'equity': equity,
+        'turnover': pd.Series(result['turnover'], index=rebalance_dates, name='Turnover'),
+        'costs': pd.Series(result['costs'], index=rebalance_dates, name='Costs'),
+        'holdings': {day: list(names[weights > 0]) for day, weights in zip(rebalance_dates, result['weights'])},
+        'stats': performance_stats(equity, result['turnover'], result['costs']),
+    }
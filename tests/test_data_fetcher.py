@@ -0,0 +1,121 @@
+# tests/test_data_fetcher.py
+#
+# 가격 provider와 batch 조회 테스트 (네트워크/DB 불필요, yf.download는 가짜 함수로 대체)
+
+import logging
+import pandas as pd
+import pytest
+from tenacity import wait_none
+import data.data_fetcher as fetch
+from data.rate_limiter import AdaptiveRateLimiter
+
+def download_frame(tickers, dates):
+    """yf.download(group_by='ticker')와 같은 (티커, 필드) MultiIndex 컬럼의 DataFrame"""
+    columns = pd.MultiIndex.from_product([tickers, ['Open', 'High', 'Low', 'Close', 'Volume']])
+    index = pd.DatetimeIndex(pd.to_datetime(dates), name='Date')
+    return pd.DataFrame(1.0, index=index, columns=columns)
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = AdaptiveRateLimiter(rate=100.0, min_rate=1.0, max_rate=100.0)
+    monkeypatch.setattr(fetch, 'yfinance_limiter', limiter)
+    # 재시도 사이의 대기 없이 같은 재시도 정책을 사용
+    monkeypatch.setattr(fetch, '_fetch_price_chunk', fetch._fetch_price_chunk.retry_with(wait=wait_none()))
+    return limiter
+
+def test_yfinance_provider_backs_off_on_logged_throttle(monkeypatch, limiter):
+    calls = []
+
+    def fake_download(tickers, **kwargs):
+        # yfinance 1.x처럼 종목별 오류는 예외 대신 'yfinance' logger로만 알림
+        calls.append(list(tickers))
+        if len(calls) == 1:
+            logging.getLogger('yfinance').error(
+                "['BBB']: YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')")
+            return download_frame(['AAA'], ['2024-01-02'])
+        return download_frame(tickers, ['2024-01-02'])
+
+    monkeypatch.setattr(fetch.yf, 'download', fake_download)
+    data = fetch.fetch_stock_data_batch(['AAA', 'BBB'], '2024-01-02', '2024-01-03')
+
+    assert len(calls) == 2
+    assert sorted(data['ticker']) == ['AAA', 'BBB']
+    stats = limiter.stats()
+    assert stats['throttled'] == 1
+    assert stats['rate'] == pytest.approx(50.0)
+
+def test_yfinance_provider_ignores_other_errors(monkeypatch, limiter):
+    def fake_download(tickers, **kwargs):
+        logging.getLogger('yfinance').error("['BBB']: YFTzMissingError('possibly delisted; no timezone found')")
+        logging.getLogger('yfinance').error("['ZZZ']: YFRateLimitError('Too Many Requests')")  # 다른 요청의 로그
+        return download_frame(['AAA'], ['2024-01-02'])
+
+    monkeypatch.setattr(fetch.yf, 'download', fake_download)
+    data = fetch.fetch_stock_data_batch(['AAA', 'BBB'], '2024-01-02', '2024-01-03')
+
+    assert list(data['ticker']) == ['AAA']
+    assert limiter.stats()['throttled'] == 0
+    assert limiter.stats()['rate'] == pytest.approx(100.0)
+
+def price_frame(tickers, dates):
+    """DataFrameProvider에 넣을 PRICE_COLUMNS 형태의 가격"""
+    rows = [{'ticker': ticker, 'trade_date': day, 'open': 10.0, 'high': 11.0, 'low': 9.0, 'close': 10.5,
+             'volume': 1000} for ticker in tickers for day in pd.to_datetime(dates)]
+    return pd.DataFrame(rows, columns=fetch.PRICE_COLUMNS)
+
+def test_missing_ranges_merges_close_gaps():
+    from data.save_custom_range_data import missing_ranges
+    days = list(pd.bdate_range('2024-01-01', periods=20).date)
+    missing = [days[1], days[2], days[5], days[15]]
+    assert missing_ranges(missing, days, merge_gap=3) == [(days[1], days[5]), (days[15], days[15])]
+    assert missing_ranges(missing, days, merge_gap=1) == [(days[1], days[2]), (days[5], days[5]),
+                                                          (days[15], days[15])]
+
+def test_backfill_keeps_failed_tickers_pending(monkeypatch, limiter, tmp_path):
+    import data.save_custom_range_data as backfill_job
+    days = list(pd.bdate_range('2024-01-01', periods=10).date)
+    plan = {(days[0], days[1]): ['AAA', 'BBB', 'CCC'], (days[5], days[6]): ['AAA', 'BBB']}
+    prices = fetch.DataFrameProvider(price_frame(['AAA', 'BBB', 'CCC'], days))
+
+    def failing_provider(tickers, start_date, end_date):
+        if 'CCC' in tickers:
+            raise RuntimeError("Too Many Requests")  # 재시도 후에도 실패하는 chunk
+        data = prices(tickers, start_date, end_date)
+        if pd.Timestamp(start_date) >= pd.Timestamp(days[5]):
+            data = data[data['ticker'] != 'BBB']  # yf.download처럼 실패한 종목을 조용히 뺌
+        return data
+
+    saved = []
+    monkeypatch.setattr(backfill_job.save, 'save_stock_data_in_db',
+                        lambda data: saved.append(data) or {'inserted': len(data), 'updated': 0})
+    checkpoint = tmp_path / 'backfill.json'
+
+    done = set()
+    rows = backfill_job.backfill(plan, done, checkpoint, chunk_size=1, provider=failing_provider)
+    assert rows == 2 * 2 + 2
+    assert backfill_job.load_checkpoint(checkpoint) == {'AAA'}
+
+    # 재실행하면 checkpoint에 없는 종목만 다시 받음
+    done = backfill_job.load_checkpoint(checkpoint)
+    retry_plan = {gap: [ticker for ticker in group if ticker not in done] for gap, group in plan.items()}
+    backfill_job.backfill(retry_plan, done, checkpoint, chunk_size=1, provider=prices)
+    assert backfill_job.load_checkpoint(checkpoint) == {'AAA', 'BBB', 'CCC'}
+
+def test_fetch_stock_data_batch_chunks_provider_requests():
+    days = pd.bdate_range('2024-01-01', periods=6)
+    frame = price_frame(['AAA', 'BBB', 'CCC'], days)
+    frame.loc[(frame['ticker'] == 'BBB') & (frame['trade_date'] == days[1]), 'close'] = float('nan')
+    provider = fetch.DataFrameProvider(frame)
+    requests = []
+
+    def recording_provider(tickers, start_date, end_date):
+        requests.append(list(tickers))
+        return provider(tickers, start_date, end_date)
+
+    data = fetch.fetch_stock_data_batch(['AAA', 'BBB', 'AAA', 'CCC'], days[0].date(), days[3].date(),
+                                        chunk_size=2, provider=recording_provider)
+
+    assert requests == [['AAA', 'BBB'], ['CCC']]  # 중복 티커 제거 후 chunk 단위 요청
+    assert list(data.columns) == fetch.PRICE_COLUMNS
+    assert data.groupby('ticker').size().to_dict() == {'AAA': 3, 'BBB': 2, 'CCC': 3}  # 종료일 미포함, NaN 행 제외
+    assert data['volume'].dtype == 'int64'
@@ -0,0 +1,60 @@
+# tests/test_database.py
+#
+# bulk_upsert의 inserted/updated/unchanged 집계 확인 (DB 필요, 연결할 수 없으면 skip)
+# 모든 쓰기는 하나의 트랜잭션 안에서 하고 마지막에 rollback하므로 테이블에 남는 행은 없음
+
+import pandas as pd
+import pytest
+from data.data_saver import bulk_upsert
+
+TICKER = 'ZZUPSERT'
+
+@pytest.fixture
+def conn():
+    try:
+        from data.database import get_connection
+        conn = get_connection()
+    except Exception as e:
+        pytest.skip(f"database not available: {e}")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+def price_rows(days=5):
+    dates = pd.bdate_range('2024-01-02', periods=days).date
+    return pd.DataFrame({
+        'ticker': TICKER,
+        'trade_date': dates,
+        'open': [10.0 + i for i in range(days)],
+        'high': [11.0 + i for i in range(days)],
+        'low': [9.0 + i for i in range(days)],
+        'close': [10.5 + i for i in range(days)],
+        'volume': [1000 * (i + 1) for i in range(days)],
+    })
+
+def test_bulk_upsert_counts(conn):
+    rows = price_rows()
+    assert bulk_upsert('stock_data', rows, conn=conn) == {'inserted': 5, 'updated': 0, 'unchanged': 0}
+    # 같은 데이터를 다시 저장하면 아무 행도 바뀌지 않음
+    assert bulk_upsert('stock_data', rows, conn=conn) == {'inserted': 0, 'updated': 0, 'unchanged': 5}
+
+    changed = rows.copy()
+    changed.loc[[1, 3], 'close'] += 0.25
+    extra = price_rows(7).iloc[5:]
+    result = bulk_upsert('stock_data', pd.concat([changed, extra]), conn=conn)
+    assert result == {'inserted': 2, 'updated': 2, 'unchanged': 3}
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT trade_date, close_price FROM stock_data WHERE ticker = %s ORDER BY trade_date", (TICKER,))
+        stored = cur.fetchall()
+    assert len(stored) == 7
+    assert float(stored[1][1]) == pytest.approx(11.75)
+
+def test_bulk_upsert_empty_frame(conn):
+    assert bulk_upsert('stock_data', price_rows().iloc[:0], conn=conn) == {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+def test_bulk_upsert_rejects_unknown_table():
+    with pytest.raises(ValueError):
+        bulk_upsert('not_a_table', price_rows())
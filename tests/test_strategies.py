@@ -0,0 +1,148 @@
+# tests/test_strategies.py
+#
+# 팩터 엔진(utils.factors)과 증분 지표 상태(analysis.indicator_state)가 기존 pandas 공식과
+# 같은 값을 내는지 무작위 panel로 확인하는 parity 테스트 (DB 불필요)
+
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from utils.factors import FactorGraph, rolling_factors, ROLLING_FACTORS
+from analysis.indicator_state import IndicatorState, WINDOW_DAYS
+from strategies.sortino_ratio import calculate_sortino_ratio
+
+MOMENTUM = ["RSI", "52W High Ratio", "60-Day MA", "200-Day MA", "1M Change", "3M Change", "6M Change", "1Y Change"]
+PRICE = ["Average Volume", "Last Close", "Price Increase Ratio", "Sortino Ratio"]
+
+def baseline_rsi(close, period=14):
+    """기존 compute_rsi (rolling mean, 첫 diff는 0으로 취급)"""
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.rolling(window=period, min_periods=1).mean()
+    avg_loss = loss.rolling(window=period, min_periods=1).mean()
+    rs = avg_gain / (avg_loss + 1e-10)
+    return (100 - (100 / (1 + rs))).iloc[-1]
+
+def baseline_momentum(close):
+    """기존 get_momentum_indicators 공식"""
+    def change(lag):
+        return None if len(close) < lag else (close.iloc[-1] - close.iloc[-lag]) / close.iloc[-lag] * 100
+    return {
+        "RSI": baseline_rsi(close),
+        "52W High Ratio": close.iloc[-1] / close.max(),
+        "60-Day MA": close.rolling(window=60, min_periods=1).mean().iloc[-1],
+        "200-Day MA": close.rolling(window=200, min_periods=1).mean().iloc[-1],
+        "1M Change": change(22),
+        "3M Change": change(66),
+        "6M Change": change(132),
+        "1Y Change": (close.iloc[-1] - close.iloc[0]) / close.iloc[0] * 100,
+    }
+
+def baseline_price(data):
+    """기존 fetch_stock_analysis의 필터 지표"""
+    return {
+        "Average Volume": data['Volume'].mean(),
+        "Last Close": data['Close'].iloc[-1],
+        "Price Increase Ratio": (data['Close'].iloc[-1] - data['Close'].iloc[0]) / data['Close'].iloc[0],
+        "Sortino Ratio": calculate_sortino_ratio(data['Close'].pct_change().dropna()),
+    }
+
+def random_panel(seed, days=300, tickers=30, missing=0.1):
+    """거래가 없는 칸(NaN)이 섞인 (날짜 x 종목) 종가/거래량"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, (days, tickers)), axis=0))
+    volume = rng.integers(100000, 10000000, (days, tickers)).astype('float64')
+    gaps = rng.random((days, tickers)) < missing
+    gaps[:days // 2, 0] = True   # 구간 중간에 상장한 종목
+    gaps[-days // 3:, 1] = True  # 구간 끝 전에 거래가 끊긴 종목
+    close[gaps] = np.nan
+    volume[gaps] = np.nan
+    return close, volume
+
+def assert_same(actual, expected, label):
+    if expected is None or pd.isna(expected):
+        assert actual is None or pd.isna(actual), label
+    else:
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-9), label
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_factor_graph_matches_baseline_formulas(seed):
+    close, volume = random_panel(seed)
+    graph = FactorGraph(close, volume)
+    table = graph.table(MOMENTUM + PRICE)
+    for column in range(close.shape[1]):
+        # 종목별 DB 조회처럼 거래가 있는 날만 남긴 DataFrame
+        traded = ~np.isnan(close[:, column])
+        data = pd.DataFrame({'Close': close[traded, column], 'Volume': volume[traded, column]})
+        expected = {**baseline_momentum(data['Close']), **baseline_price(data)}
+        for name, value in expected.items():
+            assert_same(table.loc[column, name], value, f"{name} (ticker {column})")
+
+def test_factor_graph_memoizes_shared_inputs():
+    close, volume = random_panel(3)
+    graph = FactorGraph(close, volume)
+    graph.compute(['Sortino Ratio'])
+    returns = graph['returns']
+    graph.compute(['RSI', 'Price Increase Ratio'])
+    assert graph['returns'] is returns
+    assert {'aligned', 'delta', 'returns'} <= set(graph.computed)
+
+def test_rolling_factors_match_each_window():
+    close, volume = random_panel(4, days=200, tickers=12)
+    window = 63
+    rolling = rolling_factors(close, volume, window=window)
+    for row in range(close.shape[0]):
+        rows = slice(max(0, row - window + 1), row + 1)
+        expected = FactorGraph(close[rows], volume[rows]).compute(ROLLING_FACTORS)
+        for name in ROLLING_FACTORS:
+            np.testing.assert_allclose(rolling[name][row], expected[name], rtol=1e-9, atol=1e-9,
+                                       err_msg=f"{name} at row {row}")
+
+def daily_bars(seed, days=400):
+    """평일 거래일과 종가/거래량 (가끔 거래가 없는 날 포함)"""
+    rng = np.random.default_rng(seed)
+    dates = [day.date() for day in pd.bdate_range(date(2023, 1, 2), periods=days)]
+    closes = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+    volumes = rng.integers(1000, 1000000, days)
+    closes[rng.random(days) < 0.05] = np.nan
+    return dates, closes, volumes
+
+def rebuilt_state(dates, closes, volumes, as_of):
+    """rebuild_indicator_state와 같은 방식으로 as_of 기준 window를 처음부터 계산"""
+    state = IndicatorState('TEST')
+    cutoff = as_of - timedelta(days=WINDOW_DAYS)
+    for day, close, volume in zip(dates, closes, volumes):
+        if cutoff <= day <= as_of and not np.isnan(close):
+            state.push(day, close, volume)
+    state.advance(as_of)
+    return state
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_indicator_state_advance_matches_rebuild(seed):
+    dates, closes, volumes = daily_bars(seed)
+    state = IndicatorState('TEST')
+    for index, (day, close, volume) in enumerate(zip(dates, closes, volumes)):
+        state.advance(day, None if np.isnan(close) else close, volume)
+        if index % 25 and index != len(dates) - 1:
+            continue
+        rebuilt = rebuilt_state(dates, closes, volumes, day)
+        assert state.dates == rebuilt.dates
+        expected = rebuilt.indicators()
+        actual = state.indicators()
+        assert actual.keys() == expected.keys()
+        for name, value in expected.items():
+            assert_same(actual[name], value, f"{name} on {day}")
+
+def test_indicator_state_matches_factor_graph():
+    dates, closes, volumes = daily_bars(2)
+    as_of = dates[-1]
+    state = rebuilt_state(dates, closes, volumes, as_of)
+    cutoff = as_of - timedelta(days=WINDOW_DAYS)
+    window = [(close, volume) for day, close, volume in zip(dates, closes, volumes)
+              if cutoff <= day and not np.isnan(close)]
+    close, volume = np.array(window).T
+    expected = FactorGraph(close, volume).row(MOMENTUM + PRICE)
+    actual = state.indicators()
+    for name, value in expected.items():
+        assert_same(actual[name], value, name)
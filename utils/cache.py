@@ -0,0 +1,158 @@
+# utils/cache.py
+
+import os
+import time
+import atexit
+import pickle
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+import pytz
+from utils import metrics
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_caches = {}  # 이름별 TTLCache (cache_stats 용)
+
+def today_as_of(tz='Asia/Seoul'):
+    """캐시 키에 들어가는 기준일 (기본값: 서울 기준 오늘)"""
+    return datetime.now(pytz.timezone(tz)).date()
+
+class TTLCache:
+    """
+    크기 제한(LRU 방출)과 TTL이 있는 스레드 안전 캐시
+
+    Args:
+        maxsize (int): 최대 항목 수. 넘치면 가장 오래 쓰이지 않은 항목부터 방출.
+        ttl (float): 항목 유효 시간(초). None이면 만료 없음.
+        path (str): 지정하면 pickle 파일로 저장/복원 (프로세스 간 재사용).
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self._data = OrderedDict()  # key -> (저장 시각, 값)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+        if path:
+            self.load()
+
+    def _alive(self, stored_at, now):
+        return self.ttl is None or now - stored_at < self.ttl
+
+    def get(self, key):
+        """(hit 여부, 값) 반환"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if self._alive(entry[0], time.time()):
+                    self._data.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return True, entry[1]
+                del self._data[key]
+                self._stats['expired'] += 1
+            self._stats['misses'] += 1
+            return False, None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=len(self._data), maxsize=self.maxsize)
+
+    def load(self):
+        """저장된 파일에서 아직 유효한 항목만 복원"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                entries = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache file {self.path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for key, (stored_at, value) in entries.items():
+                if self._alive(stored_at, now):
+                    self._data[key] = (stored_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def save(self):
+        """유효한 항목을 파일에 저장 (임시 파일에 쓴 뒤 교체)"""
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = OrderedDict((k, v) for k, v in self._data.items() if self._alive(v[0], now))
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not persist cache {self.path}: {e}")
+
+def ttl_cache(maxsize=1024, ttl=6 * 3600, as_of=today_as_of, persist=None, cache_empty=False):
+    """
+    (인자, 기준일) 단위로 결과를 캐시하는 데코레이터
+
+    lru_cache와 달리 날짜가 바뀌면 새로 계산하고, ttl이 지나도 다시 계산합니다.
+
+    Args:
+        maxsize (int): 최대 항목 수.
+        ttl (float): 항목 유효 시간(초).
+        as_of (callable): 키에 덧붙일 기준일을 돌려주는 함수. None이면 인자만 키로 사용.
+        persist (str): 캐시 파일을 둘 디렉터리. 기본값은 환경 변수 INDICATOR_CACHE_DIR
+                       (없으면 메모리에만 저장).
+        cache_empty (bool): 빈 결과({}, None 등)도 캐시할지 여부. 기본값은 False라
+                            일시적인 조회 실패가 ttl 동안 굳어지지 않습니다.
+
+    데코레이트된 함수에는 cache, cache_info(), cache_clear()가 붙습니다.
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        directory = persist or os.getenv('INDICATOR_CACHE_DIR')
+        path = os.path.join(directory, f"{name}.pkl") if directory else None
+        cache = TTLCache(maxsize=maxsize, ttl=ttl, path=path)
+        _caches[name] = cache
+        if path:
+            atexit.register(cache.save)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())), as_of() if as_of else None)
+            hit, value = cache.get(key)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            if value or cache_empty:
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache.stats
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+def cache_stats():
+    """ttl_cache로 만든 모든 캐시의 hit/miss 통계"""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+metrics.register_source('caches', cache_stats)
@@ -0,0 +1,353 @@
+# utils/factors.py
+#
+# (날짜 x 종목) 가격 행렬 위의 팩터 그래프
+#
+# 각 팩터는 @factor로 이름과 입력(다른 팩터, 원본 'close'/'volume', 파라미터)을 선언합니다.
+# FactorGraph는 요청된 팩터의 입력을 따라가며 필요한 노드만 한 번씩 계산하고 결과를
+# 메모이즈하므로, 정렬된 종가(aligned)나 일간 수익률(returns) 같은 중간값은 panel당
+# 한 번만 만들어집니다. 새 팩터는 기존 중간값을 입력으로 선언하면 데이터를 다시 훑지 않습니다.
+#
+#   graph = FactorGraph.from_arrays(panel_to_arrays(panel, tickers, fields=['Close', 'Volume']))
+#   table = graph.table(['Sortino Ratio', 'RSI', '6M Change'])
+#
+# 정의는 기존 함수와 같습니다: RSI/이동평균/N개월 변화율은 get_momentum_indicators,
+# Sortino Ratio는 calculate_sortino_ratio (pct_change().dropna() 수익률), 평균 거래량과
+# 상승률은 fetch_stock_analysis. 위치 기반 지표(iloc[-22] 등)는 종목별로 거래된 날만 세므로
+# 종가를 align_valid_rows로 아래쪽에 모은 뒤 계산합니다.
+#
+# data(get_momentum_indicators), analysis, strategies가 함께 쓰므로 어느 계층에도 의존하지
+# 않도록 utils에 둡니다.
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+DEFAULT_PARAMS = {
+    'rsi_period': 14,
+    'risk_free_rate': 0.01 / TRADING_DAYS,
+}
+
+SOURCES = ('close', 'volume')
+
+_FACTORS = {}  # 이름 -> (함수, 입력 이름 tuple)
+
+def factor(name, *inputs):
+    """
+    팩터 등록 데코레이터
+
+    Args:
+        name (str): 팩터 이름. 결과 표의 컬럼 이름으로도 쓰입니다.
+        *inputs (str): 입력 이름 (다른 팩터, SOURCES, DEFAULT_PARAMS의 키). 함수는 같은 순서로 받습니다.
+    """
+    def decorator(func):
+        if name in _FACTORS or name in SOURCES or name in DEFAULT_PARAMS:
+            raise ValueError(f"Factor already defined: {name}")
+        _FACTORS[name] = (func, inputs)
+        return func
+    return decorator
+
+def align_valid_rows(values):
+    """
+    각 열의 유효값(NaN 아님)을 순서를 유지한 채 아래쪽으로 모음
+
+    종목별 조회 결과에는 그 종목이 거래된 날짜만 들어 있으므로, 위치 기반
+    지표(iloc[-22] 등)를 같게 계산하려면 날짜 축의 빈칸을 없애야 합니다.
+
+    Returns:
+        tuple: (정렬된 2차원 배열, 열별 유효값 개수)
+    """
+    valid = ~np.isnan(values)
+    order = np.argsort(valid, axis=0, kind='stable')
+    return np.take_along_axis(values, order, axis=0), valid.sum(axis=0)
+
+class FactorGraph:
+    """
+    하나의 panel에 대한 메모이즈된 팩터 계산기
+
+    Args:
+        close (np.ndarray): (날짜 x 종목) 종가. 거래가 없는 칸은 NaN. 1차원이면 한 종목으로 취급.
+        volume (np.ndarray): 같은 모양의 거래량 (거래량 팩터를 쓸 때만 필요).
+        tickers (list): 결과 표의 인덱스.
+        **params: DEFAULT_PARAMS 덮어쓰기 (rsi_period, risk_free_rate).
+    """
+
+    def __init__(self, close, volume=None, tickers=None, **params):
+        unknown = set(params) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown factor parameters: {', '.join(sorted(unknown))}")
+        close = np.asarray(close, dtype='float64')
+        if close.ndim == 1:
+            close = close[:, None]
+        if close.ndim != 2:
+            raise ValueError("close must be a 2-D (date x ticker) array")
+        self.tickers = list(tickers) if tickers is not None else list(range(close.shape[1]))
+        self._values = dict(DEFAULT_PARAMS, **params)
+        self._values['close'] = close
+        if volume is not None:
+            volume = np.asarray(volume, dtype='float64')
+            self._values['volume'] = volume[:, None] if volume.ndim == 1 else volume
+
+    @classmethod
+    def from_arrays(cls, arrays, **params):
+        """panel_to_arrays 결과(dict)로 생성"""
+        return cls(arrays['Close'], arrays.get('Volume'), tickers=arrays['tickers'], **params)
+
+    @classmethod
+    def from_frame(cls, data, **params):
+        """한 종목의 Close(/Volume) DataFrame으로 생성 (yfinance 보충 데이터 등)"""
+        volume = data['Volume'].to_numpy(dtype='float64') if 'Volume' in data else None
+        return cls(data['Close'].to_numpy(dtype='float64'), volume, **params)
+
+    @property
+    def computed(self):
+        """지금까지 계산(또는 입력)된 노드 이름"""
+        return list(self._values)
+
+    def __getitem__(self, name):
+        return self._evaluate(name, ())
+
+    def _evaluate(self, name, path):
+        if name in self._values:
+            return self._values[name]
+        if name not in _FACTORS:
+            if name in SOURCES:
+                raise KeyError(f"Factor input '{name}' was not provided")
+            raise KeyError(f"Unknown factor: {name}")
+        if name in path:
+            raise ValueError(f"Factor cycle: {' -> '.join(path + (name,))}")
+        func, inputs = _FACTORS[name]
+        value = func(*(self._evaluate(item, path + (name,)) for item in inputs))
+        self._values[name] = value
+        return value
+
+    def compute(self, names):
+        """names 팩터를 계산해 {이름: 종목별 1차원 배열} 반환 (거래 기록이 없는 종목은 NaN)"""
+        if self['close'].shape[0] == 0:
+            return {name: np.full(self['close'].shape[1], np.nan) for name in names}
+        empty = self['counts'] == 0
+        return {name: np.where(empty, np.nan, self[name]) for name in names}
+
+    def table(self, names):
+        """compute 결과를 티커 인덱스 DataFrame으로 반환"""
+        return pd.DataFrame(self.compute(names), index=self.tickers, columns=list(names))
+
+    def row(self, names, column=0):
+        """한 종목의 팩터를 dict로 반환 (NaN은 None)"""
+        values = self.compute(names)
+        return {name: _scalar(values[name][column]) for name in names}
+
+def _scalar(value):
+    return None if pd.isna(value) else float(value)
+
+def factor_row(table, ticker):
+    """팩터 표의 한 종목을 dict로 변환 (없거나 모두 NaN이면 빈 dict, NaN은 None)"""
+    if ticker not in table.index or table.loc[ticker].isna().all():
+        return {}
+    return {col: _scalar(value) for col, value in table.loc[ticker].items()}
+
+def frame_factors(data, names, **params):
+    """한 종목 DataFrame의 팩터 dict (FactorGraph.from_frame(data).row(names))"""
+    return FactorGraph.from_frame(data, **params).row(names)
+
+# 공유 중간값
+
+@factor('alignment', 'close')
+def _alignment(close):
+    return align_valid_rows(close)
+
+@factor('aligned', 'alignment')
+def _aligned(alignment):
+    return alignment[0]
+
+@factor('counts', 'alignment')
+def _counts(alignment):
+    return alignment[1]
+
+@factor('Last Close', 'aligned')
+def _last_close(aligned):
+    return aligned[-1]
+
+@factor('First Close', 'aligned', 'counts')
+def _first_close(aligned, counts):
+    rows = aligned.shape[0]
+    return aligned[np.clip(rows - counts, 0, rows - 1), np.arange(aligned.shape[1])]
+
+@factor('Max Close', 'close')
+def _max_close(close):
+    highest = np.max(np.where(np.isnan(close), -np.inf, close), axis=0)
+    return np.where(np.isfinite(highest), highest, np.nan)
+
+@factor('Min Close', 'close')
+def _min_close(close):
+    lowest = np.min(np.where(np.isnan(close), np.inf, close), axis=0)
+    return np.where(np.isfinite(lowest), lowest, np.nan)
+
+@factor('delta', 'aligned')
+def _delta(aligned):
+    return np.diff(aligned, axis=0)
+
+@factor('returns', 'aligned')
+def _returns(aligned):
+    # pct_change와 같은 식 (close / 전일 close - 1), 종목 첫 거래일 이전은 NaN
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return aligned[1:] / aligned[:-1] - 1
+
+# 팩터
+
+@factor('RSI', 'delta', 'counts', 'rsi_period')
+def _rsi(delta, counts, period):
+    # 첫 diff(NaN)는 gain/loss 0으로 취급 (compute_rsi와 동일)
+    gain = np.where(delta > 0, delta, 0.0)[-period:].sum(axis=0)
+    loss = np.where(delta < 0, -delta, 0.0)[-period:].sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        divisor = np.minimum(period, counts)
+        rs = (gain / divisor) / (loss / divisor + 1e-10)
+        return 100 - (100 / (1 + rs))
+
+@factor('52W High Ratio', 'Last Close', 'Max Close')
+def _high_ratio(last, highest):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return last / highest
+
+def _tail_mean(aligned, counts, window):
+    tail = np.nan_to_num(aligned[-window:]).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return tail / np.minimum(window, counts)
+
+def _change(last, base, counts, lag):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = (last - base) / base * 100
+    return np.where(counts >= lag, change, np.nan)
+
+def _lagged_change(aligned, counts, last, lag):
+    base = aligned[-lag] if aligned.shape[0] >= lag else np.full(aligned.shape[1], np.nan)
+    return _change(last, base, counts, lag)
+
+@factor('60-Day MA', 'aligned', 'counts')
+def _ma_60(aligned, counts):
+    return _tail_mean(aligned, counts, 60)
+
+@factor('200-Day MA', 'aligned', 'counts')
+def _ma_200(aligned, counts):
+    return _tail_mean(aligned, counts, 200)
+
+@factor('1M Change', 'aligned', 'counts', 'Last Close')
+def _change_1m(aligned, counts, last):
+    return _lagged_change(aligned, counts, last, 22)
+
+@factor('3M Change', 'aligned', 'counts', 'Last Close')
+def _change_3m(aligned, counts, last):
+    return _lagged_change(aligned, counts, last, 66)
+
+@factor('6M Change', 'aligned', 'counts', 'Last Close')
+def _change_6m(aligned, counts, last):
+    return _lagged_change(aligned, counts, last, 132)
+
+@factor('1Y Change', 'Last Close', 'First Close', 'counts')
+def _change_window(last, first, counts):
+    # 조회 구간 첫 종가 대비 (get_momentum_indicators의 1Y Change)
+    return _change(last, first, counts, 1)
+
+@factor('Price Increase Ratio', 'Last Close', 'First Close')
+def _price_increase_ratio(last, first):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (last - first) / first
+
+def _return_sums(returns):
+    """Sortino에 쓰는 수익률 합계: (개수, 합, 하락 개수, 하락 제곱합) 배열. inf/NaN 수익률은 제외"""
+    valid = np.isfinite(returns)
+    values = np.where(valid, returns, 0.0)
+    downside = values < 0
+    return valid, values, downside, np.where(downside, values ** 2, 0.0)
+
+def _sortino_from_sums(count, total, down_count, down_square_sum, risk_free_rate):
+    # calculate_sortino_ratio와 같은 규칙: 수익률 2개 미만은 NaN, 하락 수익률이 없거나
+    # downside deviation이 0이면 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        downside_deviation = np.sqrt(down_square_sum / down_count)
+        sortino = np.where((down_count > 0) & (downside_deviation > 0),
+                           (mean - risk_free_rate) / downside_deviation * np.sqrt(TRADING_DAYS), 0.0)
+    return np.where(count >= 2, sortino, np.nan)
+
+@factor('Sortino Ratio', 'returns', 'risk_free_rate')
+def _sortino(returns, risk_free_rate):
+    sums = [part.sum(axis=0) for part in _return_sums(returns)]
+    return _sortino_from_sums(*sums, risk_free_rate)
+
+def _average_from_sums(total, count):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return total / count
+
+@factor('Average Volume', 'volume')
+def _average_volume(volume):
+    valid = ~np.isnan(volume)
+    return _average_from_sums(np.where(valid, volume, 0.0).sum(axis=0), valid.sum(axis=0))
+
+# 모든 날짜의 trailing window 팩터
+
+ROLLING_FACTORS = ('Last Close', 'First Close', 'Price Increase Ratio', 'Sortino Ratio', 'Average Volume')
+
+def _window_sum(values, window):
+    """열별 trailing window 합계 (누적합 차이, 앞쪽 window-1행은 부분 합계)"""
+    total = np.cumsum(values, axis=0)
+    result = total.copy()
+    result[window:] = total[window:] - total[:-window]
+    return result
+
+def rolling_factors(close, volume=None, window=126, risk_free_rate=DEFAULT_PARAMS['risk_free_rate']):
+    """
+    모든 날짜 t에 대해 close[t-window+1:t+1] 구간의 팩터를 누적합으로 한 번에 계산
+
+    행 t의 값은 FactorGraph(close[max(0, t-window+1):t+1], volume[...]).compute(names)와 같은
+    정의입니다 (수익률은 구간 안에서 연속한 거래 사이만 세고, 첫 종가는 구간 첫 거래일 종가).
+    백테스트처럼 날짜마다 window를 다시 계산해야 할 때 씁니다.
+
+    Returns:
+        dict: 'counts'(구간 안 거래 수)와 ROLLING_FACTORS별 (날짜 x 종목) 배열 (volume이 없으면
+              Average Volume 제외).
+    """
+    close = np.asarray(close, dtype='float64')
+    if close.ndim != 2:
+        raise ValueError("close must be a 2-D (date x ticker) array")
+    rows, columns = close.shape
+    valid = ~np.isnan(close)
+    counts = _window_sum(valid.astype('float64'), window)
+    empty = counts == 0
+
+    # 직전 거래 종가 대비 수익률 (종목의 첫 거래는 NaN)
+    carried = pd.DataFrame(close).ffill().to_numpy()
+    previous = np.full_like(close, np.nan)
+    previous[1:] = carried[:-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.where(valid, close / previous - 1, np.nan)
+
+    # 구간 첫 거래 위치: 그 수익률은 직전 거래가 구간 밖이므로 합계에서 뺌
+    index = np.arange(rows)[:, None]
+    next_valid = np.minimum.accumulate(np.where(valid, index, rows)[::-1], axis=0)[::-1]
+    first_row = next_valid[np.clip(np.arange(rows) - window + 1, 0, None)]
+    has_first = first_row <= index
+    first_row = np.where(has_first, first_row, 0)
+    columns_index = np.arange(columns)
+
+    sums = []
+    for part in _return_sums(returns):
+        part = part.astype('float64')
+        first = np.where(has_first, part[first_row, columns_index], 0.0)
+        sums.append(_window_sum(part, window) - first)
+
+    result = {
+        'counts': counts,
+        'Last Close': np.where(empty, np.nan, carried),
+        'First Close': np.where(empty, np.nan, close[first_row, columns_index]),
+        'Sortino Ratio': np.where(empty, np.nan, _sortino_from_sums(*sums, risk_free_rate)),
+    }
+    result['Price Increase Ratio'] = _price_increase_ratio(result['Last Close'], result['First Close'])
+    if volume is not None:
+        volume = np.asarray(volume, dtype='float64')
+        volume_valid = ~np.isnan(volume)
+        average = _average_from_sums(_window_sum(np.where(volume_valid, volume, 0.0), window),
+                                     _window_sum(volume_valid.astype('float64'), window))
+        result['Average Volume'] = np.where(empty, np.nan, average)
+    return result
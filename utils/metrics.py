@@ -0,0 +1,301 @@
+# utils/metrics.py
+#
+# 배치 작업의 단계별 계측 (시간, 호출 수, 재시도, 처리 행 수, DB round trip)
+#
+#   with metrics.timed('db.stock_panel') as span:
+#       rows = cur.fetchall()
+#       span.rows = len(rows)
+#
+#   @metrics.instrument('yfinance.history', rows=metrics.row_count)
+#   def fetch(...): ...
+#
+# 단계 시간은 하위 단계를 포함한 값(inclusive)입니다. DB round trip과 재시도는
+# 같은 스레드에서 열려 있는 모든 단계에 더해지므로, 스레드 풀 작업은 작업 함수 안에서
+# 단계를 열어야 집계됩니다. run()은 실행이 끝날 때 요약을 JSON 한 줄로 로그에 남기고
+# (선택) 파일로 저장하며, cProfile 또는 sampling profiler를 함께 돌릴 수 있습니다.
+
+import os
+import sys
+import io
+import json
+import time
+import threading
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+_lock = threading.Lock()
+_stages = {}     # 단계 이름 -> 통계 dict
+_counters = Counter()
+_sources = {}    # 이름 -> 요약에 덧붙일 통계 함수 (커넥션 풀, 캐시 등)
+_local = threading.local()
+_started = time.perf_counter()
+
+def _new_stage():
+    return {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0,
+            'db_round_trips': 0, 'retries': 0, 'retry_sleep': 0.0}
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+class Span:
+    """진행 중인 단계. rows에 처리한 행 수를 넣으면 rows/sec가 계산됩니다."""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+@contextmanager
+def timed(name, rows=None):
+    """name 단계의 시간/호출/오류를 기록하는 context manager (Span을 돌려줌)"""
+    span = Span(name, rows)
+    stack = _stack()
+    stack.append(name)
+    failed = False
+    started = time.perf_counter()
+    try:
+        yield span
+    except SystemExit as e:
+        failed = bool(e.code)
+        raise
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        stack.pop()
+        with _lock:
+            stage = _stages.setdefault(name, _new_stage())
+            stage['calls'] += 1
+            stage['errors'] += failed
+            stage['seconds'] += elapsed
+            stage['max_seconds'] = max(stage['max_seconds'], elapsed)
+            stage['rows'] += span.rows or 0
+
+def row_count(result):
+    """DataFrame, list 등 길이가 있는 결과의 행 수 (그 외에는 None)"""
+    try:
+        return len(result) if not isinstance(result, (dict, str)) else None
+    except TypeError:
+        return None
+
+def instrument(name, rows=None):
+    """
+    함수 호출을 name 단계로 기록하는 데코레이터
+
+    Args:
+        name (str): 단계 이름. 'db.', 'yfinance.', 'save.', 'analysis.' 접두어를 씁니다.
+        rows (callable): 반환값에서 처리 행 수를 구하는 함수 (예: row_count).
+
+    tenacity의 @retry 아래에 두면 시도마다 한 번씩 기록됩니다.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name) as span:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    span.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+def _add_to_open_stages(field, value):
+    stack = _stack()
+    if not stack:
+        return
+    with _lock:
+        for name in set(stack):
+            _stages.setdefault(name, _new_stage())[field] += value
+
+def count(name, value=1):
+    """단계와 무관한 누적 카운터"""
+    with _lock:
+        _counters[name] += value
+
+def add_rows(rows):
+    """현재 스레드의 가장 안쪽 단계에 처리 행 수를 더함"""
+    stack = _stack()
+    if stack:
+        with _lock:
+            _stages.setdefault(stack[-1], _new_stage())['rows'] += rows
+
+def record_round_trip(statements=1):
+    """DB에 보낸 요청 수 (database의 계측 cursor가 호출)"""
+    count('db_round_trips', statements)
+    _add_to_open_stages('db_round_trips', statements)
+
+def record_retry(retry_state):
+    """tenacity before_sleep 콜백: 재시도 횟수와 대기 시간 기록"""
+    sleep = retry_state.next_action.sleep if retry_state.next_action else 0.0
+    name = getattr(retry_state.fn, '__qualname__', 'unknown')
+    count(f"retries.{name}")
+    count('retry_sleep_seconds', sleep)
+    _add_to_open_stages('retries', 1)
+    _add_to_open_stages('retry_sleep', sleep)
+    logger.warning(f"Retrying {name} in {sleep:.1f}s (attempt {retry_state.attempt_number} failed: "
+                   f"{retry_state.outcome.exception()})")
+
+def register_source(name, func):
+    """요약에 함께 넣을 통계 함수 등록 (인자 없이 dict를 돌려주는 함수)"""
+    _sources[name] = func
+
+def reset():
+    global _started
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _started = time.perf_counter()
+
+def summary(**extra):
+    """
+    지금까지의 계측 요약
+
+    Returns:
+        dict: elapsed_seconds, stages(단계별 calls, errors, seconds, mean_ms, max_ms, rows,
+              rows_per_sec, db_round_trips, retries, retry_sleep), counters, 등록된 통계와 extra.
+    """
+    with _lock:
+        stages = {name: dict(stage) for name, stage in _stages.items()}
+        counters = dict(_counters)
+        elapsed = time.perf_counter() - _started
+    for stage in stages.values():
+        seconds = stage['seconds']
+        stage['mean_ms'] = round(seconds / stage['calls'] * 1000, 3) if stage['calls'] else None
+        stage['max_ms'] = round(stage.pop('max_seconds') * 1000, 3)
+        stage['rows_per_sec'] = round(stage['rows'] / seconds, 1) if stage['rows'] and seconds > 0 else None
+        stage['seconds'] = round(seconds, 6)
+        stage['retry_sleep'] = round(stage['retry_sleep'], 3)
+    result = {'elapsed_seconds': round(elapsed, 3), 'stages': dict(sorted(stages.items())), 'counters': counters}
+    for name, func in _sources.items():
+        try:
+            result[name] = func()
+        except Exception as e:
+            result[name] = {'error': str(e)}
+    result.update(extra)
+    return result
+
+def write_summary(path, **extra):
+    data = summary(**extra)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+    return data
+
+class SamplingProfiler:
+    """
+    모든 스레드의 호출 스택을 interval초마다 수집하는 profiler
+
+    cProfile과 달리 스레드 풀 작업도 보이고 부하가 작습니다. 결과는
+    flamegraph.pl / speedscope가 읽는 collapsed stack 형식("a;b;c 횟수")으로 저장합니다.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+    def top(self, limit=20):
+        """가장 많이 샘플된 함수 (스택 맨 위 기준)"""
+        leaves = Counter()
+        for stack, samples in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += samples
+        total = sum(leaves.values()) or 1
+        return '\n'.join(f"{samples:8d} {samples / total:6.1%}  {name}" for name, samples in leaves.most_common(limit))
+
+@contextmanager
+def profile(mode=None, path=None):
+    """
+    mode에 따라 cProfile('cprofile') 또는 SamplingProfiler('sample')를 켠 채 실행
+
+    결과 파일은 path (기본값: log/profile/<시각>.prof 또는 .folded)에 저장하고
+    상위 함수 목록을 로그에 남깁니다. mode가 None이면 아무것도 하지 않습니다.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode} (choose from {', '.join(PROFILE_MODES)})")
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = path or os.path.join('log', 'profile', f"{stamp}.{'prof' if mode == 'cprofile' else 'folded'}")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    if mode == 'cprofile':
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(20)
+            logger.info(f"cProfile written to {path} (main thread only)\n{report.getvalue()}")
+    else:
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            profiler.save(path)
+            logger.info(f"Sampling profile written to {path}\n{profiler.top()}")
+
+@contextmanager
+def run(name, output=None, profile_mode=None, profile_output=None):
+    """
+    배치 실행 전체를 name 단계로 감싸고, 끝날 때(오류나 exit() 포함) JSON 요약을 남김
+
+    Args:
+        name (str): 실행 이름 (최상위 단계 이름 'run.<name>').
+        output (str): 요약 JSON을 저장할 경로. None이면 로그에만 남김.
+        profile_mode (str): None, 'cprofile' 또는 'sample'.
+        profile_output (str): profiler 결과 경로.
+    """
+    reset()
+    try:
+        with profile(profile_mode, profile_output), timed(f"run.{name}"):
+            yield
+    finally:
+        data = write_summary(output, run=name) if output else summary(run=name)
+        logger.info(f"Run metrics: {json.dumps(data, default=str)}")